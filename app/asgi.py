@@ -0,0 +1,272 @@
+"""Modo asíncrono (ASGI) de las lecturas de publicaciones.
+
+Sirve GET /api/posts/, /api/posts/feed, /api/posts/<post_id> y
+/api/posts/<post_id>/comment con clientes asíncronos de MongoDB
+(pymongo.AsyncMongoClient) y Redis (redis.asyncio), así que un proceso
+mantiene miles de peticiones lentas en curso sin un hilo por petición.
+Las respuestas, las claves de Redis y los tokens son los mismos que los
+de la API Flask (app/run.py), que sigue atendiendo las escrituras: el
+balanceador envía a este servicio los GET de esas rutas.
+
+    export PYTHONPATH=$(pwd)
+    uvicorn app.asgi:app --workers 4
+"""
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+from urllib.parse import parse_qs
+
+import jwt
+
+from app.config import Config
+from app.extensions.async_clients import async_db, async_redis, close_async_clients
+from app.middleware.metrics_middleware import cache_counters
+from app.middleware.ratelimit_middleware import SLIDING_WINDOW_SCRIPT
+from app.models.post_models import Comment, Post
+from app.services.async_post_service import AsyncPostService
+from app.utils.metrics import Metrics, RequestIO
+from app.utils.pagination import Cursor
+from app.utils.responses import encode
+from app.utils.revocation_cache import RevocationCache
+
+logger = logging.getLogger(__name__)
+
+_sliding_window = async_redis.register_script(SLIDING_WINDOW_SCRIPT)
+
+
+class AuthError(Exception):
+    """Error de autenticación con el mismo código y cuerpo que Flask-JWT-Extended"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class BadRequest(Exception):
+    pass
+
+
+class Request:
+    def __init__(self, scope):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.args = {key: values[0] for key, values in
+                     parse_qs(scope.get("query_string", b"").decode("latin-1")).items()}
+        self.headers = {key.decode("latin-1").lower(): value.decode("latin-1")
+                        for key, value in scope.get("headers", [])}
+        client = scope.get("client")
+        self.remote_addr = client[0] if client else None
+
+    def identity(self, optional=False):
+        """user_id del JWT de acceso (Authorization: Bearer), o None si es opcional y no viene"""
+        header = self.headers.get("authorization")
+        if not header:
+            if optional:
+                return None
+            raise AuthError(401, "Missing Authorization Header")
+        scheme, _, token = header.partition(" ")
+        if scheme != "Bearer" or not token:
+            raise AuthError(422, "Bad Authorization header. Expected 'Authorization: Bearer <JWT>'")
+        try:
+            claims = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=["HS256"])
+        except jwt.ExpiredSignatureError:
+            raise AuthError(401, "Token has expired")
+        except jwt.InvalidTokenError as e:
+            raise AuthError(422, str(e))
+        if claims.get("type") != "access":
+            raise AuthError(422, "Only non-refresh tokens are allowed")
+        # Sin E/S salvo mientras el listener de revocaciones se sincroniza
+        if RevocationCache.is_revoked(claims.get("jti")):
+            raise AuthError(401, "Token has been revoked")
+        return claims.get("sub")
+
+    def limit(self, default: int) -> int:
+        try:
+            return Cursor.limit_from_request(self.args, default)
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+    def cursor(self, length: int):
+        try:
+            return Cursor.from_request(self.args, length)
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+
+async def rate_limit(request: Request, endpoint: str, user_id, limit=100, period=60):
+    """Misma ventana deslizante y clave que rate_limiter(), para compartir el límite con Flask"""
+    identity = f"user:{user_id}" if user_id else f"ip:{request.remote_addr}"
+    window_ms = int(period * 1000)
+    try:
+        allowed, remaining, reset_ms = await _sliding_window(
+            keys=[f"rate_limit:sliding_window:{endpoint}:{identity}"],
+            args=[limit, window_ms, os.urandom(8).hex()]
+        )
+    except Exception:
+        # Si Redis no responde no se bloquea el tráfico
+        logger.exception("rate limiter unavailable")
+        return None, {}
+    headers = {
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(max(int(remaining), 0)),
+        "X-RateLimit-Reset": str(math.ceil(int(reset_ms) / 1000)),
+    }
+    if not allowed:
+        headers["Retry-After"] = headers["X-RateLimit-Reset"]
+        return ({"error": "Too many requests"}, 429), headers
+    return None, headers
+
+
+async def get_posts(request: Request):
+    try:
+        user_id, auth_error = request.identity(optional=True), None
+    except AuthError as e:
+        user_id, auth_error = None, e
+    limited, headers = await rate_limit(request, "post.get_posts", user_id)
+    if limited:
+        return (*limited, headers)
+    # Igual que en Flask: el límite se aplica antes de rechazar un token inválido
+    if auth_error:
+        raise auth_error
+    limit = request.limit(20)
+    # (origen, score, post_id)
+    cursor = request.cursor(3)
+    body, status_code = await AsyncPostService.get_posts(user_id, limit, cursor)
+    return body, status_code, headers
+
+
+async def get_feed(request: Request):
+    user_id = request.identity()
+    limit = request.limit(20)
+    after = request.cursor(len(Post.PAGE_FIELDS))
+    body, status_code = await AsyncPostService.get_feed(user_id, limit, after)
+    return body, status_code, {}
+
+
+async def get_post(request: Request, post_id):
+    result, status_code = await AsyncPostService.get_post(post_id, request.identity(optional=True))
+    return result, status_code, {}
+
+
+async def view_comment_post(request: Request, post_id):
+    limit = request.limit(Config.COMMENTS_PAGE_SIZE)
+    after = request.cursor(len(Comment.PAGE_FIELDS))
+    result, status_code = await AsyncPostService.view_comment(post_id, limit, after)
+    return result, status_code, {}
+
+
+async def live(request: Request):
+    return {"status": "ok"}, 200, {}
+
+
+async def ready(request: Request):
+    async def check(ping):
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(ping(), Config.HEALTH_CHECK_TIMEOUT)
+            status = {"status": "ok"}
+        except Exception as e:
+            status = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+        status["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return status
+
+    mongo, redis = await asyncio.gather(check(lambda: async_db.command("ping")), check(async_redis.ping))
+    healthy = mongo["status"] == redis["status"] == "ok"
+    return {"status": "ok" if healthy else "error", "checks": {"mongo": mongo, "redis": redis}}, \
+        200 if healthy else 503, {}
+
+
+async def metrics(request: Request):
+    return Metrics.render(cache_counters()), 200, {"content-type": "text/plain; version=0.0.4"}
+
+
+ROUTES = [
+    (re.compile(r"^/api/posts/?$"), "post.get_posts", get_posts),
+    (re.compile(r"^/api/posts/feed$"), "post.get_feed", get_feed),
+    (re.compile(r"^/api/posts/(?P<post_id>[^/]+)$"), "post.get_post", get_post),
+    (re.compile(r"^/api/posts/(?P<post_id>[^/]+)/comment$"), "post.view_comment_post", view_comment_post),
+    (re.compile(r"^/health/live$"), "health.live", live),
+    (re.compile(r"^/health/ready$"), "health.ready", ready),
+    (re.compile(r"^/metrics$"), "metrics", metrics),
+]
+
+
+def match(path: str):
+    for pattern, endpoint, handler in ROUTES:
+        found = pattern.match(path)
+        if found:
+            return endpoint, handler, found.groupdict()
+    return None, None, {}
+
+
+async def dispatch(request: Request) -> tuple:
+    endpoint, handler, params = match(request.path)
+    if handler is None:
+        return endpoint, ({"error": "Not Found"}, 404, {})
+    if request.method != "GET":
+        return endpoint, ({"error": "Method Not Allowed"}, 405, {"allow": "GET"})
+    try:
+        return endpoint, await handler(request, **params)
+    except AuthError as e:
+        return endpoint, ({"msg": e.message}, e.status, {})
+    except BadRequest as e:
+        return endpoint, ({"message": str(e)}, 400, {})
+    except Exception:
+        logger.exception("unhandled error in %s", endpoint)
+        return endpoint, ({"error": "Internal Server Error"}, 500, {})
+
+
+async def send_response(send, body, status: int, headers: dict):
+    if isinstance(body, str):
+        body = body.encode()
+    elif not isinstance(body, bytes):
+        body = encode(body)
+    headers = {"content-type": "application/json", **{key.lower(): value for key, value in headers.items()}}
+    headers["content-length"] = str(len(body))
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(key.encode("latin-1"), value.encode("latin-1")) for key, value in headers.items()],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_async_clients()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    request = Request(scope)
+    started = time.perf_counter()
+    io_token = RequestIO.start()
+    endpoint, (body, status_code, headers) = await dispatch(request)
+    elapsed = time.perf_counter() - started
+    io = RequestIO.stop(io_token)
+
+    if endpoint != "metrics":
+        labels = (("endpoint", endpoint or "unmatched"),)
+        Metrics.observe("http_request_duration_seconds",
+                        labels + (("method", request.method), ("status", status_code)), elapsed)
+        # Solo MongoDB informa de su tiempo (CommandListener); Redis asíncrono no está instrumentado
+        seconds, calls = io.get("mongo", (0.0, 0))
+        Metrics.observe("http_request_backend_seconds", labels + (("backend", "mongo"),), seconds)
+        if Config.SERVER_TIMING_ENABLED:
+            headers = {**headers, "Server-Timing":
+                       f'total;dur={elapsed * 1000:.1f}, mongo;dur={seconds * 1000:.1f};desc="{calls} calls"'}
+    await send_response(send, body, status_code, headers)
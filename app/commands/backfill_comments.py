@@ -0,0 +1,63 @@
+"""Recalcula `comments_count` y `recent_comments` de las publicaciones existentes.
+
+Las publicaciones nuevas ya los mantienen al comentar o borrar un
+comentario; este comando corrige los datos anteriores (contadores
+desviados y posts sin vista previa de comentarios).
+
+    export PYTHONPATH=$(pwd)
+    python app/commands/backfill_comments.py [--batch 1000]
+"""
+import argparse
+
+from pymongo import UpdateOne
+
+from app.config import Config
+from app.database import db, init_db
+from app.models.post_models import Comment
+from app.utils.post_fragments import PostFragments
+
+
+def comment_counts() -> dict:
+    pipeline = [{"$group": {"_id": "$post_id", "count": {"$sum": 1}}}]
+    return {group["_id"]: group["count"] for group in db.comments.aggregate(pipeline, allowDiskUse=True)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill de contadores y vista previa de comentarios")
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    init_db()
+    counts = comment_counts()
+    operations, post_ids = [], []
+    updated = 0
+
+    def flush():
+        nonlocal updated
+        updated += db.posts.bulk_write(operations, ordered=False).modified_count
+        PostFragments.invalidate(*post_ids)
+        operations.clear()
+        post_ids.clear()
+
+    for post in db.posts.find({}, {"comments_count": 1, "recent_comments.id": 1}):
+        post_id = str(post["_id"])
+        count = counts.get(post_id, 0)
+        previews = Comment.latest_previews(post_id, Config.RECENT_COMMENTS_SIZE) if count else []
+        current = [preview.get("id") for preview in post.get("recent_comments", [])]
+        if post.get("comments_count") == count and current == [preview["id"] for preview in previews] \
+                and "recent_comments" in post:
+            continue
+        operations.append(UpdateOne(
+            {"_id": post["_id"]},
+            {"$set": {"comments_count": count, "recent_comments": previews}}
+        ))
+        post_ids.append(post_id)
+        if len(operations) >= args.batch:
+            flush()
+    if operations:
+        flush()
+    print(f"publicaciones actualizadas: {updated}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Migra el grafo social de los arrays embebidos a la colección follows.
+
+Crea una arista por cada par seguidor -> seguido encontrado en los arrays
+`followers` / `following` de los usuarios, recalcula los contadores
+desnormalizados y, con --drop-arrays, elimina los arrays de los documentos.
+Se puede ejecutar varias veces: las aristas se insertan con upsert.
+
+    export PYTHONPATH=$(pwd)
+    python app/commands/backfill_follows.py [--drop-arrays] [--batch 1000]
+"""
+import argparse
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from app.database import db, init_db
+
+
+def edge_upsert(follower_id, following_id, now):
+    return UpdateOne(
+        {"follower_id": follower_id, "following_id": following_id},
+        {"$setOnInsert": {"created_at": now}},
+        upsert=True
+    )
+
+
+def backfill_edges(batch_size: int) -> int:
+    now = datetime.utcnow()
+    operations = []
+    written = 0
+    cursor = db.users.find(
+        {"$or": [{"followers.0": {"$exists": True}}, {"following.0": {"$exists": True}}]},
+        {"followers": 1, "following": 1}
+    )
+    for user in cursor:
+        for following_id in user.get("following", []):
+            operations.append(edge_upsert(user["_id"], following_id, now))
+        for follower_id in user.get("followers", []):
+            operations.append(edge_upsert(follower_id, user["_id"], now))
+        if len(operations) >= batch_size:
+            written += db.follows.bulk_write(operations, ordered=False).upserted_count
+            operations = []
+    if operations:
+        written += db.follows.bulk_write(operations, ordered=False).upserted_count
+    return written
+
+
+def recompute_counters(batch_size: int):
+    # Todos a cero y después los valores reales agrupados desde follows
+    db.users.update_many({}, {"$set": {"followers_count": 0, "following_count": 0}})
+    for field, group_key in (("followers_count", "$following_id"), ("following_count", "$follower_id")):
+        operations = []
+        for row in db.follows.aggregate([{"$group": {"_id": group_key, "total": {"$sum": 1}}}]):
+            operations.append(UpdateOne({"_id": row["_id"]}, {"$set": {field: row["total"]}}))
+            if len(operations) >= batch_size:
+                db.users.bulk_write(operations, ordered=False)
+                operations = []
+        if operations:
+            db.users.bulk_write(operations, ordered=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill de la colección follows")
+    parser.add_argument("--drop-arrays", action="store_true",
+                        help="elimina los arrays followers/following de los usuarios")
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    init_db()
+    created = backfill_edges(args.batch)
+    print(f"aristas nuevas: {created}")
+    recompute_counters(args.batch)
+    print("contadores recalculados")
+    if args.drop_arrays:
+        result = db.users.update_many({}, {"$unset": {"followers": "", "following": ""}})
+        print(f"arrays eliminados en {result.modified_count} usuarios")
+
+
+if __name__ == "__main__":
+    main()
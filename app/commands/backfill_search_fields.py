@@ -0,0 +1,39 @@
+"""Rellena `username_search` (username normalizado) en los usuarios existentes.
+
+Los usuarios nuevos y los cambios de username ya lo mantienen; este comando
+solo hace falta una vez para los datos anteriores a la búsqueda por prefijo.
+
+    export PYTHONPATH=$(pwd)
+    python app/commands/backfill_search_fields.py [--batch 1000]
+"""
+import argparse
+
+from pymongo import UpdateOne
+
+from app.database import db, init_db
+from app.utils.text_search import normalize
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill de campos de búsqueda")
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    init_db()
+    operations = []
+    updated = 0
+    for user in db.users.find({"username_search": {"$exists": False}}, {"username": 1}):
+        operations.append(UpdateOne(
+            {"_id": user["_id"]},
+            {"$set": {"username_search": normalize(user.get("username", ""))}}
+        ))
+        if len(operations) >= args.batch:
+            updated += db.users.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += db.users.bulk_write(operations, ordered=False).modified_count
+    print(f"usuarios actualizados: {updated}")
+
+
+if __name__ == "__main__":
+    main()
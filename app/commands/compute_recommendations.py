@@ -0,0 +1,130 @@
+"""Calcula las recomendaciones de "a quién seguir" de todos los usuarios.
+
+Con A la matriz dispersa de seguimiento (A[u, v] = 1 si u sigue a v),
+(A @ A)[u, c] es el número de cuentas seguidas por u que siguen a c. La
+puntuación de cada candidato es ese solapamiento más un término de
+popularidad (log de seguidores, normalizado a [0, 1] y multiplicado por
+RECOMMENDATIONS_POPULARITY_WEIGHT). Se descartan el propio usuario y las
+cuentas que ya sigue, y se guardan los RECOMMENDATIONS_SIZE mejores en
+`recommendations:{user_id}`. Las cuentas más seguidas se guardan en
+`recommendations:popular` para los usuarios sin candidatos.
+
+El producto se calcula por bloques de filas para acotar la memoria.
+Conviene programarlo periódicamente (por ejemplo cada hora):
+
+    export PYTHONPATH=$(pwd)
+    python app/commands/compute_recommendations.py [--block 2000]
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy import sparse
+
+from app.config import Config
+from app.database import init_db
+from app.extensions.redis_extencion import redis_client
+from app.models.follow_models import Follow
+from app.services.recommendation_service import POPULAR_KEY, RecommendationService
+
+
+def load_graph():
+    """Matriz de seguimiento en CSR y la lista índice -> user_id"""
+    index = {}
+    rows, cols = [], []
+    for follower_id, following_id in Follow.iter_edges():
+        rows.append(index.setdefault(follower_id, len(index)))
+        cols.append(index.setdefault(following_id, len(index)))
+    size = len(index)
+    graph = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64))),
+        shape=(size, size)
+    )
+    graph.sum_duplicates()
+    graph.data[:] = 1
+    user_ids = [None] * size
+    for user_id, position in index.items():
+        user_ids[position] = str(user_id)
+    return graph, user_ids
+
+
+def popularity(graph) -> np.ndarray:
+    followers = np.asarray(graph.sum(axis=0)).ravel()
+    scaled = np.log1p(followers)
+    top = scaled.max() if scaled.size else 0
+    return scaled / top if top > 0 else scaled
+
+
+def score_block(graph, rows, popular_score):
+    """Puntuaciones dispersas de los candidatos de un bloque de usuarios"""
+    block_graph = graph[rows]
+    scores = (block_graph @ graph).tocsr()
+    # Fuera las cuentas ya seguidas y el propio usuario
+    self_mask = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (np.arange(len(rows)), rows)),
+        shape=scores.shape
+    )
+    scores = scores - scores.multiply(block_graph) - scores.multiply(self_mask)
+    scores = sparse.csr_matrix(scores)
+    scores.eliminate_zeros()
+    scores.data += Config.RECOMMENDATIONS_POPULARITY_WEIGHT * popular_score[scores.indices]
+    return scores
+
+
+def write_block(scores, rows, user_ids) -> int:
+    pipe = redis_client.pipeline(transaction=False)
+    written = 0
+    for offset, row in enumerate(rows):
+        start, end = scores.indptr[offset], scores.indptr[offset + 1]
+        key = RecommendationService.key(user_ids[row])
+        pipe.delete(key)
+        if start == end:
+            continue
+        candidates = scores.indices[start:end]
+        values = scores.data[start:end]
+        if len(candidates) > Config.RECOMMENDATIONS_SIZE:
+            best = np.argpartition(-values, Config.RECOMMENDATIONS_SIZE)[:Config.RECOMMENDATIONS_SIZE]
+            candidates, values = candidates[best], values[best]
+        pipe.zadd(key, {user_ids[candidate]: float(value) for candidate, value in zip(candidates, values)})
+        pipe.expire(key, Config.RECOMMENDATIONS_TTL)
+        written += 1
+    pipe.execute()
+    return written
+
+
+def write_popular(graph, user_ids):
+    followers = np.asarray(graph.sum(axis=0)).ravel()
+    count = min(Config.RECOMMENDATIONS_POPULAR_SIZE, len(followers))
+    if count == 0:
+        return
+    best = np.argpartition(-followers, count - 1)[:count]
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(POPULAR_KEY)
+    pipe.zadd(POPULAR_KEY, {user_ids[position]: float(followers[position]) for position in best})
+    pipe.execute()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recomendaciones de usuarios a seguir")
+    parser.add_argument("--block", type=int, default=2000, help="usuarios por bloque del producto")
+    args = parser.parse_args()
+
+    init_db()
+    started = time.monotonic()
+    graph, user_ids = load_graph()
+    print(f"grafo: {graph.shape[0]} usuarios, {graph.nnz} aristas")
+
+    popular_score = popularity(graph)
+    write_popular(graph, user_ids)
+
+    # Solo tienen candidatos propios los usuarios que siguen a alguien
+    followers_rows = np.flatnonzero(np.diff(graph.indptr))
+    written = 0
+    for start in range(0, len(followers_rows), args.block):
+        rows = followers_rows[start:start + args.block]
+        written += write_block(score_block(graph, rows, popular_score), rows, user_ids)
+    print(f"recomendaciones guardadas: {written} usuarios en {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
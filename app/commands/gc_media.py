@@ -0,0 +1,71 @@
+"""Borra del almacén de imágenes las que ninguna publicación usa.
+
+Una imagen se puede borrar cuando su refcount es 0 y lleva al menos
+MEDIA_GC_GRACE segundos sin usarse (el margen cubre las subidas cuya
+publicación aún no se ha creado). Con --orphans también se borran los
+ficheros del almacén que no tienen documento en `media`.
+
+    export PYTHONPATH=$(pwd)
+    python app/commands/gc_media.py [--batch 500] [--grace 86400] [--orphans] [--dry-run]
+"""
+import argparse
+import os
+import time
+
+from app.config import Config
+from app.database import init_db
+from app.models.media_models import Media
+from app.utils.media_store import MediaStore
+
+
+def collect_unreferenced(batch, grace, dry_run):
+    removed = 0
+    while True:
+        candidates = Media.find_unreferenced(grace, batch)
+        if not candidates or dry_run:
+            return removed + (len(candidates) if dry_run else 0)
+        for media in candidates:
+            # Se vuelve a comprobar al borrar: pudo reutilizarse entretanto
+            deleted = Media.delete_if_unreferenced(media["_id"], grace)
+            if deleted is None:
+                continue
+            # Una subida concurrente pudo registrarla de nuevo con los mismos ficheros
+            if not Media.exists(media["_id"]):
+                MediaStore.remove(deleted["files"].values())
+            removed += 1
+
+
+def collect_orphans(grace, dry_run):
+    root = MediaStore.absolute_path(Config.MEDIA_FOLDER)
+    cutoff = time.time() - grace
+    removed = 0
+    for folder, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(folder, filename)
+            digest = filename.split("_", 1)[0].split(".", 1)[0]
+            if os.path.getmtime(path) >= cutoff or Media.exists(digest):
+                continue
+            if not dry_run:
+                os.unlink(path)
+            removed += 1
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recolección de imágenes sin usar")
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--grace", type=int, default=Config.MEDIA_GC_GRACE)
+    parser.add_argument("--orphans", action="store_true")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    init_db()
+    removed = collect_unreferenced(args.batch, args.grace, args.dry_run)
+    print(f"imágenes sin referencias {'encontradas' if args.dry_run else 'borradas'}: {removed}")
+    if args.orphans:
+        orphans = collect_orphans(args.grace, args.dry_run)
+        print(f"ficheros huérfanos {'encontrados' if args.dry_run else 'borrados'}: {orphans}")
+
+
+if __name__ == "__main__":
+    main()
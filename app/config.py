@@ -1,4 +1,5 @@
 import os
+import socket
 from datetime import timedelta
 
 class Config:
@@ -11,13 +12,101 @@ class Config:
     UPLOAD_FOLDER = 'static/uploads'
     MAX_IMAGE_SIZE = 50*1024*1024
     MAX_IMAGE_FILES = 10
+    # Límites del multipart (los aplica Werkzeug mientras lee el cuerpo)
+    MAX_CONTENT_LENGTH = MAX_IMAGE_FILES * MAX_IMAGE_SIZE + 1024 * 1024
+    MAX_FORM_PARTS = MAX_IMAGE_FILES + 20
+    MAX_FORM_MEMORY_SIZE = 512 * 1024
+    UPLOAD_SPOOL_THRESHOLD = 1024 * 1024  # a partir de aquí cada fichero se guarda en disco
     IMAGE_QUALITY = 80
     MAX_DIMENSION = 1200
     ALLOWED_EXTENSIONS = {'png','jpg','jpeg'}
+    # Variantes generadas por imagen de publicación: nombre -> lado máximo en px
+    IMAGE_VARIANTS = {'thumb': 320, 'medium': 720, 'full': MAX_DIMENSION}
+    # Formato de las variantes por orden de preferencia ('avif' requiere Pillow con soporte);
+    # la variante mayor se guarda siempre también en JPEG
+    IMAGE_FORMATS = ('webp', 'jpeg')
+    PROFILE_IMAGE_SIZE = 1024
+    MEDIA_FOLDER = 'media'              # almacén direccionado por contenido dentro de static/
+    MEDIA_GC_GRACE = 24 * 3600          # segundos sin referencias antes de poder borrar una imagen
+    IMAGE_POOL_WORKERS = int(os.environ.get('IMAGE_POOL_WORKERS', 0))  # 0 = un proceso por CPU
+    IMAGE_POOL_START_METHOD = 'spawn'   # los workers web tienen hilos: no usar fork
+    IMAGE_POOL_MAX_PENDING = 32         # imágenes en cola/proceso por worker web
+    IMAGE_QUEUE_TIMEOUT = 2             # segundos esperando hueco antes de rechazar
+    IMAGE_PROCESS_TIMEOUT = 20          # segundos máximos por petición
 
     #Configuracion para la conexion con MongoDB
     MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
     DATABASE_NAME = 'social_network_db'
+    # Pool por proceso: cada worker de gunicorn abre hasta MONGO_MAX_POOL_SIZE conexiones por servidor
+    MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 50))
+    MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_MAX_IDLE_TIME_MS = 60000          # cierra las conexiones sin usar pasado este tiempo
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = 2000      # espera máxima por una conexión libre del pool
+    MONGO_CONNECT_TIMEOUT_MS = 5000
+    MONGO_SOCKET_TIMEOUT_MS = 10000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = 5000
+    # Por orden de preferencia; se ignoran los que no tengan su módulo instalado
+    # (zstd -> zstandard, snappy -> python-snappy)
+    MONGO_COMPRESSORS = tuple(os.environ.get('MONGO_COMPRESSORS', 'zstd,snappy,zlib').split(','))
 
     #Configuracion para la conexion con Redis
     REDIS_URL = os.environ.get("REDIS_URI","redis://localhost:6379/0")
+    REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))  # por proceso
+    REDIS_POOL_TIMEOUT = 2                  # espera máxima por una conexión libre del pool
+    REDIS_SOCKET_TIMEOUT = 5
+    REDIS_CONNECT_TIMEOUT = 2
+    REDIS_SOCKET_KEEPALIVE = True
+    REDIS_HEALTH_CHECK_INTERVAL = 30        # PING antes de reutilizar una conexión inactiva
+    # Pool aparte sin socket_timeout para BRPOP/BLMOVE y pub/sub, que esperan
+    # más que REDIS_SOCKET_TIMEOUT cuando no hay nada que leer
+    REDIS_BLOCKING_MAX_CONNECTIONS = 4
+
+    #Configuracion de /health/ready
+    HEALTH_CHECK_TIMEOUT = 1                # segundos para el ping a MongoDB (Redis usa REDIS_SOCKET_TIMEOUT)
+
+    #Configuracion para la distribucion de publicaciones en los feeds
+    FEED_MAX_LENGTH = 800                   # publicaciones guardadas por feed de usuario
+    FEED_BUILT_TTL = 300                    # segundos que un feed reconstruido vacío no se vuelve a reconstruir
+    FANOUT_BATCH_SIZE = 1000                # seguidores escritos por pipeline
+    CELEBRITY_FOLLOWER_THRESHOLD = 10000    # a partir de aqui se distribuye en lectura
+    # 'queue': la distribucion la hace app/workers/fanout_worker.py
+    # 'inline': se procesa en el mismo proceso (tests / desarrollo sin worker)
+    FANOUT_MODE = os.environ.get('FANOUT_MODE', 'queue')
+    FANOUT_QUEUE_BATCH = 100
+    FANOUT_MAX_ATTEMPTS = 5
+    FANOUT_RETRY_DELAY = 2                  # segundos antes del primer reintento; se dobla en cada uno
+    FANOUT_RETRY_MAX_DELAY = 300
+    # Identifica la lista de proceso del worker; con varios workers en una máquina, uno distinto por worker
+    FANOUT_WORKER_ID = os.environ.get('FANOUT_WORKER_ID', socket.gethostname())
+    GLOBAL_FEED_TTL = 600                   # segundos hasta reconstruir feed:global desde MongoDB
+    GLOBAL_FEED_REFRESH_AHEAD = 60          # se refresca en segundo plano cuando le queda menos
+    GLOBAL_FEED_WAIT = 2                    # espera máxima de una petición en frío mientras otra reconstruye
+
+    #Configuracion para los comentarios
+    RECENT_COMMENTS_SIZE = 3    # vista previa guardada en cada post (recent_comments)
+    COMMENTS_PAGE_SIZE = 20
+
+    #Configuracion para los likes (contadores en Redis volcados a MongoDB)
+    LIKE_FLUSH_INTERVAL = 5   # segundos entre volcados
+
+    #Configuracion de la cache de vistas (app/utils/cache.py)
+    CACHE_STALE_TTL = 300            # segundos que se sirve un valor caducado mientras se recalcula
+    CACHE_LOCK_TTL = 30              # duración máxima de un cálculo con el lock tomado
+    CACHE_LOCK_WAIT = 2              # espera máxima de las peticiones que no tienen el lock
+    CACHE_XFETCH_BETA = 1.0          # >1 refresca antes, <1 más tarde
+    SEARCH_CACHE_TTL = 3600
+    POST_FRAGMENT_TTL = 120          # JSON ya renderizado de cada post (app/utils/post_fragments.py)
+
+    #Configuracion para las recomendaciones (app/commands/compute_recommendations.py)
+    RECOMMENDATIONS_SIZE = 50                 # candidatos guardados por usuario
+    RECOMMENDATIONS_POPULAR_SIZE = 200
+    RECOMMENDATIONS_POPULARITY_WEIGHT = 0.5   # peso de la popularidad frente a los amigos en común
+    RECOMMENDATIONS_TTL = 3 * 24 * 3600
+
+    #Configuracion de las metricas (/metrics y cabecera Server-Timing)
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+
+    #Configuracion para la cache de perfiles publicos
+    PROFILE_CACHE_TTL = 300          # segundos en Redis
+    PROFILE_CACHE_LOCAL_TTL = 15     # segundos en la cache local de cada proceso
+    PROFILE_CACHE_LOCAL_SIZE = 10000
@@ -1,10 +1,11 @@
-import time
 from flask import Blueprint, request, jsonify,current_app,url_for
 from app.services.user_service import UserService
 from flask_jwt_extended import create_access_token,jwt_required,get_jwt
 from datetime import datetime,timedelta,timezone
-from app.extensions.redis_extencion import redis_client
+from app.utils.revocation_cache import RevocationCache
 from app.utils.upload_file import UploadFile
+from app.utils.image_pool import ImagePoolBusy
+from werkzeug.exceptions import HTTPException
 auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/signup', methods=['POST'])
@@ -28,11 +29,13 @@ def register():
             is_private=is_private
         )
 
+        url = ""
         if image:
             uploader = UploadFile(user_id, 'profile')
             saved_path = uploader.process_image(image)
-            url = url_for('static', filename=saved_path, _external=True)
-            UserService.update_user_profile(user_id, {'profile_pic_url': url})
+            if saved_path:
+                url = url_for('static', filename=saved_path, _external=True)
+                UserService.update_user_profile(user_id, {'profile_pic_url': url})
 
         token = create_access_token(
             identity=str(user_id),
@@ -53,6 +56,11 @@ def register():
 
     except ValueError as e:
         return jsonify({'message': str(e)}), 400
+    except ImagePoolBusy as e:
+        return jsonify({'message': str(e)}), 503
+    except HTTPException:
+        # 413 de los límites de subida
+        raise
     except Exception as e:
         current_app.logger.exception("Error registering user")
         return jsonify({'message': 'Error registering user'}), 500
@@ -104,7 +112,7 @@ def login():
 def logout():
     jti = get_jwt()['jti']
     exp = get_jwt()['exp']
-    ttl = exp-int(time.time())
 
-    redis_client.setex(f"revoked:{jti}",ttl,"true")
+    # Guarda la revocación y la publica a todos los workers
+    RevocationCache.revoke(jti, exp)
     return jsonify(msg="Token revocado exitosamente"),200
\ No newline at end of file
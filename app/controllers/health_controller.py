@@ -0,0 +1,16 @@
+from flask import Blueprint, jsonify
+from app.services.health_service import HealthService
+
+health_bp = Blueprint('health', __name__)
+
+
+@health_bp.route('/live', methods=['GET'])
+def live():
+    # El proceso responde; no toca MongoDB ni Redis
+    return jsonify({'status': 'ok'}), 200
+
+
+@health_bp.route('/ready', methods=['GET'])
+def ready():
+    result, status_code = HealthService.readiness()
+    return jsonify(result), status_code
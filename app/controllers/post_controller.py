@@ -1,43 +1,94 @@
-from flask import Blueprint, request, jsonify,current_app,url_for
+from flask import Blueprint, Response, request, jsonify,current_app,url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity,verify_jwt_in_request
 from app.services.post_service import PostService
+from app.models.post_models import Comment, Post
 from app.extensions.redis_extencion import redis_client
 from app.middleware.ratelimit_middleware import rate_limiter
 from app.utils.upload_file import UploadFile
+from app.utils.image_pool import ImagePoolBusy
+from app.models.media_models import MediaUnavailable
 from app.utils.feed_cache import FeedCache
+from app.utils.author_hydration import AuthorHydration
+from app.utils.pagination import Cursor
+from app.utils.responses import json_response
+from app.config import Config
 from datetime import datetime
 import json
 import os
 
 post_bp = Blueprint('post', __name__)
 
-def reload_feed_machine():
-    post_ids:list = FeedCache.get_feed_global()  
-    if post_ids == []:
-        FeedCache.repopulate_global_feed()
-    return FeedCache.get_feed_global()
+@post_bp.after_request
+def report_author_hydration(response):
+    # Consultas de autores ahorradas por la hidratación en lote
+    saved = AuthorHydration.saved_round_trips()
+    if saved:
+        response.headers['X-Author-Round-Trips-Saved'] = str(saved)
+    return response
+
+def reload_feed_machine(limit=20, after=None):
+    FeedCache.ensure_global_feed()
+    return FeedCache.get_feed_global(limit, after)
+
+def feed_cursor(source, next_after):
+    # El cursor recuerda de qué feed viene para poder seguir en el mismo
+    if next_after is None:
+        return None
+    return Cursor.encode([source, *next_after])
 
 @post_bp.route('/', methods=['GET'])
 @rate_limiter(limit=100, period=60)
 def get_posts():
     verify_jwt_in_request(optional=True)
     user_id = get_jwt_identity()
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 20))
-    post_ids:list = []
+    try:
+        limit = Cursor.limit_from_request(request.args, 20)
+        # (origen, score, post_id)
+        cursor = Cursor.from_request(request.args, 3)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    source, after = (cursor[0], cursor[1:]) if cursor else (None, None)
 
-    if user_id is  None:
-        post_ids = reload_feed_machine()
-    else:    
-        post_ids:list = FeedCache.get_feed_user(user_id,10)
-        if post_ids == []:
-            FeedCache.repopulate_user_feed(user_id)
-            post_ids:list = FeedCache.get_feed_user(user_id,10)
-            
-    if post_ids == []:
-        post_ids = reload_feed_machine()
-    result, status_code = PostService.get_posts(post_ids, page, limit)
-    return jsonify(result), status_code
+    post_ids:list = []
+    next_after = None
+    use_user_feed = user_id is not None and source in (None, 'user')
+    if use_user_feed:
+        post_ids, next_after = FeedCache.get_feed_user(user_id, limit, after)
+        if post_ids == [] and after is None:
+            FeedCache.ensure_user_feed(user_id)
+            post_ids, next_after = FeedCache.get_feed_user(user_id, limit, after)
+            # Sin feed propio se muestra el global
+            use_user_feed = post_ids != []
+
+    if not use_user_feed:
+        post_ids, next_after = reload_feed_machine(limit, after if source == 'global' else None)
+    source = 'user' if use_user_feed else 'global'
+    body, status_code = PostService.get_posts(post_ids, limit, feed_cursor(source, next_after), user_id)
+    return Response(body, status=status_code, mimetype='application/json')
+
+
+def media_urls(variants):
+    # {variante: ruta} -> {variante: URL pública}
+    return {
+        name: url_for('static', filename=path, _external=True)
+        for name, path in variants.items()
+    }
+
+
+def save_with_media(uploader, files, save):
+    """Procesa las imágenes y llama a save(urls, media_ids).
+
+    Si gc_media borró una imagen reutilizada antes de referenciarla, las
+    subidas se procesan de nuevo (una vez) y se vuelven a registrar.
+    """
+    for attempt in range(2):
+        saved_paths = uploader.process_images(files)
+        urls = [media_urls(variants) for _, variants in saved_paths]
+        try:
+            return save(urls, [media_id for media_id, _ in saved_paths])
+        except MediaUnavailable:
+            if attempt:
+                raise
 
 
 @post_bp.route('/', methods=['POST'])
@@ -48,44 +99,43 @@ def create_post():
     files = request.files.getlist('image')  # múltiples archivos con el campo 'image'
 
     uploader = UploadFile(username=user_id, target_folder="posts")
-    saved_paths = uploader.process_images(files)
-    print(saved_paths)
-    urls = [
-        url_for('static', filename=path, _external=True)
-        for path in saved_paths
-    ]
-    print(urls)
-
-    result, status_code = PostService.create_post(
-        user_id=user_id,
-        content=content,
-        media_urls=urls
-    )
-    FeedCache.add_post_to_feed(user_id,result['post_id'])
+    try:
+        result, status_code = save_with_media(uploader, files, lambda urls, media_ids: PostService.create_post(
+            user_id=user_id,
+            content=content,
+            media_urls=urls,
+            media_ids=media_ids
+        ))
+    except ImagePoolBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
 
     return jsonify(result),status_code
     
 
 @post_bp.route('/<post_id>', methods=['GET'])
 def get_post(post_id):
-    result, status_code = PostService.get_post(post_id)
-    return jsonify(result), status_code
+    verify_jwt_in_request(optional=True)
+    result, status_code = PostService.get_post(post_id, get_jwt_identity())
+    return json_response(result, status_code)
 
 @post_bp.route("/<post_id>",methods=["PUT"])
+@jwt_required()
 def update_post(post_id):
     user_id = get_jwt_identity()
     content = request.form.get('content', '')
     files = request.files.getlist('image')
-    urls = None
+    def save(urls=None, media_ids=None):
+        return PostService.update_post(post_id,user_id=user_id,content=content,
+                                       media_urls=urls,media_ids=media_ids)
+
     if files != []:
         uploader = UploadFile(username=user_id, target_folder="posts")
-        saved_paths = uploader.process_images(files)
-
-        urls = [
-            url_for('static', filename=path, _external=True)
-            for path in saved_paths
-        ]
-    result,status_code = PostService.update_post(post_id,user_id=user_id,content=content,urls=urls)
+        try:
+            result,status_code = save_with_media(uploader, files, save)
+        except ImagePoolBusy as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    else:
+        result,status_code = save()
     return jsonify(result),status_code
 
 
@@ -102,25 +152,28 @@ def delete_post(post_id):
 @jwt_required()
 def get_feed():
     user_id = get_jwt_identity()
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 20))
+    try:
+        limit = Cursor.limit_from_request(request.args, 20)
+        after = Cursor.from_request(request.args, len(Post.PAGE_FIELDS))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    result, status_code = PostService.get_feed(user_id, page, limit)
+    body, status_code = PostService.get_feed(user_id, limit, after)
     
-    return jsonify(result), status_code
+    return Response(body, status=status_code, mimetype='application/json')
 
 @post_bp.route('/<post_id>/like', methods=['POST'])
 @rate_limiter(limit=100, period=60)
 @jwt_required()
 def like_post(post_id):
-    result, status_code = PostService.like_post(post_id)
+    result, status_code = PostService.like_post(post_id, get_jwt_identity())
     
     return jsonify(result), status_code
 
 @post_bp.route('/<post_id>/dislike', methods=['POST'])
 @jwt_required()
 def dislike_post_controller(post_id):
-    result, status_code = PostService.dislike_post(post_id)
+    result, status_code = PostService.dislike_post(post_id, get_jwt_identity())
     return jsonify(result), status_code
 
 @post_bp.route('/<post_id>/comment', methods=['POST'])
@@ -136,8 +189,13 @@ def comment_post(post_id):
 
 @post_bp.route('/<post_id>/comment', methods=['GET'])
 def view_comment_post(post_id):
-    result,status_code = PostService.view_comment(post_id)
-    return jsonify(result), status_code
+    try:
+        limit = Cursor.limit_from_request(request.args, Config.COMMENTS_PAGE_SIZE)
+        after = Cursor.from_request(request.args, len(Comment.PAGE_FIELDS))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    result,status_code = PostService.view_comment(post_id, limit, after)
+    return json_response(result, status_code)
 
 @post_bp.delete("/<post_id>/comment/<comment_id>")
 @jwt_required()
@@ -4,26 +4,35 @@ from flask_jwt_extended import jwt_required,get_jwt_identity,verify_jwt_in_reque
 from datetime import datetime, timedelta
 from app.services.user_service import UserService
 from bson import ObjectId
-from services.time_line_service import TimeLineService
 from app.models.post_models import Post
+from app.models.user_models import User
 from app.services.post_service import PostService
+from app.services.recommendation_service import RecommendationService
 from app.middleware.user_middleware import verify_current_user
 from app.extensions.redis_extencion import redis_client
 from app.utils.upload_file import UploadFile
-import json
+from app.utils.pagination import Cursor
+from app.utils.cache import Cache
+from app.utils.responses import UserProfile, UserSummary, json_response
+from app.config import Config
 
 
 # Create Blueprint
 user_bp = Blueprint('user', __name__)
 
+# Publicaciones incluidas en la primera página del perfil
+PROFILE_POSTS_PAGE = 20
+
 @user_bp.route("/profile/picture",methods=["PUT"])
 @jwt_required()
 def update_picture_profile():
     user_id = get_jwt_identity()
-    image = request.form.get('profile_pic_url')
+    image = request.files.get('profile_pic_url')
+    if image is None:
+        return jsonify({'error':'No se envió ninguna imagen'}),400
     update_file = UploadFile(username=user_id,target_folder='profile')
     path_url = update_file.process_image(file=image)
-    if url is None:
+    if path_url is None:
         return jsonify({'error':'No se pudo procesar la imagen'}),400
     url = url_for('static',filename=path_url,_external=True)
     result = UserService.update_photo_profile(user_id,new_url=url)
@@ -139,49 +148,49 @@ def check_follower():
 @user_bp.route('/<username>', methods=['GET'])
 def get_user_by_username(username):
     """Get public user profile by username"""
-    user = UserService.get_user_by_username(username)
+    user = UserService.get_public_profile_by_username(username)
 
     if not user:
         return jsonify({'message': 'User not found'}), 404
-    user_id = str(user['_id'])
+    user_id = user['id']
     try:
-        post = Post.find_by_user(user_id)
-        processed_posts = [
-                {
-                    "id": str(post['_id']),
-                    "content": post['content'],
-                    "media_urls": post.get('media_urls', []),  # Usa get() para campos opcionales
-                    "likes_count": post.get('likes_count', 0),
-                    "reposts_count": post.get('reposts_count', 0),
-                    "created_at": post['created_at'].isoformat(),  # Convierte datetime a ISO string
-                    "author": {
-                        "id": user_id,  # Asume que 'user' está disponible en el contexto
-                        "username": user['username'],
-                        "profile_pic_url": user.get('profile_pic_url', '')
-                    }
-                }
-                for post in Post.collection.find({"user_id": user_id})
-            ]
+        verify_jwt_in_request(optional=True)
+        posts_page = PostService.get_user_posts(user, limit=PROFILE_POSTS_PAGE, viewer_id=get_jwt_identity())
     except Exception:
-        processed_posts=[]
-    # Remove sensitive information
-    user_data = {
-            "id":str(user['_id']),
-            "username":user['username'],
-            "email":user['email'],
-            "bio": user['bio'],
-            "profile_pic_url":user['profile_pic_url'],
-            "followers": len(user['followers']),
-            "following": len(user['following']),
-            "posts":processed_posts
-        } 
-    # Include email only if user allows it
-    if user.get('privacy', {}).get('show_email', False):
-        user_data['email'] = user['email']
-    #add en redis
-    return jsonify({
+        current_app.logger.exception("Error loading profile posts")
+        posts_page = {"posts": [], "next_cursor": None}
+    # El perfil cacheado ya solo contiene campos públicos
+    # (el email solo aparece si el usuario permite mostrarlo)
+    user_data = UserProfile(
+            id=user_id,
+            username=user['username'],
+            bio=user['bio'],
+            profile_pic_url=user['profile_pic_url'],
+            followers=user['followers_count'],
+            following=user['following_count'],
+            posts_count=PostService.count_user_posts(user_id),
+            posts=posts_page['posts'],
+            posts_next_cursor=posts_page['next_cursor'],
+            email=user.get('email')
+        )
+    return json_response({
         'user': user_data
-    }), 200
+    })
+
+
+@user_bp.route('/<username>/posts', methods=['GET'])
+def get_user_posts(username):
+    """Paginated posts of a public profile"""
+    user = UserService.get_public_profile_by_username(username)
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+    try:
+        limit = Cursor.limit_from_request(request.args, PROFILE_POSTS_PAGE)
+        after = Cursor.from_request(request.args, len(Post.PAGE_FIELDS))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    verify_jwt_in_request(optional=True)
+    return json_response(PostService.get_user_posts(user, limit, after, get_jwt_identity()))
 
 
 @user_bp.route('/<username>/follow', methods=['POST'])
@@ -190,101 +199,90 @@ def follow_user(username):
     """Follow a user"""
     user_id = get_jwt_identity()
     redis_key = f"following:{user_id}"
-    target_user = UserService.get_user_by_username(username)
-    key_verify = f"recommendations:users:{user_id}"
-    if redis_client.exists(key_verify):
-        redis_client.delete(key_verify)
+    target_user = UserService.get_public_profile_by_username(username)
     if not target_user:
         return jsonify({'message': 'User not found'}), 404
-    target_user_id = str(target_user['_id'])
-
-    if redis_client.exists(redis_key):
-        redis_client.sadd(redis_key,target_user_id)
+    target_user_id = target_user['id']
     try:
-        if UserService.follow_user(user_id, target_user_id):
-            return jsonify({'message': f'Now following {username}'}), 200
-        else:
+        if not UserService.follow_user(user_id, target_user_id):
             return jsonify({'message': 'Error following user'}), 400
-            
     except ValueError as e:
         return jsonify({'message': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error following user: {str(e)}")
         return jsonify({'message': 'Error following user'}), 500
 
+    # Los sets de Redis se tocan solo con la relación ya guardada en MongoDB
+    RecommendationService.discard(user_id, target_user_id)
+    if redis_client.exists(redis_key):
+        redis_client.sadd(redis_key,target_user_id)
+    # Mantener el set de seguidores que usa la distribución de posts
+    followers_key = f"followers:{target_user_id}"
+    if redis_client.exists(followers_key):
+        redis_client.sadd(followers_key,user_id)
+    return jsonify({'message': f'Now following {username}'}), 200
+
 
 @user_bp.route('/<username>/unfollow', methods=['POST'])
 @jwt_required()
 def unfollow_user(username):
     """Unfollow a user"""
     user_id = get_jwt_identity()
-    target_user = UserService.get_user_by_username(username)
+    target_user = UserService.get_public_profile_by_username(username)
     redis_key = f"following:{user_id}"
-    key_verify = f"recommendations:users:{user_id}"
-    if redis_client.exists(key_verify):
-        redis_client.delete(key_verify) 
     if not target_user:
         return jsonify({'message': 'User not found'}), 404
         
-    target_user_id = str(target_user['_id'])
-    if redis_client.exists(redis_key):
-        redis_client.srem(redis_key,target_user_id)
+    target_user_id = target_user['id']
     try:
-        if UserService.unfollow_user(user_id, target_user_id):
-            return jsonify({'message': f'Unfollowed {username}'}), 200
-        else:
+        if not UserService.unfollow_user(user_id, target_user_id):
             return jsonify({'message': 'Error unfollowing user'}), 400
-            
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error unfollowing user: {str(e)}")
         return jsonify({'message': 'Error unfollowing user'}), 500
 
+    if redis_client.exists(redis_key):
+        redis_client.srem(redis_key,target_user_id)
+    redis_client.srem(f"followers:{target_user_id}",user_id)
+    return jsonify({'message': f'Unfollowed {username}'}), 200
 
-import json
 
 @user_bp.route('/search', methods=['GET'])
 def search():
     query = request.args.get('q', '')
-    limit = int(request.args.get('limit', 20))
-    skip = int(request.args.get('skip', 0))
+    cursor = request.args.get('cursor', '')
     
     if not query:
         return jsonify({'message': 'Missing search query'}), 400
+    try:
+        limit = Cursor.limit_from_request(request.args, 20)
+        after = Cursor.decode(cursor, len(User.SEARCH_FIELDS)) if cursor else None
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    # Key para Redis que identifica la búsqueda con parámetros
-    redis_key = f"search:{query}:{limit}:{skip}"
-    
-    # Intentamos obtener resultados cacheados
-    cached = redis_client.get(redis_key)
-    if cached:
-        # Si existe cache, devolvemos directamente
-        return cached, 200, {'Content-Type': 'application/json'}
-    
-    # Si no hay cache, hacemos las búsquedas en BD
-    users = UserService.search_users(query, limit, skip)
-    
-    users_data = []
-    for user in users:
-        user_data = {
-            'username': user['username'],
-            'bio': user['bio'],
-            'profile_pic_url': user['profile_pic_url']
+    def compute():
+        users, next_cursor = UserService.search_users(query, limit, after)
+        users_data = []
+        for user in users:
+            user_data = {
+                'username': user['username'],
+                'bio': user['bio'],
+                'profile_pic_url': user['profile_pic_url']
+            }
+            if user.get('privacy', {}).get('show_email', False):
+                user_data['email'] = user['email']
+            users_data.append(user_data)
+        return {
+            'users': users_data,
+            'count_users': len(users_data),
+            'next_cursor': next_cursor,
         }
-        if user.get('privacy', {}).get('show_email', False):
-            user_data['email'] = user['email']
-        users_data.append(user_data)
-    
-    
-    
-    response = {
-        'users': users_data,
-        'count_users': len(users_data),
-    }
-    
-    # Guardamos en Redis el resultado serializado a JSON con expiración (p.ej. 1 hora)
-    redis_client.set(redis_key, json.dumps(response), ex=3600)
-    
-    return jsonify(response), 200
+
+    # La clave identifica la búsqueda con sus parámetros
+    response = Cache.get_or_compute("search", f"{query}:{limit}:{cursor}", compute, Config.SEARCH_CACHE_TTL)
+    return json_response(response)
 
 
 
@@ -292,17 +290,12 @@ def search():
 @jwt_required()
 def users_recommend():
     user_id = get_jwt_identity()
-    users:list = TimeLineService.get_list_user(user_id=user_id)
-    if users != []:
-        cache_key = f"recommendations:users:{user_id}"
-        if redis_client.exists(cache_key) and users != []:
-            cached = redis_client.get(cache_key)
-            return jsonify(json.loads(cached))
-        users = [{
-            'username':user['username'],
-            'profile_pic_url':user['profile_pic_url']}
-            for user in users
-            ]
-        redis_client.set(cache_key, json.dumps(users), ex=3600)
-        return users
-    return []
\ No newline at end of file
+    try:
+        limit = Cursor.limit_from_request(request.args, 5)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    users = RecommendationService.get_recommendations(user_id, limit)
+    return json_response([
+        UserSummary(username=user['username'], profile_pic_url=user['profile_pic_url'])
+        for user in users
+    ])
@@ -1,9 +1,43 @@
-from pymongo import MongoClient, ASCENDING,DESCENDING
+import importlib.util
+
+from pymongo import MongoClient, ASCENDING,DESCENDING,TEXT
 from app.config import Config
 from pymongo.errors import OperationFailure
-# Cliente MongoDB
-client = MongoClient(Config.MONGO_URI)
-db = client[Config.DATABASE_NAME]
+from app.extensions.clients import LazyClient, LazyDatabase
+from app.utils.metrics import MongoCommandMetrics, MongoPoolMetrics
+
+# Módulo de Python que necesita cada compresor de PyMongo
+_COMPRESSOR_MODULES = {'zstd': 'zstandard', 'snappy': 'snappy', 'zlib': 'zlib'}
+
+
+def available_compressors(names) -> list:
+    return [name for name in names
+            if name in _COMPRESSOR_MODULES and importlib.util.find_spec(_COMPRESSOR_MODULES[name])]
+
+
+def client_options() -> dict:
+    """Opciones del pool comunes al cliente síncrono y al asíncrono (app/asgi.py)"""
+    # Los listeners suman el tiempo de cada comando a la petición en curso y miden el pool
+    return dict(
+        maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+        minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=Config.MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=Config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        connectTimeoutMS=Config.MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=Config.MONGO_SOCKET_TIMEOUT_MS,
+        serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        compressors=available_compressors(Config.MONGO_COMPRESSORS) or None,
+        event_listeners=[MongoCommandMetrics(), MongoPoolMetrics()],
+    )
+
+
+def create_client() -> MongoClient:
+    return MongoClient(Config.MONGO_URI, **client_options())
+
+
+# Cliente MongoDB perezoso: se crea en cada proceso (worker) al primer uso
+client = LazyClient('mongo', create_client)
+db = LazyDatabase(client, Config.DATABASE_NAME)
 def init_db():
     def ensure_index(collection, keys, **kwargs):
         index_name = kwargs.get('name', '_'.join(f"{k}_{v}" for k, v in keys))
@@ -32,5 +66,22 @@ def init_db():
     #indices para posts
     ensure_index(db.posts, [('user_id', ASCENDING), ('created_at', DESCENDING)], name='post_user_date_index')
 
+    # Paginación por keyset (created_at, _id) del feed y de los listados globales
+    ensure_index(db.posts, [('user_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)], name='post_user_date_id_index')
+    ensure_index(db.posts, [('created_at', DESCENDING), ('_id', DESCENDING)], name='post_date_id_index')
+
+    # Búsqueda: índices de texto y prefijo de username normalizado
+    ensure_index(db.posts, [('content', TEXT)], name='post_text_index', default_language='spanish')
+    ensure_index(db.users, [('username', TEXT), ('bio', TEXT)], name='user_text_index',
+                 weights={'username': 5, 'bio': 1}, default_language='spanish')
+    ensure_index(db.users, [('username_search', ASCENDING)], name='username_search_index')
+
+    # Comentarios de un post paginados por keyset (created_at, _id)
+    ensure_index(db.comments, [('post_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)], name='comment_post_date_index')
+
+    # Almacén de imágenes: reutilizar subidas repetidas y recoger las que no se usan
+    ensure_index(db.media, [('source_hashes', ASCENDING)], name='media_source_index')
+    ensure_index(db.media, [('refcount', ASCENDING), ('updated_at', ASCENDING)], name='media_gc_index')
+
     
     return db
\ No newline at end of file
@@ -0,0 +1,33 @@
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.database import AsyncDatabase
+from redis import asyncio as aioredis
+
+from app.config import Config
+from app.database import client_options
+from app.extensions.clients import LazyClient, LazyDatabase, LazyRedis
+from app.extensions.redis_extencion import pool_options
+
+
+def create_async_mongo() -> AsyncMongoClient:
+    return AsyncMongoClient(Config.MONGO_URI, **client_options())
+
+
+def create_async_redis() -> aioredis.Redis:
+    pool = aioredis.BlockingConnectionPool.from_url(Config.REDIS_URL, **pool_options())
+    return aioredis.Redis(connection_pool=pool)
+
+
+# Clientes del modo ASGI (app/asgi.py): se crean en el primer uso dentro
+# del bucle de eventos de cada worker y se cierran al apagarlo
+async_mongo = LazyClient('mongo-async', create_async_mongo)
+async_db = LazyDatabase(async_mongo, Config.DATABASE_NAME, AsyncDatabase)
+async_redis = LazyRedis('redis-async', create_async_redis)
+
+
+async def close_async_clients():
+    redis = async_redis.detach()
+    if redis is not None:
+        await redis.aclose()
+    mongo = async_mongo.detach()
+    if mongo is not None:
+        await mongo.close()
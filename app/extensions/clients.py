@@ -0,0 +1,139 @@
+import os
+import threading
+
+from pymongo.database import Database
+
+
+class LazyClient:
+    """Proxy que crea el cliente real la primera vez que se usa en cada proceso.
+
+    Los módulos importan el proxy al arrancar, pero las conexiones no se
+    abren hasta la primera petición. Tras un fork (workers de gunicorn con
+    --preload, eventlet) el hijo descarta el cliente del padre sin cerrarlo
+    —sus sockets siguen siendo del padre— y crea el suyo.
+    """
+
+    def __init__(self, name: str, factory):
+        self._name = name
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+                client = self._client
+        return client
+
+    @property
+    def initialized(self) -> bool:
+        return self._client is not None
+
+    def detach(self):
+        """Quita el cliente del proxy y lo devuelve (None si no se había creado)"""
+        with self._lock:
+            client, self._client = self._client, None
+        return client
+
+    def close(self):
+        client = self.detach()
+        if client is not None:
+            client.close()
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def __repr__(self):
+        state = "inicializado" if self.initialized else "sin inicializar"
+        return f"<LazyClient {self._name} ({state})>"
+
+
+class LazyScript:
+    """Script Lua de Redis registrado contra el cliente vigente del proceso"""
+
+    def __init__(self, client: LazyClient, source: str):
+        self._client = client
+        self._source = source
+        self._bound = None
+        self._script = None
+
+    def __call__(self, keys=None, args=None, client=None):
+        real = self._client.get()
+        if self._bound is not real:
+            self._script = real.register_script(self._source)
+            self._bound = real
+        return self._script(keys=keys or [], args=args or [], client=client)
+
+
+class LazyRedis(LazyClient):
+    def register_script(self, source: str) -> LazyScript:
+        # Los scripts se registran al importar los módulos: no deben crear el cliente
+        return LazyScript(self, source)
+
+
+class LazyCollection:
+    """Colección de MongoDB resuelta contra el cliente vigente del proceso"""
+
+    def __init__(self, database: "LazyDatabase", name: str):
+        self._database = database
+        self._name = name
+        self._bound = None
+        self._collection = None
+
+    def get(self):
+        client = self._database.client.get()
+        if self._bound is not client:
+            self._collection = client[self._database.name][self._name]
+            self._bound = client
+        return self._collection
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def __getitem__(self, name):
+        return self.get()[name]
+
+    def __repr__(self):
+        return f"<LazyCollection {self._database.name}.{self._name}>"
+
+
+class LazyDatabase:
+    """Base de datos perezosa: `db.posts` devuelve una colección perezosa.
+
+    `database_class` es Database o AsyncDatabase según el cliente.
+    """
+
+    def __init__(self, client: LazyClient, name: str, database_class=Database):
+        self.client = client
+        self.name = name
+        self._database_class = database_class
+        self._collections = {}
+
+    def get(self):
+        return self.client.get()[self.name]
+
+    def collection(self, name: str) -> LazyCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections.setdefault(name, LazyCollection(self, name))
+        return collection
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        # Los métodos de Database (command, list_collection_names...) van al objeto real
+        if hasattr(self._database_class, name):
+            return getattr(self.get(), name)
+        return self.collection(name)
+
+    def __getitem__(self, name):
+        return self.collection(name)
@@ -1,15 +1,47 @@
 from flask_jwt_extended import JWTManager
-from redis import Redis
+from app.extensions.clients import LazyRedis
+from app.utils.metrics import InstrumentedConnectionPool, InstrumentedRedis
 from flask import Flask
 from app.config import Config
 
 jwt = JWTManager()
-redis_client = Redis.from_url(Config.REDIS_URL, decode_responses=True)
+
+
+def pool_options() -> dict:
+    """Opciones del pool comunes al cliente síncrono y al asíncrono (app/asgi.py)"""
+    return dict(
+        decode_responses=True,
+        max_connections=Config.REDIS_MAX_CONNECTIONS,
+        timeout=Config.REDIS_POOL_TIMEOUT,
+        socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=Config.REDIS_CONNECT_TIMEOUT,
+        socket_keepalive=Config.REDIS_SOCKET_KEEPALIVE,
+        health_check_interval=Config.REDIS_HEALTH_CHECK_INTERVAL,
+    )
+
+
+def create_redis() -> InstrumentedRedis:
+    pool = InstrumentedConnectionPool.from_url(Config.REDIS_URL, **pool_options())
+    return InstrumentedRedis(connection_pool=pool)
+
+
+def create_blocking_redis() -> InstrumentedRedis:
+    options = pool_options()
+    options.update(socket_timeout=None, max_connections=Config.REDIS_BLOCKING_MAX_CONNECTIONS)
+    pool = InstrumentedConnectionPool.from_url(Config.REDIS_URL, pool_name="blocking", **options)
+    return InstrumentedRedis(connection_pool=pool)
+
+
+# Cliente Redis perezoso: se crea en cada proceso (worker) al primer uso
+redis_client = LazyRedis('redis', create_redis)
+# Solo para lecturas bloqueantes (colas) y suscripciones pub/sub
+blocking_redis_client = LazyRedis('redis-blocking', create_blocking_redis)
 
 def init_extensions(app: Flask):
     jwt.init_app(app)
     # Registrar función para verificar tokens revocados
     @jwt.token_in_blocklist_loader
     def is_token_revoked(jwt_header, jwt_payload):
-        jti = jwt_payload["jti"]
-        return redis_client.get(f"revoked:{jti}") == "true"
+        # Import diferido: revocation_cache importa redis_client de este módulo
+        from app.utils.revocation_cache import RevocationCache
+        return RevocationCache.is_revoked(jwt_payload["jti"])
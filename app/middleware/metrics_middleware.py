@@ -0,0 +1,76 @@
+from flask import Flask, Response, g, request
+import time
+
+from app.config import Config
+from app.utils.cache import CacheMetrics
+from app.utils.metrics import Metrics, RequestIO
+
+Metrics.describe("http_request_duration_seconds", "Latencia de las peticiones por endpoint")
+Metrics.describe("http_request_cpu_seconds", "Tiempo de CPU del hilo de la petición por endpoint")
+Metrics.describe("http_request_backend_seconds", "Tiempo por petición esperando a MongoDB o Redis")
+Metrics.describe("http_request_backend_calls_total", "Comandos enviados a MongoDB o Redis")
+Metrics.describe("cache_events_total", "Eventos de la cache de vistas por namespace")
+Metrics.describe("mongo_pool_max_size", "Tamaño máximo del pool de MongoDB por servidor")
+Metrics.describe("mongo_pool_connections_open", "Conexiones abiertas del pool de MongoDB")
+Metrics.describe("mongo_pool_connections_in_use", "Conexiones del pool de MongoDB prestadas a una operación")
+Metrics.describe("mongo_pool_checkout_seconds", "Espera para obtener una conexión del pool de MongoDB")
+Metrics.describe("mongo_pool_checkout_failed_total", "Fallos al obtener una conexión del pool de MongoDB")
+Metrics.describe("mongo_pool_cleared_total", "Veces que se vació el pool de MongoDB tras un error")
+Metrics.describe("redis_pool_max_connections", "Tamaño máximo del pool de Redis")
+Metrics.describe("redis_pool_connections_created", "Conexiones creadas por el pool de Redis (se reutilizan, no se destruyen)")
+Metrics.describe("redis_pool_connections_in_use", "Conexiones del pool de Redis prestadas a un comando")
+Metrics.describe("redis_pool_checkout_seconds", "Espera para obtener una conexión del pool de Redis")
+Metrics.describe("redis_pool_checkout_failed_total", "Pool de Redis agotado durante REDIS_POOL_TIMEOUT")
+
+
+def cache_counters() -> dict:
+    return {"cache_events_total": {
+        (("namespace", namespace), ("event", event)): count
+        for namespace, events in CacheMetrics.snapshot().items()
+        for event, count in events.items()
+    }}
+
+
+def metrics_view():
+    return Response(Metrics.render(cache_counters()), mimetype="text/plain; version=0.0.4")
+
+
+def init_metrics(app: Flask):
+    """Mide cada petición y expone /metrics en formato Prometheus.
+
+    La respuesta incluye una cabecera Server-Timing con el tiempo total,
+    el de CPU y el de MongoDB y Redis, para verlo desde el navegador.
+    """
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.metrics_cpu_started = time.thread_time()
+        g.metrics_io_token = RequestIO.start()
+
+    @app.after_request
+    def record_request_metrics(response):
+        if "metrics_started" not in g:
+            return response
+        elapsed = time.perf_counter() - g.metrics_started
+        cpu = time.thread_time() - g.metrics_cpu_started
+        io = RequestIO.stop(g.pop("metrics_io_token"))
+        del g.metrics_started
+        if request.endpoint == "metrics":
+            return response
+
+        endpoint = (("endpoint", request.endpoint or "unmatched"),)
+        Metrics.observe("http_request_duration_seconds",
+                        endpoint + (("method", request.method), ("status", response.status_code)), elapsed)
+        Metrics.observe("http_request_cpu_seconds", endpoint, cpu)
+        timings = [f"total;dur={elapsed * 1000:.1f}", f"cpu;dur={cpu * 1000:.1f}"]
+        for backend, (seconds, calls) in io.items():
+            labels = endpoint + (("backend", backend),)
+            Metrics.observe("http_request_backend_seconds", labels, seconds)
+            Metrics.increment("http_request_backend_calls_total", labels, calls)
+            timings.append(f'{backend};dur={seconds * 1000:.1f};desc="{calls} calls"')
+        if Config.SERVER_TIMING_ENABLED:
+            response.headers["Server-Timing"] = ", ".join(timings)
+        return response
+
+    app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -1,24 +1,114 @@
-from flask import request, jsonify
+from flask import request, jsonify, make_response, current_app
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from functools import wraps
 from app.extensions.redis_extencion import redis_client
-import time
+import math
+import os
+
+# Ventana deslizante exacta: un sorted set con la marca de tiempo de cada petición.
+# KEYS[1] clave; ARGV[1] límite, ARGV[2] ventana en ms, ARGV[3] miembro único
+SLIDING_WINDOW_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = now_parts[1] * 1000 + math.floor(now_parts[2] / 1000)
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now - window)
+local count = redis.call('ZCARD', KEYS[1])
+local allowed = 0
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    count = count + 1
+    allowed = 1
+end
+redis.call('PEXPIRE', KEYS[1], window)
+local reset = window
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if oldest[2] then
+    reset = tonumber(oldest[2]) + window - now
+end
+return {allowed, limit - count, reset}
+"""
+
+# Token bucket: capacidad `limit` que se rellena a limit/period tokens por ms.
+# KEYS[1] clave; ARGV[1] capacidad, ARGV[2] ventana en ms
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = now_parts[1] * 1000 + math.floor(now_parts[2] / 1000)
+local capacity = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local rate = capacity / window
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local last = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - last) * rate)
+local allowed = 0
+local reset = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    reset = math.ceil((1 - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], window)
+return {allowed, math.floor(tokens), reset}
+"""
+
+_scripts = {
+    "sliding_window": redis_client.register_script(SLIDING_WINDOW_SCRIPT),
+    "token_bucket": redis_client.register_script(TOKEN_BUCKET_SCRIPT),
+}
+
+
+def _client_identity():
+    # Usuario autenticado si hay JWT válido; si no, la IP
+    try:
+        verify_jwt_in_request(optional=True)
+        user_id = get_jwt_identity()
+    except Exception:
+        user_id = None
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{request.remote_addr}"
+
+
+def rate_limiter(limit=100, period=60, strategy="sliding_window"):
+    """Limita las peticiones por usuario (o IP) y endpoint con un solo script en Redis.
+
+    strategy: "sliding_window" (máximo `limit` peticiones en cualquier
+    ventana de `period` segundos) o "token_bucket" (ráfagas de hasta
+    `limit` que se recuperan a limit/period por segundo).
+    """
+    if strategy not in _scripts:
+        raise ValueError(f"Estrategia de rate limit desconocida: {strategy}")
+    script = _scripts[strategy]
+    window_ms = int(period * 1000)
 
-def rate_limiter(limit=100, period=60):
     def decorator(f):
+        @wraps(f)
         def wrapper(*args, **kwargs):
-            ip = request.remote_addr
-            key = f"rate_limit:{ip}"
-            current = redis_client.get(key)
-
-            if current and int(current) >= limit:
-                return jsonify({"error": "Too many requests"}), 429
+            key = f"rate_limit:{strategy}:{request.endpoint}:{_client_identity()}"
+            args_script = [limit, window_ms]
+            if strategy == "sliding_window":
+                args_script.append(os.urandom(8).hex())
+            try:
+                allowed, remaining, reset_ms = script(keys=[key], args=args_script)
+            except Exception:
+                # Si Redis no responde no se bloquea el tráfico
+                current_app.logger.exception("rate limiter unavailable")
+                return f(*args, **kwargs)
 
-            # Incrementa el contador
-            pipe = redis_client.pipeline()
-            pipe.incr(key, 1)
-            pipe.expire(key, period)  # Expira en 'period' segundos
-            pipe.execute()
+            headers = {
+                "X-RateLimit-Limit": str(limit),
+                "X-RateLimit-Remaining": str(max(int(remaining), 0)),
+                "X-RateLimit-Reset": str(math.ceil(int(reset_ms) / 1000)),
+            }
+            if not allowed:
+                headers["Retry-After"] = headers["X-RateLimit-Reset"]
+                return jsonify({"error": "Too many requests"}), 429, headers
 
-            return f(*args, **kwargs)
-        wrapper.__name__ = f.__name__
+            response = make_response(f(*args, **kwargs))
+            response.headers.update(headers)
+            return response
         return wrapper
     return decorator
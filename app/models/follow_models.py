@@ -0,0 +1,104 @@
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
+from app.database import db
+from app.utils.pagination import Cursor
+
+
+class Follow:
+    """Aristas del grafo social: un documento por relación seguidor -> seguido.
+
+    Índices (ver init_db): follow_relation_unique (follower_id, following_id)
+    y follow_inverse_index (following_id, follower_id).
+    """
+    collection = db['follows']
+
+    @staticmethod
+    def create(follower_id, following_id):
+        """Crea la relación; devuelve False si ya existía"""
+        try:
+            Follow.collection.insert_one({
+                "follower_id": ObjectId(follower_id),
+                "following_id": ObjectId(following_id),
+                "created_at": datetime.utcnow()
+            })
+        except DuplicateKeyError:
+            return False
+        return True
+
+    @staticmethod
+    def delete(follower_id, following_id):
+        """Elimina la relación; devuelve False si no existía"""
+        result = Follow.collection.delete_one({
+            "follower_id": ObjectId(follower_id),
+            "following_id": ObjectId(following_id)
+        })
+        return result.deleted_count > 0
+
+    @staticmethod
+    def exists(follower_id, following_id):
+        return Follow.collection.find_one(
+            {"follower_id": ObjectId(follower_id), "following_id": ObjectId(following_id)},
+            {"_id": 1}
+        ) is not None
+
+    FOLLOWING_PROJECTION = {"_id": 0, "following_id": 1}
+
+    @staticmethod
+    def following_filter(user_id) -> dict:
+        return {"follower_id": ObjectId(user_id)}
+
+    @staticmethod
+    def following_ids(user_id):
+        """IDs de las cuentas que sigue el usuario"""
+        return [edge['following_id'] for edge in Follow.collection.find(
+            Follow.following_filter(user_id),
+            Follow.FOLLOWING_PROJECTION
+        )]
+
+    @staticmethod
+    def follower_ids(user_id):
+        """IDs de los seguidores del usuario"""
+        return [edge['follower_id'] for edge in Follow.collection.find(
+            {"following_id": ObjectId(user_id)},
+            {"_id": 0, "follower_id": 1}
+        )]
+
+    @staticmethod
+    def page_following_ids(user_id, limit=20, after=None):
+        """Página de cuentas seguidas ordenada por ID (usa follow_relation_unique)"""
+        query = {"follower_id": ObjectId(user_id)}
+        if after:
+            query.update(Cursor.keyset_filter(["following_id"], after, direction=1))
+        return [edge['following_id'] for edge in Follow.collection.find(
+            query, {"_id": 0, "following_id": 1}
+        ).sort("following_id", 1).limit(limit)]
+
+    @staticmethod
+    def page_follower_ids(user_id, limit=20, after=None):
+        """Página de seguidores ordenada por ID (usa follow_inverse_index)"""
+        query = {"following_id": ObjectId(user_id)}
+        if after:
+            query.update(Cursor.keyset_filter(["follower_id"], after, direction=1))
+        return [edge['follower_id'] for edge in Follow.collection.find(
+            query, {"_id": 0, "follower_id": 1}
+        ).sort("follower_id", 1).limit(limit)]
+
+    @staticmethod
+    def followed_among(user_id, candidate_ids):
+        """Subconjunto de candidate_ids que el usuario ya sigue (una consulta)"""
+        if not candidate_ids:
+            return set()
+        return {str(edge['following_id']) for edge in Follow.collection.find(
+            {"follower_id": ObjectId(user_id),
+             "following_id": {"$in": [ObjectId(candidate_id) for candidate_id in candidate_ids]}},
+            {"_id": 0, "following_id": 1}
+        )}
+
+    @staticmethod
+    def iter_edges(batch_size=10000):
+        """Todas las aristas (follower_id, following_id) para los cálculos por lotes"""
+        cursor = Follow.collection.find({}, {"_id": 0, "follower_id": 1, "following_id": 1},
+                                        batch_size=batch_size)
+        for edge in cursor:
+            yield edge['follower_id'], edge['following_id']
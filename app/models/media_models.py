@@ -0,0 +1,109 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument, UpdateOne
+from app.database import db
+
+
+class MediaUnavailable(Exception):
+    """Alguna imagen a referenciar ya no existe (la borró gc_media)"""
+
+    def __init__(self, digests):
+        super().__init__(f"Imágenes no disponibles: {', '.join(sorted(digests))}")
+        self.digests = set(digests)
+
+
+class Media:
+    """Imágenes del almacén direccionado por contenido (ver MediaStore).
+
+    `_id` es el hash de la salida normalizada; `source_hashes` son los hashes
+    de los ficheros subidos que produjeron esa salida, así que volver a subir
+    la misma imagen no se procesa de nuevo. `refcount` cuenta las
+    publicaciones que la usan; las que llegan a 0 las borra
+    app/commands/gc_media.py pasado el periodo de gracia.
+    """
+    collection = db['media']
+
+    @staticmethod
+    def find_by_sources(source_hashes) -> dict:
+        """{hash de la subida: documento} de las subidas ya conocidas.
+
+        Antes de leerlas les renueva el periodo de gracia: gc_media ya no
+        puede borrar ninguna de las que devuelve mientras se crea la
+        publicación.
+        """
+        if not source_hashes:
+            return {}
+        Media.collection.update_many({"source_hashes": {"$in": list(source_hashes)}},
+                                     {"$set": {"updated_at": datetime.utcnow()}})
+        found = {}
+        for media in Media.collection.find({"source_hashes": {"$in": list(source_hashes)}},
+                                           {"files": 1, "source_hashes": 1}):
+            for source_hash in media["source_hashes"]:
+                found[source_hash] = media
+        return found
+
+    @staticmethod
+    def register(digest, source_hash, files):
+        """Registra (o reutiliza) la imagen y asocia el hash de la subida"""
+        now = datetime.utcnow()
+        return Media.collection.find_one_and_update(
+            {"_id": digest},
+            {
+                "$setOnInsert": {"files": files, "refcount": 0, "created_at": now},
+                "$addToSet": {"source_hashes": source_hash},
+                "$set": {"updated_at": now}
+            },
+            projection={"files": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    def _adjust(counts: Counter, sign) -> int:
+        """Aplica sign * count a cada refcount; devuelve cuántas imágenes existían"""
+        if not counts:
+            return 0
+        now = datetime.utcnow()
+        return Media.collection.bulk_write([
+            UpdateOne({"_id": digest}, {"$inc": {"refcount": sign * count}, "$set": {"updated_at": now}})
+            for digest, count in counts.items()
+        ], ordered=False).matched_count
+
+    @staticmethod
+    def acquire(digests):
+        """Suma una referencia por uso; MediaUnavailable si alguna ya no existe.
+
+        Sin upsert, el $inc no recrea las borradas: se deshacen las
+        referencias tomadas y quien llama vuelve a procesar las subidas.
+        """
+        counts = Counter(digests)
+        if Media._adjust(counts, 1) == len(counts):
+            return
+        existing = {media["_id"] for media in Media.collection.find({"_id": {"$in": list(counts)}}, {"_id": 1})}
+        Media._adjust(Counter({digest: count for digest, count in counts.items() if digest in existing}), -1)
+        raise MediaUnavailable(set(counts) - existing)
+
+    @staticmethod
+    def release(digests):
+        Media._adjust(Counter(digests), -1)
+
+    @staticmethod
+    def find_unreferenced(grace_seconds, limit):
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        return list(Media.collection.find(
+            {"refcount": {"$lte": 0}, "updated_at": {"$lt": cutoff}},
+            {"files": 1}
+        ).limit(limit))
+
+    @staticmethod
+    def delete_if_unreferenced(digest, grace_seconds):
+        """Borra el documento solo si sigue sin usarse; devuelve el documento borrado"""
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        return Media.collection.find_one_and_delete(
+            {"_id": digest, "refcount": {"$lte": 0}, "updated_at": {"$lt": cutoff}},
+            projection={"files": 1}
+        )
+
+    @staticmethod
+    def exists(digest) -> bool:
+        return Media.collection.count_documents({"_id": digest}, limit=1) > 0
@@ -1,13 +1,28 @@
 from datetime import datetime
+from bson.errors import InvalidId
 from bson.objectid import ObjectId
+from app.config import Config
 from app.database import db
-from concurrent.futures import ThreadPoolExecutor
+from app.models.media_models import Media
+from app.utils.post_fragments import PostFragments
+from app.utils.pagination import Cursor
 
 class Comment:
+    """Comentarios, uno por documento.
+
+    Índice comment_post_date_index (post_id, created_at, _id): las páginas
+    se leen por keyset, así que el coste no depende de cuántos comentarios
+    tenga la publicación.
+    """
     colletion = db['comments']
+
+    PAGE_SORT = [("created_at", -1), ("_id", -1)]
+    PAGE_FIELDS = ["created_at", "_id"]
+    PAGE_HINT = "comment_post_date_index"
+
     @staticmethod
     def create(post_id,username,profile_pic_url,text_comment=''):
-        
+        """Inserta el comentario y devuelve el documento guardado"""
         comment_structerd = {
             "post_id":post_id,
             "user":{
@@ -18,50 +33,98 @@ class Comment:
             "created_at": datetime.utcnow()
         }
         result = Comment.colletion.insert_one(comment_structerd)
-        return True
+        comment_structerd["_id"] = result.inserted_id
+        return comment_structerd
+
     @staticmethod
-    def view_comments(post_id):
-        comments = Comment.colletion.find({'post_id':post_id})
-        if comments is None:
-            return "no data",404
-        data_forma = [
-            {
-                "id":str(data['_id']),
-                "user":data['user'],
-                "text_comment":data['text_comment'],
-                "created_at":data['created_at']
-            }
-            for data in comments
-        ]
-        return data_forma
+    def to_preview(comment):
+        """Forma en la que se devuelve (y se guarda en recent_comments del post)"""
+        return {
+            "id":str(comment['_id']),
+            "user":comment['user'],
+            "text_comment":comment['text_comment'],
+            "created_at":comment['created_at']
+        }
+
+    @staticmethod
+    def page_filter(post_id, after=None) -> dict:
+        query = {'post_id':post_id}
+        if after:
+            query.update(Cursor.keyset_filter(Comment.PAGE_FIELDS, after))
+        return query
+
+    @staticmethod
+    def view_comments(post_id, limit=20, after=None):
+        """Página de comentarios, del más nuevo al más antiguo"""
+        return list(Comment.colletion.find(Comment.page_filter(post_id, after))
+                   .sort(Comment.PAGE_SORT)
+                   .hint(Comment.PAGE_HINT)
+                   .limit(limit))
+
+    @staticmethod
+    def latest_previews(post_id, size):
+        return [Comment.to_preview(comment) for comment in Comment.view_comments(post_id, size)]
     
     @staticmethod
     def delete_comment(post_id,comment_id):
-        result = Comment.colletion.delete_one({
-                "_id":ObjectId(comment_id),
+        """Borra el comentario; devuelve el documento borrado o None"""
+        try:
+            comment_id = ObjectId(comment_id)
+        except InvalidId:
+            return None
+        # Los errores de MongoDB se propagan: no son un "no encontrado"
+        return Comment.colletion.find_one_and_delete({
+                "_id":comment_id,
                 "post_id":post_id
             }
         )
-        return result.deleted_count > 0
+
+    @staticmethod
+    def delete_by_post(post_id):
+        Comment.colletion.delete_many({"post_id": post_id})
 
 class Post:
     collection = db['posts']
+
+    # Orden estable para la paginación por keyset
+    PAGE_SORT = [("created_at", -1), ("_id", -1)]
+    PAGE_FIELDS = ["created_at", "_id"]
+    SEARCH_FIELDS = ["score", "_id"]
+    # Campos que se devuelven en los listados
+    PAGE_PROJECTION = {
+        "user_id": 1, "content": 1, "media_urls": 1, "likes_count": 1,
+        "comments_count": 1, "reposts_count": 1, "created_at": 1, "recent_comments": 1
+    }
+
     @staticmethod
-    def create(user_id, content, media_urls=None):
+    def create(user_id, content, media_urls=None, created_at=None, media_ids=None):
         """Crea una nueva publicación"""
         if media_urls is None:
             media_urls = []
+        if media_ids is None:
+            media_ids = []
+        if created_at is None:
+            created_at = datetime.utcnow()
             
         post = {
             "user_id": user_id,
             "content": content,
             "media_urls": media_urls,
+            "media_ids": media_ids,
             "comments_count":0,
+            "recent_comments": [],
             "likes_count": 0,
-            "created_at": datetime.utcnow()
+            "created_at": created_at
         }
         
-        result = Post.collection.insert_one(post)
+        # Las referencias se toman antes de insertar: si algo falla sobra una
+        # referencia (la imagen no se borra) en lugar de faltar
+        Media.acquire(media_ids)
+        try:
+            result = Post.collection.insert_one(post)
+        except Exception:
+            Media.release(media_ids)
+            raise
         return str(result.inserted_id)
     
     @staticmethod
@@ -73,20 +136,84 @@ class Post:
             return None
     
     @staticmethod
-    def find_by_user(user_id, skip=0, limit=20):
-        """Busca publicaciones de un usuario con paginación"""
-        return Post.collection.find({"user_id": user_id})
+    def find_by_user(user_id, limit=20, after=None):
+        """Busca publicaciones de un usuario, de la más nueva a la más antigua"""
+        query = {"user_id": user_id}
+        if after:
+            query.update(Cursor.keyset_filter(Post.PAGE_FIELDS, after))
+        return list(Post.collection.find(query, Post.PAGE_PROJECTION)
+                   .sort(Post.PAGE_SORT)
+                   .hint("post_user_date_id_index")
+                   .limit(limit))
+
+    @staticmethod
+    def count_by_user(user_id):
+        """Cuenta las publicaciones de un usuario"""
+        return Post.collection.count_documents({"user_id": user_id})
         
-    
     @staticmethod
-    def find_feed_posts(user_ids, skip=0, limit=20):
-        """Busca publicaciones para el feed basadas en los IDs de usuarios"""
-        return list(Post.collection.find({"user_id": {"$in": user_ids}})
+    def find_recent_ids(limit):
+        """IDs y fechas de los posts más recientes de todos los usuarios"""
+        return list(Post.collection.find({}, {"_id": 1, "created_at": 1})
+                   .sort(Post.PAGE_SORT)
+                   .hint("post_date_id_index")
+                   .limit(limit))
+
+    @staticmethod
+    def find_recent_ids_by_users(user_ids, limit):
+        """IDs y fechas de los posts más recientes de varios usuarios en una sola consulta.
+
+        Con post_user_date_index MongoDB recorre un rango del índice por
+        usuario y los mezcla ya ordenados (SORT_MERGE), sin ordenar en memoria.
+        """
+        return list(Post.collection.find(
+                    {"user_id": {"$in": user_ids}},
+                    {"_id": 1, "created_at": 1}
+                   )
                    .sort("created_at", -1)
-                   .skip(skip)
+                   .hint("post_user_date_index")
+                   .limit(limit))
+
+    @staticmethod
+    def ids_filter(post_ids) -> dict:
+        return {"_id": {"$in": [ObjectId(post_id) for post_id in post_ids]}}
+
+    @staticmethod
+    def feed_filter(user_ids, after=None) -> dict:
+        """Filtro del feed; lo comparten la API síncrona y la asíncrona (app/asgi.py)"""
+        query = {"user_id": {"$in": user_ids}}
+        if after:
+            query = {"$and": [query, Cursor.keyset_filter(Post.PAGE_FIELDS, after)]}
+        return query
+
+    @staticmethod
+    def find_feed_posts(user_ids, limit=20, after=None):
+        """Busca publicaciones para el feed basadas en los IDs de usuarios.
+
+        `after` son los valores (created_at, _id) del último post de la
+        página anterior.
+        """
+        return list(Post.collection.find(Post.feed_filter(user_ids, after), Post.PAGE_PROJECTION)
+                   .sort(Post.PAGE_SORT)
                    .limit(limit))
+
+    @staticmethod
+    def search(tokens, limit=20, after=None):
+        """Busca publicaciones por texto ordenadas por relevancia.
+
+        `after` son los valores (score, _id) del último resultado.
+        """
+        pipeline = [
+            {"$match": {"$text": {"$search": " ".join(tokens)}}},
+            {"$addFields": {"score": {"$meta": "textScore"}}}
+        ]
+        if after:
+            pipeline.append({"$match": Cursor.keyset_filter(Post.SEARCH_FIELDS, after)})
+        pipeline += [{"$sort": {"score": -1, "_id": -1}}, {"$limit": limit}]
+        return list(Post.collection.aggregate(pipeline))
+
     @staticmethod
-    def update_post(post_id, user_id, content=None, media_urls=None):
+    def update_post(post_id, user_id, content=None, media_urls=None, media_ids=None):
         """Actualiza el contenido o medios de una publicación"""
         update_data = {"$set": {"updated_at": datetime.utcnow()}}
         
@@ -94,56 +221,101 @@ class Post:
             update_data["$set"]["content"] = content
         if media_urls is not None:
             update_data["$set"]["media_urls"] = media_urls
+        if media_ids is not None:
+            update_data["$set"]["media_ids"] = media_ids
+            Media.acquire(media_ids)
             
-        result = Post.collection.update_one(
+        previous = Post.collection.find_one_and_update(
             {
                 "_id": ObjectId(post_id),
                 "user_id": user_id
             },
-            update_data
+            update_data,
+            projection={"media_ids": 1}
         )
-        return result.modified_count > 0
+        if media_ids is not None:
+            # Si no se actualizó se devuelven las nuevas; si sí, las que se sustituyeron
+            Media.release(media_ids if previous is None else previous.get("media_ids", []))
+        if previous is not None:
+            PostFragments.invalidate(post_id)
+        return previous is not None
     
     @staticmethod
     def delete_by_id(post_id, user_id):
         """Elimina una publicación por su ID si pertenece al usuario"""
-        result = Post.collection.delete_one({
-            "_id": ObjectId(post_id),
-            "user_id": user_id
-        })
-        return result.deleted_count > 0
-    
-    @staticmethod
-    def add_like(post_id):
-        """Incrementa el contador de likes de una publicación"""
-        result = Post.collection.update_one(
-            {"_id": ObjectId(post_id)},
-            {"$inc": {"likes_count": 1}}
+        deleted = Post.collection.find_one_and_delete(
+            {
+                "_id": ObjectId(post_id),
+                "user_id": user_id
+            },
+            projection={"media_ids": 1}
         )
-        return result.modified_count > 0
+        if deleted is None:
+            return False
+        Media.release(deleted.get("media_ids", []))
+        Comment.delete_by_post(post_id)
+        PostFragments.invalidate(post_id)
+        return True
     
     @staticmethod
-    def delete_like(post_id):
-        """Decrementar el contador de likes de una publicación"""
-        result = Post.collection.update_one(
-            {"_id": ObjectId(post_id)},
-            {"$inc": {"likes_count": -1}}
-        )
-        return result.modified_count > 0
+    def find_likes_count(post_id):
+        """likes_count guardado en MongoDB, o None si el post no existe"""
+        try:
+            post = Post.collection.find_one({"_id": ObjectId(post_id)}, {"likes_count": 1})
+        except Exception:
+            return None
+        return post.get('likes_count', 0) if post else None
     
     
     @staticmethod
     def add_comment(post_id,username,profile_pic_url,text_comment):
-        """Add comment of post"""
-        Post.collection.update_one(
-            {"_id": ObjectId(post_id)},
-            {"$inc": {"comments_count": 1}}
-        )
+        """Añade un comentario; devuelve su id o None si la publicación no existe.
+
+        Sin transacciones (MongoDB sin réplica) el orden garantiza la
+        consistencia: primero se inserta el comentario y después se
+        actualizan el contador y la vista previa del post en una sola
+        escritura. Si el post ya no existe se borra el comentario.
+        """
+        comment = Comment.create(post_id,username,profile_pic_url,text_comment)
         try:
-            Comment.create(post_id,username,profile_pic_url,text_comment)
-            return True
-        except Exception as e:
+            result = Post.collection.update_one(
+                {"_id": ObjectId(post_id)},
+                {
+                    "$inc": {"comments_count": 1},
+                    # Los más nuevos primero, como mucho RECENT_COMMENTS_SIZE
+                    "$push": {"recent_comments": {
+                        "$each": [Comment.to_preview(comment)],
+                        "$position": 0,
+                        "$slice": Config.RECENT_COMMENTS_SIZE
+                    }}
+                }
+            )
+        except Exception:
+            Comment.colletion.delete_one({"_id": comment["_id"]})
+            raise
+        if result.matched_count == 0:
+            Comment.colletion.delete_one({"_id": comment["_id"]})
+            return None
+        PostFragments.invalidate(post_id)
+        return str(comment["_id"])
+
+    @staticmethod
+    def remove_comment(post_id, comment_id):
+        """Borra un comentario y ajusta el contador y la vista previa del post"""
+        comment = Comment.delete_comment(post_id, comment_id)
+        if comment is None:
             return False
-        
-        
-    
\ No newline at end of file
+        previous = Post.collection.find_one_and_update(
+            {"_id": ObjectId(post_id)},
+            {"$inc": {"comments_count": -1}, "$pull": {"recent_comments": {"id": str(comment_id)}}},
+            projection={"recent_comments.id": 1}
+        )
+        if previous is not None:
+            # Si estaba en la vista previa, se rellena con el siguiente más reciente
+            if any(preview.get("id") == str(comment_id) for preview in previous.get("recent_comments", [])):
+                Post.collection.update_one(
+                    {"_id": ObjectId(post_id)},
+                    {"$set": {"recent_comments": Comment.latest_previews(post_id, Config.RECENT_COMMENTS_SIZE)}}
+                )
+            PostFragments.invalidate(post_id)
+        return True
@@ -1,11 +1,38 @@
 from datetime import datetime
 from bson.objectid import ObjectId
 from werkzeug.security import generate_password_hash, check_password_hash
+from pymongo import UpdateOne
 from app.database import db
+from app.models.follow_models import Follow
+from app.utils.profile_cache import ProfileCache
+from app.utils.pagination import Cursor
+from app.utils.text_search import normalize, prefix_range
+import logging
 import re
 
+logger = logging.getLogger(__name__)
+
 class User:
     collection = db['users']
+
+    # Campos necesarios para mostrar al autor de una publicación
+    AUTHOR_PROJECTION = {"_id": 1, "username": 1, "profile_pic_url": 1}
+
+    # Campos públicos del perfil; los contadores están desnormalizados
+    # (el grafo social vive en la colección follows)
+    PUBLIC_PROFILE_PROJECTION = {
+        "_id": 1,
+        "username": 1,
+        "email": 1,
+        "bio": 1,
+        "profile_pic_url": 1,
+        "privacy": 1,
+        "followers_count": 1,
+        "following_count": 1
+    }
+    
+    # Orden de los resultados de búsqueda (paginación por keyset)
+    SEARCH_FIELDS = ["score", "_id"]
     
     # Validaciones
     @staticmethod
@@ -38,6 +65,7 @@ class User:
         
         user = {
             "username": username,
+            "username_search": normalize(username),
             "email": email,
             "password": generate_password_hash(password),
             "bio": bio,
@@ -55,8 +83,8 @@ class User:
                 "mentions": True,          
                 "direct_messages": True    
             },
-            "followers": [],           
-            "following": []               
+            "followers_count": 0,
+            "following_count": 0
         }
         
         result = User.collection.insert_one(user)
@@ -64,45 +92,19 @@ class User:
     @staticmethod
     def get_followers_by_user_id(user_id):
         try:
-            followers_ids = User.collection.find(
-                {"_id":ObjectId(user_id)},
-                {"followers":1,"_id":0}
-                )
-            return list(followers_ids)[0]['followers']
+            return Follow.follower_ids(user_id)
         except Exception as ex:
-            print('ocurrio un errror a la hora de procesar')
+            logger.exception('error loading followers of %s', user_id)
             return False
     
 
     @staticmethod
-    def get_following_by_user_id(user_id):
-        try:
-            pipeline = [
-                # Match the user by _id
-                {"$match": {"_id": ObjectId(user_id)}},
-                # Unwind the following array to process each element
-                {"$unwind": {"path": "$following", "preserveNullAndEmptyArrays": True}},
-                # Sample up to 5 random elements
-                {"$sample": {"size": 5}},
-                # Group to collect the sampled following IDs into a list
-                {
-                    "$group": {
-                        "_id": None,
-                        "following": {"$push": "$following"}
-                    }
-                },
-                # Project to return only the following array
-                {"$project": {"_id": 0, "following": 1}}
-            ]
-            
-            result = list(User.collection.aggregate(pipeline))
-            
-            # Return the following array if it exists, otherwise an empty list
-            return result[0]["following"] if result else []
-    
-        except Exception as e:
-            print(f"Error fetching random following: {str(e)}")
-            return []
+    def adjust_follow_counts(follower_id, following_id, delta):
+        """Actualiza los contadores desnormalizados de una relación"""
+        User.collection.bulk_write([
+            UpdateOne({"_id": ObjectId(following_id)}, {"$inc": {"followers_count": delta}}),
+            UpdateOne({"_id": ObjectId(follower_id)}, {"$inc": {"following_count": delta}})
+        ], ordered=False)
 
     @staticmethod
     def find_by_id(user_id):
@@ -112,6 +114,65 @@ class User:
         except:
             return None
     
+    @staticmethod
+    def ids_filter(user_ids):
+        """Filtro por varios IDs (se ignoran los no válidos) o None si no queda ninguno"""
+        object_ids = []
+        for user_id in user_ids:
+            try:
+                object_ids.append(ObjectId(user_id))
+            except Exception:
+                continue
+        return {"_id": {"$in": object_ids}} if object_ids else None
+
+    @staticmethod
+    def find_many_by_ids(user_ids, projection=None):
+        """Busca varios usuarios por ID en una sola consulta"""
+        query = User.ids_filter(user_ids)
+        if query is None:
+            return []
+        return list(User.collection.find(
+            query,
+            projection if projection is not None else User.AUTHOR_PROJECTION
+        ))
+
+    @staticmethod
+    def find_public_profiles(user_ids):
+        """Busca los perfiles públicos de varios usuarios"""
+        return User.find_many_by_ids(user_ids, User.PUBLIC_PROFILE_PROJECTION)
+
+    @staticmethod
+    def find_public_profile_by_username(username):
+        """Busca el perfil público de un usuario por su nombre de usuario"""
+        return User.collection.find_one({"username": username}, User.PUBLIC_PROFILE_PROJECTION)
+
+    @staticmethod
+    def search(tokens, limit=20, after=None):
+        """Busca usuarios por prefijo de username y por texto en username/bio.
+
+        Coincidencia exacta de username > prefijo > relevancia de texto.
+        `after` son los valores (score, _id) del último resultado.
+        """
+        prefix = tokens[0]
+        pipeline = [
+            {"$match": {"$or": [
+                {"$text": {"$search": " ".join(tokens)}},
+                {"username_search": prefix_range(prefix)}
+            ]}},
+            {"$project": {
+                "username": 1, "bio": 1, "profile_pic_url": 1, "privacy": 1, "email": 1,
+                "score": {"$add": [
+                    {"$meta": "textScore"},
+                    {"$cond": [{"$eq": ["$username_search", prefix]}, 20, 0]},
+                    {"$cond": [{"$eq": [{"$substrCP": ["$username_search", 0, len(prefix)]}, prefix]}, 10, 0]}
+                ]}
+            }}
+        ]
+        if after:
+            pipeline.append({"$match": Cursor.keyset_filter(User.SEARCH_FIELDS, after)})
+        pipeline += [{"$sort": {"score": -1, "_id": -1}}, {"$limit": limit}]
+        return list(User.collection.aggregate(pipeline))
+
     @staticmethod
     def find_by_username(username):
         """Busca un usuario por su nombre de usuario"""
@@ -132,6 +193,7 @@ class User:
             {'_id':ObjectId(user_id)},
             {"$set":updated_url_photo}
         )
+        ProfileCache.invalidate(user_id)
 
         return result.modified_count>0
 
@@ -155,11 +217,14 @@ class User:
             raise ValueError("La bio no puede exceder 160 caracteres")
         
         update_data['updated_at'] = datetime.utcnow()
+        if 'username' in update_data:
+            update_data['username_search'] = normalize(update_data['username'])
         
         result = User.collection.update_one(
             {"_id": ObjectId(user_id)},
             {"$set": update_data}
         )
+        ProfileCache.invalidate(user_id, usernames=[update_data.get('username')])
         
         return result.modified_count > 0
     
@@ -178,7 +243,8 @@ class User:
                 "updated_at": datetime.utcnow()
             }}
         )
-        
+        ProfileCache.invalidate(user_id)
+
         return result.modified_count > 0
     
     @staticmethod
@@ -228,6 +294,4 @@ class User:
     def ensure_indexes():
         """Crea índices en la colección para optimizar consultas"""
         User.collection.create_index("username", unique=True)
-        User.collection.create_index("email", unique=True)
-        User.collection.create_index([("followers", 1)])
-        User.collection.create_index([("following", 1)])
\ No newline at end of file
+        User.collection.create_index("email", unique=True)
\ No newline at end of file
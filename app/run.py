@@ -1,25 +1,34 @@
 from flask import Flask
-from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 
 from app.config import Config
 from app.database import init_db
+from app.extensions.redis_extencion import init_extensions
+from app.utils.upload_stream import UploadRequest
+from app.middleware.metrics_middleware import init_metrics
 
 from app.controllers.auth_controller import auth_bp
 from app.controllers.user_controller import user_bp
 from app.controllers.post_controller import post_bp
+from app.controllers.health_controller import health_bp
 
 def create_app():
     app = Flask(__name__,static_folder='static',static_url_path='/static')
+    # Subidas en streaming con límites de tamaño y número de ficheros
+    app.request_class = UploadRequest
     app.config.from_object(Config)
-    jwt = JWTManager(app)
+    # JWT con comprobación de tokens revocados
+    init_extensions(app)
     CORS(app)
+    # Latencias por endpoint, tiempo en MongoDB/Redis y /metrics
+    init_metrics(app)
     # Inicializar base de datos
     init_db()
     # Registrar blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(user_bp, url_prefix='/api/users')
     app.register_blueprint(post_bp, url_prefix='/api/posts')
+    app.register_blueprint(health_bp, url_prefix='/health')
     
     return app
 
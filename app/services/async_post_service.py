@@ -0,0 +1,206 @@
+import asyncio
+import json
+from typing import List, Optional
+
+from bson.objectid import ObjectId
+
+from app.config import Config
+from app.extensions.async_clients import async_db, async_redis
+from app.models.follow_models import Follow
+from app.models.post_models import Comment, Post
+from app.models.user_models import User
+from app.services.post_service import PostService
+from app.utils.author_hydration import AuthorHydration
+from app.utils.cache import CacheMetrics
+from app.utils.feed_cache import CELEBRITIES_KEY, GLOBAL_FEED_KEY, FeedCache
+from app.utils.like_cache import LikeCache
+from app.utils.pagination import Cursor
+from app.utils.post_fragments import PostFragments
+from app.utils.profile_cache import ProfileCache
+from app.utils.responses import PostPayload, encode
+
+
+class AsyncPostService:
+    """Lecturas de publicaciones para el modo ASGI (app/asgi.py).
+
+    Usa los mismos filtros, proyecciones, claves de Redis y formato de
+    respuesta que PostService; solo cambia la E/S, que es asíncrona, y
+    las lecturas independientes se lanzan a la vez con asyncio.gather.
+    Las reconstrucciones en frío de los feeds (raras y con lock) reutilizan
+    el código síncrono en un hilo.
+    """
+
+    @staticmethod
+    async def like_counts(post_ids: list) -> dict:
+        if not post_ids:
+            return {}
+        values = await async_redis.mget([LikeCache.count_key(post_id) for post_id in post_ids])
+        return {post_id: int(value) for post_id, value in zip(post_ids, values) if value is not None}
+
+    @staticmethod
+    async def liked_by(user_id, post_ids: list) -> set:
+        if not user_id or not post_ids:
+            return set()
+        pipe = async_redis.pipeline(transaction=False)
+        for post_id in post_ids:
+            pipe.sismember(LikeCache.likers_key(post_id), str(user_id))
+        return {post_id for post_id, liked in zip(post_ids, await pipe.execute()) if liked}
+
+    @staticmethod
+    async def read_page(keys: list, limit: int, after=None) -> tuple:
+        pipe = async_redis.pipeline(transaction=False)
+        FeedCache.queue_page_reads(pipe, keys, limit, after)
+        return FeedCache.merge_page(await pipe.execute(), limit, after)
+
+    @staticmethod
+    async def ensure_global_feed():
+        ttl = await async_redis.ttl(GLOBAL_FEED_KEY)
+        if ttl == -2 or ttl == -1 or ttl < Config.GLOBAL_FEED_REFRESH_AHEAD:
+            # Reconstrucción con lock (o refresco en segundo plano): código síncrono
+            await asyncio.to_thread(FeedCache.ensure_global_feed)
+        else:
+            CacheMetrics.record("feed_global", "hit")
+
+    @staticmethod
+    async def ensure_user_feed(user_id):
+        if not await async_redis.exists(*FeedCache.built_keys(user_id)):
+            await asyncio.to_thread(FeedCache.ensure_user_feed, user_id)
+
+    @staticmethod
+    async def get_feed_user(user_id, limit=20, after=None) -> tuple:
+        celebrities = await async_redis.sinter(f"following:{user_id}", CELEBRITIES_KEY)
+        return await AsyncPostService.read_page(FeedCache.user_feed_keys(user_id, celebrities), limit, after)
+
+    @staticmethod
+    async def get_feed_global(limit=20, after=None) -> tuple:
+        await AsyncPostService.ensure_global_feed()
+        return await AsyncPostService.read_page([GLOBAL_FEED_KEY], limit, after)
+
+    @staticmethod
+    async def get_profiles(user_ids: list) -> dict:
+        """Igual que ProfileCache.get_many: LRU local -> Redis -> MongoDB"""
+        profiles, missing = ProfileCache.get_local(list(dict.fromkeys(user_ids)))
+        if not missing:
+            return profiles
+        cached = await async_redis.mget(ProfileCache.redis_keys(missing))
+        still_missing = ProfileCache.merge_cached(profiles, missing, cached)
+        query = User.ids_filter(still_missing)
+        if query is None:
+            return profiles
+
+        users = await async_db.users.find(query, User.PUBLIC_PROFILE_PROJECTION).to_list()
+        loaded = [ProfileCache.to_public(user) for user in users]
+        if loaded:
+            pipe = async_redis.pipeline(transaction=False)
+            ProfileCache.queue_store(pipe, loaded)
+            await pipe.execute()
+        for profile in loaded:
+            profiles[profile['id']] = profile
+        return profiles
+
+    @staticmethod
+    async def serialize_posts(posts: list, viewer_id=None) -> List[PostPayload]:
+        """Autores, contadores de likes y "me gusta" del usuario a la vez"""
+        post_ids = [str(post['_id']) for post in posts]
+        profiles, counts, liked = await asyncio.gather(
+            AsyncPostService.get_profiles(AuthorHydration.author_ids(posts)),
+            AsyncPostService.like_counts(post_ids),
+            AsyncPostService.liked_by(viewer_id, post_ids),
+        )
+        payloads = PostService.build_payloads(posts, AuthorHydration.from_profiles(profiles))
+        return PostService.merge_likes(payloads, counts, liked, viewer_id)
+
+    @staticmethod
+    async def render_fragments(post_ids: list, loaded: Optional[list] = None) -> list:
+        """Como PostService.render_fragments, con la E/S asíncrona"""
+        if not post_ids:
+            return []
+        cached = await async_redis.mget([PostFragments.key(post_id) for post_id in post_ids])
+        fragments = dict(zip(post_ids, cached))
+        missing = [post_id for post_id, fragment in fragments.items() if fragment is None]
+        if missing:
+            if loaded is None:
+                loaded = await async_db.posts.find(Post.ids_filter(missing), Post.PAGE_PROJECTION).to_list()
+            else:
+                missing_ids = set(missing)
+                loaded = [post for post in loaded if str(post['_id']) in missing_ids]
+            rendered = {
+                post.id: encode(post).decode()
+                for post in await AsyncPostService.serialize_posts(loaded)
+            }
+            if rendered:
+                pipe = async_redis.pipeline(transaction=False)
+                for post_id, fragment in rendered.items():
+                    pipe.set(PostFragments.key(post_id), fragment, ex=Config.POST_FRAGMENT_TTL)
+                await pipe.execute()
+            fragments.update(rendered)
+        return [fragments[post_id] for post_id in post_ids if fragments.get(post_id) is not None]
+
+    @staticmethod
+    async def render_page(post_ids: list, limit: int, next_cursor=None, viewer_id=None, loaded=None) -> str:
+        fragments, liked = await asyncio.gather(
+            AsyncPostService.render_fragments(post_ids, loaded),
+            AsyncPostService.liked_by(viewer_id, post_ids),
+        )
+        return PostService.page_body(fragments, post_ids, limit, next_cursor, liked)
+
+    @staticmethod
+    async def get_posts(user_id, limit=20, cursor=None):
+        """Misma lógica que GET /api/posts/ en post_controller"""
+        source, after = (cursor[0], cursor[1:]) if cursor else (None, None)
+
+        post_ids, next_after = [], None
+        use_user_feed = user_id is not None and source in (None, 'user')
+        if use_user_feed:
+            post_ids, next_after = await AsyncPostService.get_feed_user(user_id, limit, after)
+            if post_ids == [] and after is None:
+                await AsyncPostService.ensure_user_feed(user_id)
+                post_ids, next_after = await AsyncPostService.get_feed_user(user_id, limit, after)
+                # Sin feed propio se muestra el global
+                use_user_feed = post_ids != []
+
+        if not use_user_feed:
+            post_ids, next_after = await AsyncPostService.get_feed_global(
+                limit, after if source == 'global' else None)
+        source = 'user' if use_user_feed else 'global'
+        next_cursor = Cursor.encode([source, *next_after]) if next_after is not None else None
+        try:
+            return await AsyncPostService.render_page(post_ids, limit, next_cursor, user_id), 200
+        except Exception:
+            return json.dumps({'message':'no se pudo cargar los post',"posts":[]}), 203
+
+    @staticmethod
+    async def get_feed(user_id, limit=20, after=None):
+        try:
+            edges = await async_db.follows.find(
+                Follow.following_filter(user_id), Follow.FOLLOWING_PROJECTION).to_list()
+        except Exception:
+            edges = []
+        following_ids = [str(edge['following_id']) for edge in edges] + [user_id]
+        posts = await (async_db.posts.find(Post.feed_filter(following_ids, after), Post.PAGE_PROJECTION)
+                       .sort(Post.PAGE_SORT)
+                       .limit(limit)
+                       .to_list())
+        return await AsyncPostService.render_page(
+            [str(post['_id']) for post in posts], limit,
+            Cursor.next_for(posts, limit, Post.PAGE_FIELDS), user_id, loaded=posts
+        ), 200
+
+    @staticmethod
+    async def get_post(post_id, viewer_id=None):
+        try:
+            post = await async_db.posts.find_one({"_id": ObjectId(post_id)})
+        except Exception:
+            post = None
+        if not post:
+            return {"error": "Publicación no encontrada"}, 404
+        return (await AsyncPostService.serialize_posts([post], viewer_id))[0], 200
+
+    @staticmethod
+    async def view_comment(post_id, limit=20, after=None):
+        comments = await (async_db.comments.find(Comment.page_filter(post_id, after))
+                          .sort(Comment.PAGE_SORT)
+                          .hint(Comment.PAGE_HINT)
+                          .limit(limit)
+                          .to_list())
+        return PostService.comments_page(comments, limit), 200
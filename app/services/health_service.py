@@ -0,0 +1,61 @@
+import time
+
+import pymongo
+
+from app.config import Config
+from app.database import db
+from app.extensions.redis_extencion import redis_client
+from app.utils.metrics import Metrics
+
+POOL_GAUGES = (
+    "mongo_pool_max_size",
+    "mongo_pool_connections_open",
+    "mongo_pool_connections_in_use",
+    "redis_pool_max_connections",
+    "redis_pool_connections_created",
+    "redis_pool_connections_in_use",
+)
+
+
+class HealthService:
+    """Comprobaciones de /health/ready: MongoDB y Redis responden a tiempo"""
+
+    @staticmethod
+    def _check(ping) -> dict:
+        started = time.perf_counter()
+        try:
+            ping()
+            status = {"status": "ok"}
+        except Exception as e:
+            status = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+        status["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return status
+
+    @staticmethod
+    def ping_mongo():
+        with pymongo.timeout(Config.HEALTH_CHECK_TIMEOUT):
+            db.command("ping")
+
+    @staticmethod
+    def ping_redis():
+        redis_client.ping()
+
+    @staticmethod
+    def pools() -> dict:
+        """Conexiones abiertas y en uso de los pools de este proceso"""
+        return {name: {",".join(f"{key}={value}" for key, value in labels) or "total": count
+                       for labels, count in Metrics.gauges(name).items()}
+                for name in POOL_GAUGES}
+
+    @staticmethod
+    def readiness():
+        checks = {
+            "mongo": HealthService._check(HealthService.ping_mongo),
+            "redis": HealthService._check(HealthService.ping_redis),
+        }
+        healthy = all(check["status"] == "ok" for check in checks.values())
+        return {
+            "status": "ok" if healthy else "error",
+            "checks": checks,
+            "pools": HealthService.pools(),
+        }, 200 if healthy else 503
@@ -1,13 +1,39 @@
 from app.models.post_models import Post,Comment
-from app.models.user_models import User
-from bson.objectid import ObjectId
+from app.models.media_models import MediaUnavailable
 from app.services.user_service import UserService
+from app.utils.author_hydration import AuthorHydration
+from app.utils.fanout_queue import FanoutQueue
+from app.utils.pagination import Cursor
+from app.utils.text_search import tokenize
+from app.extensions.redis_extencion import redis_client
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from app.utils.like_cache import LikeCache
+from app.utils.post_fragments import PostFragments
+from app.utils.responses import CommentPayload, PostPayload, encode
+from datetime import datetime
+import json
+import logging
 from typing import List, Dict
 
+logger = logging.getLogger(__name__)
+
+POSTS_COUNT_TTL = 24 * 3600
+
+# Ajusta el contador solo si ya está cacheado, en una operación atómica:
+# con EXISTS + INCRBY por separado, si la clave caduca entre medias el
+# INCRBY la recrea sin TTL y con un valor parcial
+_ADJUST_COUNT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return false
+"""
 
 class PostService:
+    _adjust_count = redis_client.register_script(_ADJUST_COUNT_SCRIPT)
+
     @staticmethod
-    def create_post(user_id, content, media_urls=None):
+    def create_post(user_id, content, media_urls=None, media_ids=None):
         """Crea una nueva publicación"""
         if not content:
             return {"error": "El contenido es requerido"}, 400
@@ -16,97 +42,187 @@ class PostService:
         if len(content) > 280:
             return {"error": "El contenido no puede superar los 280 caracteres"}, 400
             
-        post_id = Post.create(user_id, content, media_urls)
+        created_at = datetime.utcnow()
+        post_id = Post.create(user_id, content, media_urls, created_at=created_at, media_ids=media_ids)
+        # La distribución a los seguidores la hace el worker de fan-out
+        FanoutQueue.enqueue(user_id, post_id, created_at)
+        PostService._adjust_posts_count(user_id, 1)
         
         return {
             "message": "Publicación creada correctamente",
             "post_id": post_id
         }, 201
     @staticmethod
-    def update_post(post_id:str,user_id,content,media_urls):
+    def update_post(post_id:str,user_id,content,media_urls,media_ids=None):
         try:
-            result = Post.update_post(post_id,user_id,content,media_urls)
+            result = Post.update_post(post_id,user_id,content,media_urls,media_ids)
             if result:
                 return {"message":"Publicacion actualizada"},200
             return {"message":"No se pudo actualizar el post"},203
+        except MediaUnavailable:
+            # El controlador vuelve a procesar las imágenes
+            raise
         except Exception as ex:
             return {"error":"Ocurrio un error inesperado"},400
         
 
     @staticmethod
-    def get_post(post_id):
+    def get_post(post_id, viewer_id=None):
         """Obtiene una publicación por su ID"""
         post = Post.find_by_id(post_id)
         
         if not post:
             return {"error": "Publicación no encontrada"}, 404
             
-        # Obtener datos del autor
-        user = User.find_by_id(post['user_id'])
-        
-        post_data = {
-            "id": str(post['_id']),
-            "content": post['content'],
-            "media_urls": post.get('media_urls', []),
-            "likes_count": post.get('likes_count', 0),
-            "comment_count":post.get('comment_count',0),
-            "created_at": post['created_at'].isoformat(),
-            "author": {
-                "id": str(user['_id']),
-                "username": user['username'],
-                "profile_pic_url": user.get('profile_pic_url', '')
-            }
-        }
+        post_data = PostService.serialize_posts([post], viewer_id)[0]
         
         return post_data, 200
     
     @staticmethod
-    def get_posts(posts_ids:list,page=1, limit=20):
+    def serialize_post(post: dict, author: dict) -> PostPayload:
+        """Formato de publicación que devuelven el feed, la búsqueda y el detalle"""
+        return PostPayload.from_document(post, author)
+
+    @staticmethod
+    def serialize_posts(posts: list, viewer_id=None) -> List[PostPayload]:
+        """Serializa una página de publicaciones hidratando los autores en lote"""
+        authors = AuthorHydration.load_authors(posts)
+        return PostService.apply_likes(PostService.build_payloads(posts, authors), viewer_id)
+
+    @staticmethod
+    def build_payloads(posts: list, authors: dict) -> List[PostPayload]:
+        return [
+            PostService.serialize_post(post, AuthorHydration.author_for(post, authors))
+            for post in posts
+        ]
+
+    @staticmethod
+    def apply_likes(posts_data: List[PostPayload], viewer_id=None) -> List[PostPayload]:
+        """Contadores de likes desde Redis y marca de "me gusta" del usuario"""
+        post_ids = [post.id for post in posts_data]
+        counts = LikeCache.counts(post_ids)
+        liked = LikeCache.liked_by(viewer_id, post_ids) if viewer_id else set()
+        return PostService.merge_likes(posts_data, counts, liked, viewer_id)
+
+    @staticmethod
+    def merge_likes(posts_data: List[PostPayload], counts: dict, liked: set, viewer_id=None) -> List[PostPayload]:
+        for post in posts_data:
+            post.likes_count = counts.get(post.id, post.likes_count)
+            if viewer_id:
+                post.liked_by_me = post.id in liked
+        return posts_data
+
+    @staticmethod
+    def render_fragments(post_ids: list, loaded: list = None) -> list:
+        """JSON de cada post en el orden de post_ids, desde la cache de fragmentos.
+
+        Solo los que faltan se leen de MongoDB (o de `loaded`, si ya se
+        tienen los documentos) y se serializan; los posts que ya no existen
+        se omiten.
+        """
+        fragments = dict(zip(post_ids, PostFragments.get_many(post_ids)))
+        missing = [post_id for post_id, fragment in fragments.items() if fragment is None]
+        if missing:
+            if loaded is None:
+                loaded = list(Post.collection.find(Post.ids_filter(missing), Post.PAGE_PROJECTION))
+            else:
+                missing_ids = set(missing)
+                loaded = [post for post in loaded if str(post['_id']) in missing_ids]
+            rendered = {
+                post.id: encode(post).decode()
+                for post in PostService.serialize_posts(loaded)
+            }
+            PostFragments.store(rendered)
+            fragments.update(rendered)
+        return [fragments[post_id] for post_id in post_ids if fragments.get(post_id) is not None]
+
+    @staticmethod
+    def render_page(post_ids: list, limit: int, next_cursor=None, viewer_id=None, loaded: list = None) -> str:
+        """Respuesta de una página del feed concatenando los fragmentos de cada post.
+
+        Los "me gusta" del usuario van en `liked_post_ids` para que los
+        fragmentos sean los mismos para todos.
+        """
+        fragments = PostService.render_fragments(post_ids, loaded)
+        liked = LikeCache.liked_by(viewer_id, post_ids)
+        return PostService.page_body(fragments, post_ids, limit, next_cursor, liked)
+
+    @staticmethod
+    def page_body(fragments: list, post_ids: list, limit: int, next_cursor, liked: set) -> str:
+        return (
+            '{"posts":[' + ','.join(fragments) + '],'
+            + '"limit":' + json.dumps(limit) + ','
+            + '"next_cursor":' + json.dumps(next_cursor) + ','
+            + '"liked_post_ids":' + json.dumps([post_id for post_id in post_ids if post_id in liked])
+            + '}'
+        )
+
+    @staticmethod
+    def get_posts(posts_ids:list, limit=20, next_cursor=None, viewer_id=None):
+        """Página del feed (JSON ya serializado) manteniendo el orden de Redis"""
         try:
-            object_ids = [ObjectId(post_id) for post_id in posts_ids]
-            posts = list(Post.collection.find(
-                {"_id":{"$in":object_ids}}
-            ))
-            
-            posts_list = []
-            for post in posts:
-                post_user = User.find_by_id(post['user_id'])
-                
-                post_data = {
-                    "id": str(post['_id']),
-                    "content": post['content'],
-                    "media_urls": post.get('media_urls', []),
-                    "likes_count": post.get('likes_count', 0),
-                    "comment_count":post.get('comments_count',0),
-                    "created_at": post['created_at'].isoformat(),
-                    "author": {
-                        "id": str(post_user['_id']),
-                        "username": post_user['username'],
-                        "profile_pic_url": post_user.get('profile_pic_url', '')
-                    }
-                }
-                posts_list.append(post_data)
-        
-            return {
-                "posts": posts_list,
-                "page": page,
-                "limit": limit
-            }, 200
+            return PostService.render_page(posts_ids, limit, next_cursor, viewer_id), 200
         except Exception as ex:
-            return {'message':'no se pudo cargar los post',"posts":[]},203
+            return json.dumps({'message':'no se pudo cargar los post',"posts":[]}), 203
         
+    @staticmethod
+    def serialize_post_with_reposts(post: dict, author: dict) -> PostPayload:
+        payload = PostService.serialize_post(post, author)
+        payload.reposts_count = post.get('reposts_count', 0)
+        return payload
+
+    @staticmethod
+    def get_user_posts(author: Dict, limit=20, after=None, viewer_id=None) -> Dict:
+        """Página de publicaciones de un perfil; el autor ya viene cargado"""
+        posts = Post.find_by_user(author['id'], limit, after)
+        post_author = {
+            "id": author['id'],
+            "username": author['username'],
+            "profile_pic_url": author.get('profile_pic_url', '')
+        }
+        return {
+            "posts": PostService.apply_likes([
+                PostService.serialize_post_with_reposts(post, post_author)
+                for post in posts
+            ], viewer_id),
+            "limit": limit,
+            "next_cursor": Cursor.next_for(posts, limit, Post.PAGE_FIELDS)
+        }
+
+    @staticmethod
+    def count_user_posts(user_id: str) -> int:
+        """Número de publicaciones del usuario, cacheado en Redis"""
+        key = f"posts_count:{user_id}"
+        cached = redis_client.get(key)
+        if cached is not None:
+            return int(cached)
+        total = Post.count_by_user(user_id)
+        redis_client.set(key, total, ex=POSTS_COUNT_TTL, nx=True)
+        return total
+
+    @staticmethod
+    def _adjust_posts_count(user_id: str, delta: int):
+        # Solo se actualiza si ya está cacheado; si no, se contará al leerlo
+        try:
+            PostService._adjust_count(keys=[f"posts_count:{user_id}"], args=[delta])
+        except (RedisConnectionError, RedisTimeoutError):
+            # El contador cacheado caduca con POSTS_COUNT_TTL; no se falla la escritura
+            logger.exception("could not adjust posts count of user %s", user_id)
+
     @staticmethod
     def delete_post(post_id, user_id):
         """Elimina una publicación si pertenece al usuario"""
         success = Post.delete_by_id(post_id, user_id)
         
         if success:
+            PostService._adjust_posts_count(user_id, -1)
+            LikeCache.forget(post_id)
             return {"message": "Publicación eliminada correctamente"}, 200
         else:
             return {"error": "Publicación no encontrada o no tienes permiso para eliminarla"}, 404
     
     @staticmethod
-    def get_feed(user_id, page=1, limit=20):
+    def get_feed(user_id, limit=20, after=None):
         """Obtiene el feed personalizado del usuario"""
         # Obtener IDs de usuarios seguidos
         following_ids = UserService.get_following_ids(user_id)
@@ -114,122 +230,80 @@ class PostService:
         # Incluir las publicaciones propias
         following_ids.append(user_id)
         
-        skip = (page - 1) * limit
-        
         # Obtener publicaciones del feed
-        posts = Post.find_feed_posts(following_ids, skip, limit)
-        
-        posts_list = []
-        for post in posts:
-            # Obtener datos del autor
-            post_user = User.find_by_id(post['user_id'])
-            
-            post_data = {
-                "id": str(post['_id']),
-                "content": post['content'],
-                "media_urls": post.get('media_urls', []),
-                "likes_count": post.get('likes_count', 0),
-                "comment_count":post.get('comment_count',0),
-                "created_at": post['created_at'].isoformat(),
-                "author": {
-                    "id": str(post_user['_id']),
-                    "username": post_user['username'],
-                    "profile_pic_url": post_user.get('profile_pic_url', '')
-                }
-            }
-            posts_list.append(post_data)
+        posts = Post.find_feed_posts(following_ids, limit, after)
         
-        return {
-            "posts": posts_list,
-            "page": page,
-            "limit": limit
-        }, 200
+        return PostService.render_page(
+            [str(post['_id']) for post in posts], limit,
+            Cursor.next_for(posts, limit, Post.PAGE_FIELDS), user_id, loaded=posts
+        ), 200
     
     @staticmethod
-    def like_post(post_id):
-        """Da like a una publicación"""
-        post = Post.find_by_id(post_id)
+    def like_post(post_id, user_id):
+        """Da like a una publicación (idempotente por usuario)"""
+        likes_count = Post.find_likes_count(post_id)
         
-        if not post:
+        if likes_count is None:
             return {"error": "Publicación no encontrada"}, 404
             
-        success = Post.add_like(post_id)
+        added, likes_count = LikeCache.like(post_id, user_id, likes_count)
         
-        if success:
-            return {"message": "Like añadido correctamente"}, 201
-        else:
-            return {"error": "No se pudo añadir el like"}, 500
+        if added:
+            return {"message": "Like añadido correctamente", "likes_count": likes_count}, 201
+        return {"message": "Ya habías dado like", "likes_count": likes_count}, 200
+
     @staticmethod
-    def dislike_post(post_id):
-        """Da like a una publicación"""
-        post = Post.find_by_id(post_id)
+    def dislike_post(post_id, user_id):
+        """Quita el like de una publicación (idempotente por usuario)"""
+        likes_count = Post.find_likes_count(post_id)
         
-        if not post:
+        if likes_count is None:
             return {"error": "Publicación no encontrada"}, 404
             
-        success = Post.delete_like(post_id)
+        removed, likes_count = LikeCache.unlike(post_id, user_id, likes_count)
         
-        if success:
-            return {"message": "Dislike añadido correctamente"}, 201
-        else:
-            return {"error": "No se pudo añadir el dislike"}, 500
+        if removed:
+            return {"message": "Dislike añadido correctamente", "likes_count": likes_count}, 201
+        return {"message": "No habías dado like", "likes_count": likes_count}, 200
+
     @staticmethod
     def comment_post(post_id,username,profile_pic_url,text_comment):
         """Create comment of post samone post_id"""
-        post = Post.find_by_id(post_id)
-        if not post:
+        try:
+            comment_id = Post.add_comment(post_id,username,profile_pic_url,text_comment)
+        except Exception:
+            return {"Error":"coment not created"},500
+        if comment_id is None:
             return {"error":"Publicacion no encontrada"},404
-        
-        comment = Post.add_comment(post_id,username,profile_pic_url,text_comment)
-        if comment:
-            return {"message":"Coment created"},201
-        return {"Error":"coment not created"},500
+        return {"message":"Coment created","comment_id":comment_id},201
 
     @staticmethod    
-    def view_comment(post_id):
-        comment = Comment.view_comments(post_id)
-        if comment is None or comment == []:
-            return {'message':"no data"},204
-        return comment,200
+    def view_comment(post_id, limit=20, after=None):
+        """Página de comentarios y cursor de la siguiente"""
+        return PostService.comments_page(Comment.view_comments(post_id, limit, after), limit),200
+
+    @staticmethod
+    def comments_page(comments: list, limit: int) -> dict:
+        return {
+            "comments": [CommentPayload(**Comment.to_preview(comment)) for comment in comments],
+            "limit": limit,
+            "next_cursor": Cursor.next_for(comments, limit, Comment.PAGE_FIELDS)
+        }
     
     @staticmethod
     def delete_comment(post_id,comment_id):
-        comment = Comment.delete_comment(post_id,comment_id)
-        if comment:
+        if Post.remove_comment(post_id,comment_id):
             return {'message':"Comment delete"},200
         return {'error':"comment no delete"},400
         
     @staticmethod
-    def search_posts(query: str, page: int = 1, limit: int = 20) -> Dict:
-        """Buscar posts por contenido o título y devolverlos con formato de feed"""
-        skip = (page - 1) * limit
-        pattern = f".*{query}.*"
-        regex = {"$regex": pattern, "$options": "i"}
-
-        posts = Post.collection.find(
-            {"$or": [{"title": regex}, {"content": regex}]}
-        ).skip(skip).limit(limit)
-        
-        posts_list = []
-        for post in posts:
-            post_user = User.find_by_id(post['user_id'])
-            post_data = {
-                "id": str(post['_id']),
-                "content": post.get('content', ''),
-                "media_urls": post.get('media_urls', []),
-                "likes_count": post.get('likes_count', 0),
-                "comment_count": post.get('comment_count', 0),
-                "created_at": post['created_at'].isoformat() if 'created_at' in post else '',
-                "author": {
-                    "id": str(post_user['_id']),
-                    "username": post_user.get('username', ''),
-                    "profile_pic_url": post_user.get('profile_pic_url', '')
-                }
-            }
-            posts_list.append(post_data)
+    def search_posts(query: str, limit: int = 20, after: list = None) -> Dict:
+        """Buscar posts por contenido y devolverlos con formato de feed, por relevancia"""
+        tokens = tokenize(query)
+        posts = Post.search(tokens, limit, after) if tokens else []
 
         return {
-            "posts": posts_list,
-            "page": page,
-            "limit": limit
+            "posts": PostService.serialize_posts(posts),
+            "limit": limit,
+            "next_cursor": Cursor.next_for(posts, limit, Post.SEARCH_FIELDS)
         }, 200
\ No newline at end of file
@@ -0,0 +1,38 @@
+from app.extensions.redis_extencion import redis_client
+from app.models.follow_models import Follow
+from app.utils.profile_cache import ProfileCache
+
+POPULAR_KEY = "recommendations:popular"
+
+
+class RecommendationService:
+    """Lectura de las recomendaciones de "a quién seguir".
+
+    Las calcula por lotes app/commands/compute_recommendations.py y las deja
+    en `recommendations:{user_id}` (sorted set candidato -> puntuación).
+    Los usuarios sin recomendaciones propias reciben las cuentas más
+    seguidas de `recommendations:popular`.
+    """
+
+    @staticmethod
+    def key(user_id) -> str:
+        return f"recommendations:{user_id}"
+
+    @staticmethod
+    def get_recommendations(user_id, limit=5) -> list:
+        user_id = str(user_id)
+        candidate_ids = redis_client.zrevrange(RecommendationService.key(user_id), 0, limit - 1)
+        if not candidate_ids:
+            # Margen para descartar las cuentas populares que ya sigue
+            popular = [candidate_id for candidate_id in redis_client.zrevrange(POPULAR_KEY, 0, limit * 3 - 1)
+                       if candidate_id != user_id]
+            followed = Follow.followed_among(user_id, popular)
+            candidate_ids = [candidate_id for candidate_id in popular if candidate_id not in followed][:limit]
+
+        profiles = ProfileCache.get_many(candidate_ids)
+        return [profiles[candidate_id] for candidate_id in candidate_ids if candidate_id in profiles]
+
+    @staticmethod
+    def discard(user_id, candidate_id):
+        """Quita una cuenta recién seguida de las recomendaciones del usuario"""
+        redis_client.zrem(RecommendationService.key(user_id), str(candidate_id))
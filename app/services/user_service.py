@@ -1,8 +1,12 @@
 from datetime import datetime
-from pymongo import ReturnDocument
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Union, Tuple
 from bson.objectid import ObjectId
 from app.models.user_models import User
+from app.models.follow_models import Follow
+from app.utils.profile_cache import ProfileCache
+from app.utils.pagination import Cursor
+from app.utils.text_search import tokenize
+
 class UserService:
     
     @staticmethod
@@ -19,16 +23,7 @@ class UserService:
     
     @staticmethod
     def verify_follower(user_id, follower_id):
-        exists_follower = User.collection.find_one({
-            "_id": ObjectId(user_id),
-            "followers": {
-                "$elemMatch": {
-                    "user_id": follower_id
-                }
-            }
-        })
-
-        return exists_follower is not None
+        return Follow.exists(follower_id, user_id)
     
     @staticmethod
     def get_user_by_id(user_id: str) -> Optional[Dict]:
@@ -45,6 +40,14 @@ class UserService:
 
     
 
+    @staticmethod
+    def get_public_profile(user_id: str) -> Optional[Dict]:
+        return ProfileCache.get_by_id(user_id)
+
+    @staticmethod
+    def get_public_profile_by_username(username: str) -> Optional[Dict]:
+        return ProfileCache.get_by_username(username)
+
     @staticmethod
     def get_user_by_email(email: str) -> Optional[Dict]:
         return User.find_by_email(email)
@@ -88,31 +91,11 @@ class UserService:
             target_user_id = ObjectId(target_user_id)
         except Exception:
             return False
-        
-        result_followers = User.collection.find_one_and_update(
-            {"_id":target_user_id},
-            {"$addToSet":{"followers":user_id}},
-            return_document=ReturnDocument.BEFORE
-        )
 
-        if result_followers is None:
-            return False
-        
-        result_following = User.collection.find_one_and_update(
-            {"_id":user_id},
-            {"$addToSet":{"following":target_user_id}},
-            return_document=ReturnDocument.BEFORE
-        )
-        if result_following is None:
-            User.collection.update_one(
-                {"_id":target_user_id},
-                {"$pull":{"followers":user_id}}
-            )
-            return False
-        
-        # verificar si ya estaba siguiendo 
-        if target_user_id in result_following.get("following",[]):
-            return True  # ya estaba siguiendo
+        # Una sola escritura indexada; los contadores solo cambian si la relación es nueva
+        if Follow.create(user_id, target_user_id):
+            User.adjust_follow_counts(user_id, target_user_id, 1)
+            ProfileCache.invalidate(user_id, target_user_id)
 
         return True
     
@@ -125,70 +108,53 @@ class UserService:
             target_user_id = ObjectId(target_user_id)
         except Exception:
             return False
-        
 
-        # Remove from following and followers lists
-        result_unfollower = User.collection.find_one_and_update(
-            {"_id":target_user_id},
-            {"$pull":{"followers":user_id}},
-            return_document=ReturnDocument.BEFORE
-        )
+        if Follow.delete(user_id, target_user_id):
+            User.adjust_follow_counts(user_id, target_user_id, -1)
+            ProfileCache.invalidate(user_id, target_user_id)
 
-        if result_unfollower is None:
-            return False
-        result_unfollowing = User.collection.find_one_and_update(
-            {"_id":user_id},
-            {"$pull":{"following":target_user_id}},
-            return_document=ReturnDocument.BEFORE
-        )
-        if result_unfollowing is None:
-            User.collection.update_one(
-                {"_id":target_user_id},
-                {"$addToSet":{"followers":user_id}}
-            )
-            return False
-        
         return True
     
     @staticmethod
-    def get_followers(user_id: str, limit: int = 20, skip: int = 0) -> List[Dict]:
-       
-        user = User.find_by_id(user_id)
-        if not user:
-            return []
-            
-        follower_ids = user.get('followers', [])
-        return list(User.collection.find(
-            {"_id": {"$in": follower_ids}},
-            {"password": 0}  # Exclude password field
-        ).skip(skip).limit(limit))
+    def get_followers(user_id: str, limit: int = 20, after: list = None) -> Tuple[List[Dict], Optional[str]]:
+        """Página de seguidores y cursor de la siguiente"""
+        follower_ids = Follow.page_follower_ids(user_id, limit, after)
+        return UserService._users_in_order(follower_ids), UserService.next_cursor(follower_ids, limit)
         
     @staticmethod
-    def get_following_ids(user_id:str)->Optional[Dict]:
-        pass
+    def get_following_ids(user_id: str) -> List[str]:
+        try:
+            return [str(following_id) for following_id in Follow.following_ids(user_id)]
+        except Exception:
+            return []
     
     @staticmethod
-    def get_following(user_id: str, limit: int = 20, skip: int = 0) -> List[Dict]:
-       
-        user = User.find_by_id(user_id)
-        if not user:
-            return []
-            
-        following_ids = user.get('following', [])
-        return list(User.collection.find(
-            {"_id": {"$in": following_ids}},
+    def get_following(user_id: str, limit: int = 20, after: list = None) -> Tuple[List[Dict], Optional[str]]:
+        """Página de cuentas seguidas y cursor de la siguiente"""
+        following_ids = Follow.page_following_ids(user_id, limit, after)
+        return UserService._users_in_order(following_ids), UserService.next_cursor(following_ids, limit)
+
+    @staticmethod
+    def _users_in_order(user_ids: List[ObjectId]) -> List[Dict]:
+        users = {user['_id']: user for user in User.collection.find(
+            {"_id": {"$in": user_ids}},
             {"password": 0}  # Exclude password field
-        ).skip(skip).limit(limit))
+        )}
+        return [users[user_id] for user_id in user_ids if user_id in users]
     
     @staticmethod
-    def search_users(query: str, limit: int = 20, skip: int = 0) -> List[Dict]:
-      
-        # Create regex pattern for case-insensitive search
-        pattern = f".*{query}.*"
-        regex = {"$regex": pattern, "$options": "i"}
-        
-        # Search in username and bio fields
-        return list(User.collection.find(
-            {"$or": [{"username": regex}, {"bio": regex}]},
-            {"password": 0}  # Exclude password field
-        ).skip(skip).limit(limit))
\ No newline at end of file
+    def search_users(query: str, limit: int = 20, after: list = None) -> Tuple[List[Dict], Optional[str]]:
+        """Usuarios ordenados por relevancia y cursor de la página siguiente"""
+        tokens = tokenize(query)
+        if not tokens:
+            return [], None
+        users = User.search(tokens, limit, after)
+        return users, Cursor.next_for(users, limit, User.SEARCH_FIELDS)
+
+    @staticmethod
+    def next_cursor(page_ids: List[ObjectId], limit: int) -> Optional[str]:
+        # El cursor sale de los IDs de la relación, no de los usuarios cargados:
+        # una cuenta borrada no debe cortar la paginación
+        if len(page_ids) < limit or not page_ids:
+            return None
+        return Cursor.encode([page_ids[-1]])
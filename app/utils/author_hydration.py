@@ -0,0 +1,58 @@
+from flask import g, has_request_context, current_app
+from app.utils.profile_cache import ProfileCache
+
+
+class AuthorHydration:
+    """Carga los autores de una página de publicaciones con una sola consulta"""
+
+    @staticmethod
+    def load_authors(posts: list) -> dict:
+        """Devuelve {user_id: autor} para los autores distintos de la página"""
+        author_ids = AuthorHydration.author_ids(posts)
+        if not author_ids:
+            return {}
+
+        authors = AuthorHydration.from_profiles(ProfileCache.get_many(author_ids))
+        # Antes: una consulta por publicación. Ahora: como mucho una por página
+        # (ninguna si todos los autores están en la cache de perfiles).
+        AuthorHydration.record_saved_round_trips(len(posts) - 1)
+        return authors
+
+    @staticmethod
+    def author_ids(posts: list) -> list:
+        return list(dict.fromkeys(str(post['user_id']) for post in posts if post.get('user_id')))
+
+    @staticmethod
+    def from_profiles(profiles: dict) -> dict:
+        """{user_id: perfil} -> {user_id: autor} con los campos que se publican"""
+        return {
+            user_id: {
+                "id": profile['id'],
+                "username": profile['username'],
+                "profile_pic_url": profile['profile_pic_url']
+            }
+            for user_id, profile in profiles.items()
+        }
+
+    @staticmethod
+    def author_for(post: dict, authors: dict) -> dict:
+        """Autor de la publicación, con valores vacíos si el usuario ya no existe"""
+        user_id = str(post.get('user_id', ''))
+        return authors.get(user_id) or {
+            "id": user_id,
+            "username": "",
+            "profile_pic_url": ""
+        }
+
+    @staticmethod
+    def record_saved_round_trips(saved: int):
+        if saved <= 0 or not has_request_context():
+            return
+        g.author_round_trips_saved = g.get('author_round_trips_saved', 0) + saved
+        current_app.logger.debug("author hydration saved %d round trips", saved)
+
+    @staticmethod
+    def saved_round_trips() -> int:
+        if not has_request_context():
+            return 0
+        return g.get('author_round_trips_saved', 0)
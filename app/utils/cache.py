@@ -0,0 +1,193 @@
+import json
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from app.config import Config
+from app.extensions.redis_extencion import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Borra el lock solo si sigue siendo nuestro (pudo caducar y tomarlo otro)
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class CacheMetrics:
+    """Contadores por namespace en memoria del proceso.
+
+    Eventos: hit, stale (se sirvió caducado mientras se refresca), early
+    (refresco anticipado), miss, wait (esperó a que otro calculara),
+    timeout (la espera se agotó y calculó él) y error.
+    """
+
+    _counters = defaultdict(lambda: defaultdict(int))
+    _lock = threading.Lock()
+
+    @staticmethod
+    def record(namespace: str, event: str, amount: int = 1):
+        with CacheMetrics._lock:
+            CacheMetrics._counters[namespace][event] += amount
+
+    @staticmethod
+    def snapshot() -> dict:
+        with CacheMetrics._lock:
+            return {namespace: dict(events) for namespace, events in CacheMetrics._counters.items()}
+
+    @staticmethod
+    def hit_ratio(namespace: str) -> float:
+        events = CacheMetrics.snapshot().get(namespace, {})
+        served = events.get("hit", 0) + events.get("stale", 0) + events.get("early", 0)
+        total = served + events.get("miss", 0)
+        return served / total if total else 0.0
+
+
+class Cache:
+    """Cache de vistas en Redis protegida contra estampidas.
+
+    - Un solo cálculo por clave entre todos los procesos (lock SET NX); el
+      resto espera a que aparezca el valor.
+    - Stale-while-revalidate: pasado `ttl` el valor se sigue sirviendo
+      durante `stale_ttl` mientras un hilo lo recalcula.
+    - Expiración anticipada probabilística (XFetch): cuanto más cerca de
+      caducar y más caro de calcular, más probable es que una petición lo
+      refresque antes de tiempo, así que las claves calientes no caducan.
+
+    Los valores se guardan como JSON junto con lo que costó calcularlos y
+    el instante en que caducan.
+    """
+
+    _release = redis_client.register_script(_RELEASE_LOCK_SCRIPT)
+
+    @staticmethod
+    def _key(namespace: str, key) -> str:
+        return f"cache:{namespace}:{key}"
+
+    @staticmethod
+    def _lock_key(namespace: str, key) -> str:
+        return f"cache:lock:{namespace}:{key}"
+
+    @staticmethod
+    def acquire_lock(namespace: str, key, ttl=None):
+        """Token del lock de cálculo, o None si otro proceso lo tiene"""
+        token = uuid.uuid4().hex
+        if redis_client.set(Cache._lock_key(namespace, key), token, nx=True,
+                            ex=ttl or Config.CACHE_LOCK_TTL):
+            return token
+        return None
+
+    @staticmethod
+    def release_lock(namespace: str, key, token):
+        Cache._release(keys=[Cache._lock_key(namespace, key)], args=[token])
+
+    @staticmethod
+    def single_flight(namespace: str, key, fn, ready, wait=None) -> bool:
+        """Ejecuta fn si consigue el lock; si no, espera hasta que ready() sea cierto.
+
+        Devuelve True si ejecutó fn o el resultado apareció a tiempo.
+        """
+        token = Cache.acquire_lock(namespace, key)
+        if token is not None:
+            try:
+                fn()
+            finally:
+                Cache.release_lock(namespace, key, token)
+            return True
+
+        CacheMetrics.record(namespace, "wait")
+        deadline = time.monotonic() + (Config.CACHE_LOCK_WAIT if wait is None else wait)
+        while time.monotonic() < deadline:
+            if ready():
+                return True
+            time.sleep(0.05)
+        CacheMetrics.record(namespace, "timeout")
+        return False
+
+    @staticmethod
+    def refresh_in_background(namespace: str, key, fn) -> bool:
+        """Lanza fn en un hilo si nadie la está ejecutando ya para esta clave"""
+        token = Cache.acquire_lock(namespace, key)
+        if token is None:
+            return False
+
+        def run():
+            try:
+                fn()
+            except Exception:
+                CacheMetrics.record(namespace, "error")
+                logger.exception("background refresh of %s:%s failed", namespace, key)
+            finally:
+                Cache.release_lock(namespace, key, token)
+
+        threading.Thread(target=run, name=f"cache-refresh-{namespace}", daemon=True).start()
+        return True
+
+    @staticmethod
+    def _store(namespace: str, key, compute, ttl: int, stale_ttl: int):
+        started = time.monotonic()
+        value = compute()
+        envelope = {
+            "value": value,
+            "delta": time.monotonic() - started,
+            "expires_at": time.time() + ttl,
+        }
+        redis_client.set(Cache._key(namespace, key), json.dumps(envelope), ex=ttl + stale_ttl)
+        return value
+
+    @staticmethod
+    def _load(namespace: str, key):
+        raw = redis_client.get(Cache._key(namespace, key))
+        return json.loads(raw) if raw else None
+
+    @staticmethod
+    def get_or_compute(namespace: str, key, compute, ttl: int, stale_ttl=None, beta=None):
+        """Valor cacheado de compute() (serializable a JSON)"""
+        stale_ttl = Config.CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+        beta = Config.CACHE_XFETCH_BETA if beta is None else beta
+
+        def refresh():
+            Cache._store(namespace, key, compute, ttl, stale_ttl)
+
+        envelope = Cache._load(namespace, key)
+        if envelope is not None:
+            now = time.time()
+            if now >= envelope["expires_at"]:
+                CacheMetrics.record(namespace, "stale")
+                Cache.refresh_in_background(namespace, key, refresh)
+            elif now - envelope["delta"] * beta * math.log(1.0 - random.random()) >= envelope["expires_at"]:
+                # XFetch: -log(u) es exponencial, así que el adelanto crece con el coste
+                CacheMetrics.record(namespace, "early")
+                Cache.refresh_in_background(namespace, key, refresh)
+            else:
+                CacheMetrics.record(namespace, "hit")
+            return envelope["value"]
+
+        CacheMetrics.record(namespace, "miss")
+        result = {}
+
+        def compute_once():
+            result["value"] = Cache._store(namespace, key, compute, ttl, stale_ttl)
+
+        def ready():
+            result["envelope"] = Cache._load(namespace, key)
+            return result["envelope"] is not None
+
+        if Cache.single_flight(namespace, key, compute_once, ready):
+            if "value" in result:
+                return result["value"]
+            return result["envelope"]["value"]
+        # Quien tenía el lock no terminó a tiempo: se calcula sin cachear
+        return compute()
+
+    @staticmethod
+    def invalidate(namespace: str, *keys):
+        if keys:
+            redis_client.delete(*(Cache._key(namespace, key) for key in keys))
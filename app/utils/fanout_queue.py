@@ -0,0 +1,178 @@
+import json
+import logging
+import time
+
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+from app.config import Config
+from app.extensions.redis_extencion import blocking_redis_client, redis_client
+from app.utils.feed_cache import FeedCache
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "queue:fanout"
+DEAD_LETTER_KEY = "queue:fanout:dead"
+# Trabajos fallidos a la espera de reintento (sorted set miembro -> instante en que toca)
+RETRY_KEY = "queue:fanout:retry"
+
+# Pasa a la cola los reintentos vencidos. KEYS[1] reintentos, KEYS[2] cola;
+# ARGV[1] ahora (epoch), ARGV[2] máximo por llamada
+_PROMOTE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, job in ipairs(due) do
+    redis.call('LPUSH', KEYS[2], job)
+    redis.call('ZREM', KEYS[1], job)
+end
+return #due
+"""
+
+
+class FanoutQueue:
+    """Cola en Redis de trabajos de distribución de posts a los feeds.
+
+    La petición solo hace un LPUSH; app/workers/fanout_worker.py consume la
+    cola por lotes. Cada trabajo se mueve (LMOVE) a la lista de proceso del
+    worker y se borra de ella al terminar, así que si el worker muere los
+    trabajos en curso se recuperan al arrancar de nuevo. Los que fallan se
+    reintentan con espera exponencial hasta FANOUT_MAX_ATTEMPTS veces y
+    después pasan a la lista de dead-letter.
+    """
+
+    _promote = redis_client.register_script(_PROMOTE_SCRIPT)
+
+    @staticmethod
+    def processing_key(worker_id) -> str:
+        return f"queue:fanout:processing:{worker_id}"
+
+    @staticmethod
+    def enqueue(user_id, post_id, created_at=None):
+        job = {
+            "user_id": str(user_id),
+            "post_id": str(post_id),
+            "score": FeedCache.score(created_at),
+            "attempts": 0
+        }
+        if Config.FANOUT_MODE == 'inline':
+            FanoutQueue.process([job])
+            return
+        try:
+            redis_client.lpush(QUEUE_KEY, json.dumps(job))
+        except (RedisConnectionError, RedisTimeoutError):
+            # El post ya está en MongoDB: no se falla la petición (el cliente
+            # lo reintentaría y lo duplicaría). Los feeds lo recogen al
+            # reconstruirse desde MongoDB
+            logger.exception("could not enqueue fan-out for post %s", job["post_id"])
+
+    @staticmethod
+    def run(job: dict) -> bool:
+        try:
+            FeedCache.add_post_to_feed(job["user_id"], job["post_id"], job["score"])
+            return True
+        except Exception:
+            logger.exception("fan-out failed for post %s", job.get("post_id"))
+            FanoutQueue.retry(job)
+            return False
+
+    @staticmethod
+    def process(jobs: list) -> int:
+        """Ejecuta los trabajos; devuelve cuántos se completaron"""
+        return sum(1 for job in jobs if FanoutQueue.run(job))
+
+    @staticmethod
+    def process_batch(worker_id, entries: list) -> int:
+        """Ejecuta un lote de pop_batch y lo confirma (LREM de la lista de proceso).
+
+        Los reintentos se programan antes de confirmar: si el worker muere
+        entre medias el trabajo se repite, y repetir un fan-out no cambia
+        los feeds (ZADD con el mismo score).
+        """
+        processing_key = FanoutQueue.processing_key(worker_id)
+        done = 0
+        for raw, job in entries:
+            if job is None:
+                redis_client.lpush(DEAD_LETTER_KEY, raw)
+            elif FanoutQueue.run(job):
+                done += 1
+            redis_client.lrem(processing_key, 1, raw)
+        return done
+
+    @staticmethod
+    def retry_delay(attempts: int) -> float:
+        return min(Config.FANOUT_RETRY_DELAY * 2 ** (attempts - 1), Config.FANOUT_RETRY_MAX_DELAY)
+
+    @staticmethod
+    def retry(job: dict):
+        job["attempts"] = job.get("attempts", 0) + 1
+        if job["attempts"] >= Config.FANOUT_MAX_ATTEMPTS:
+            redis_client.lpush(DEAD_LETTER_KEY, json.dumps(job))
+        else:
+            # Espera exponencial: una caída corta de MongoDB o Redis no agota los intentos
+            redis_client.zadd(RETRY_KEY, {json.dumps(job): time.time() + FanoutQueue.retry_delay(job["attempts"])})
+
+    @staticmethod
+    def promote_due(limit=None) -> int:
+        """Devuelve a la cola los reintentos cuya espera ha terminado"""
+        return int(FanoutQueue._promote(keys=[RETRY_KEY, QUEUE_KEY],
+                                        args=[time.time(), limit or Config.FANOUT_QUEUE_BATCH]))
+
+    @staticmethod
+    def recover(worker_id) -> int:
+        """Devuelve a la cola los trabajos que el worker dejó a medias al morir"""
+        processing_key = FanoutQueue.processing_key(worker_id)
+        recovered = 0
+        while redis_client.lmove(processing_key, QUEUE_KEY, "RIGHT", "RIGHT") is not None:
+            recovered += 1
+        return recovered
+
+    @staticmethod
+    def pop_batch(worker_id, batch_size=None, timeout=5) -> list:
+        """Espera un trabajo y recoge hasta batch_size sin bloquear más.
+
+        Devuelve [(raw, job)] (job es None si no es JSON válido); los
+        trabajos quedan en la lista de proceso hasta process_batch.
+        """
+        batch_size = batch_size or Config.FANOUT_QUEUE_BATCH
+        processing_key = FanoutQueue.processing_key(worker_id)
+        raw_jobs = []
+        if timeout:
+            # El pool normal corta a REDIS_SOCKET_TIMEOUT, antes de que BLMOVE devuelva nada
+            first = blocking_redis_client.blmove(QUEUE_KEY, processing_key, timeout, "RIGHT", "LEFT")
+            if first is None:
+                return []
+            raw_jobs.append(first)
+        if batch_size > len(raw_jobs):
+            pipe = redis_client.pipeline(transaction=False)
+            for _ in range(batch_size - len(raw_jobs)):
+                pipe.lmove(QUEUE_KEY, processing_key, "RIGHT", "LEFT")
+            raw_jobs.extend(raw for raw in pipe.execute() if raw is not None)
+
+        entries = []
+        for raw in raw_jobs:
+            try:
+                entries.append((raw, json.loads(raw)))
+            except ValueError:
+                entries.append((raw, None))
+        return entries
+
+    @staticmethod
+    def run_pending(batch_size=None, worker_id="inline") -> int:
+        """Vacía la cola en el proceso actual (sustituye al worker en tests)"""
+        processed = 0
+        while True:
+            entries = FanoutQueue.pop_batch(worker_id, batch_size, timeout=0)
+            if not entries:
+                return processed
+            processed += FanoutQueue.process_batch(worker_id, entries)
+
+    @staticmethod
+    def requeue_dead_letters() -> int:
+        """Devuelve a la cola los trabajos de la dead-letter con los intentos a cero"""
+        moved = 0
+        while True:
+            raw = redis_client.rpop(DEAD_LETTER_KEY)
+            if raw is None:
+                return moved
+            job = json.loads(raw)
+            job["attempts"] = 0
+            redis_client.lpush(QUEUE_KEY, json.dumps(job))
+            moved += 1
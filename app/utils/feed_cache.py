@@ -1,69 +1,231 @@
 from app.extensions.redis_extencion import redis_client
 from bson.objectid import ObjectId
-from pymongo import DESCENDING
+from datetime import datetime, timezone
 
+import heapq
 import time
+from app.config import Config
 from app.models.user_models import User
 from app.models.post_models import Post
+from app.services.user_service import UserService
+from app.utils.cache import Cache, CacheMetrics
 
 MAX_FEED_GLOBAL = 500
+# Cuentas cuyos posts se mezclan en lectura en lugar de distribuirse
+CELEBRITIES_KEY = "feed:celebrities"
+# Margen de lectura para posts con el mismo score que el cursor
+FEED_CURSOR_TIE_WINDOW = 32
+GLOBAL_FEED_KEY = "feed:global"
+GLOBAL_FEED_REBUILD_KEY = "feed:global:rebuild"
 
 
 class FeedCache:
 
+    @staticmethod
+    def built_key(user_id) -> str:
+        # Un sorted set vacío no existe en Redis: esta marca evita reconstruir
+        # en cada petición el feed de quien no sigue a nadie con posts
+        return f"feed:{user_id}:built"
+
+    @staticmethod
+    def built_keys(user_id) -> tuple:
+        """Claves cuya existencia indica que el feed del usuario está construido"""
+        return f"feed:{user_id}", FeedCache.built_key(user_id)
+
     @staticmethod
     def repopulate_user_feed(user_id):
+        """Reconstruye el feed del usuario con una consulta y una escritura"""
         user_id = str(user_id)
-        followings = User.get_following_by_user_id(user_id)
-  
-        for following_id in followings:
-            redis_client.sadd(f"following:{user_id}", str(following_id))
-        redis_client.delete(f"feed:{user_id}")
-        
-        for following_id in followings:
-
-            posts = list(Post.collection.find(
-                {"user_id": str(following_id)},
-                {"_id": 1}
-            ))
-            for post in posts:
-                post_id = str(post["_id"]) 
-                print(post_id) 
-                redis_client.zadd(f"feed:{user_id}", {post_id: time.time()})
-    @staticmethod
-    def repopulate_global_feed():
-        posts = list(Post.collection.find({}).sort("created_at",DESCENDING).limit(100))
-        if posts!=[]:
-
-            for post in posts:
-                FeedCache.add_post_to_feed(
-                    user_id=post["user_id"],
-                    post_id=str(post["_id"]),
-                    created_at=time.time()
-                )
-    @staticmethod
-    def add_post_to_feed(user_id,post_id):
-        followers_cache = redis_client.smembers(f"followers:{user_id}")
-        if not followers_cache:
-            for follower_id in User.get_followers_by_user_id(user_id):
-                redis_client.sadd(f"followers:{user_id}",str(follower_id))
-                redis_client.zadd(f"feed:{follower_id}",{post_id:time.time()})
-
-        for follower_id in followers_cache:
-            redis_client.zadd(f"feed:{follower_id}",{post_id:time.time()})
-        
-        redis_client.zadd("feed:global",{post_id:time.time()})
-        redis_client.zremrangebyrank("feed:global", 0, -MAX_FEED_GLOBAL-1)
-    @staticmethod
-    def get_feed_global(page=1,limit=20):
-        start = (page-1)*limit
-        end = start+limit-1
-        return redis_client.zrevrange('feed:global',start,end)
-    @staticmethod
-    def get_feed_user(user_id:str,count=10):    
-        post_ids = redis_client.zrevrange(f"feed:{user_id}",0,count-1)
-        return post_ids
-        
-        
+        followings = UserService.get_following_ids(user_id)
+        following_key = f"following:{user_id}"
+        feed_key = f"feed:{user_id}"
+
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.delete(following_key, feed_key)
+        if followings:
+            pipe.sadd(following_key, *followings)
+            posts = Post.find_recent_ids_by_users(followings, Config.FEED_MAX_LENGTH)
+            if posts:
+                pipe.zadd(feed_key, {
+                    str(post["_id"]): FeedCache.score(post["created_at"])
+                    for post in posts
+                })
+        pipe.set(FeedCache.built_key(user_id), 1, ex=Config.FEED_BUILT_TTL)
+        pipe.execute()
 
+    @staticmethod
+    def ensure_user_feed(user_id):
+        """Reconstruye el feed del usuario si no existe, una sola vez aunque
+        lleguen varias peticiones a la vez"""
+        keys = FeedCache.built_keys(user_id)
+        if redis_client.exists(*keys):
+            return
+        CacheMetrics.record("feed_user", "miss")
+        Cache.single_flight("feed_user", user_id,
+                            lambda: FeedCache.repopulate_user_feed(user_id),
+                            lambda: redis_client.exists(*keys))
+
+    @staticmethod
+    def rebuild_global_feed():
+        """Reconstruye feed:global con los últimos posts en una sola escritura"""
+        posts = Post.find_recent_ids(MAX_FEED_GLOBAL)
+        # Se escribe en una clave aparte y se sustituye con RENAME: los
+        # lectores nunca ven el feed vacío ni a medio escribir
+        pipe = redis_client.pipeline(transaction=True)
+        if posts:
+            pipe.delete(GLOBAL_FEED_REBUILD_KEY)
+            pipe.zadd(GLOBAL_FEED_REBUILD_KEY, {
+                str(post["_id"]): FeedCache.score(post["created_at"])
+                for post in posts
+            })
+            # Los posts distribuidos entre la consulta y el EXEC ya están en
+            # feed:global; se mezclan para que el RENAME no los pierda
+            pipe.zunionstore(GLOBAL_FEED_REBUILD_KEY, [GLOBAL_FEED_REBUILD_KEY, GLOBAL_FEED_KEY], aggregate="MAX")
+            pipe.zremrangebyrank(GLOBAL_FEED_REBUILD_KEY, 0, -MAX_FEED_GLOBAL - 1)
+            pipe.rename(GLOBAL_FEED_REBUILD_KEY, GLOBAL_FEED_KEY)
+        # Sin posts en MongoDB se conserva lo que haya distribuido el fan-out
+        pipe.expire(GLOBAL_FEED_KEY, Config.GLOBAL_FEED_TTL)
+        pipe.execute()
+
+    @staticmethod
+    def ensure_global_feed():
+        """Garantiza que feed:global existe y lo refresca antes de que caduque.
+
+        En frío reconstruye en la petición (una sola a la vez; el resto
+        espera a que aparezca el feed). Si está a menos de
+        GLOBAL_FEED_REFRESH_AHEAD segundos de caducar, o se creó sin TTL al
+        distribuir un post con el feed vacío, se refresca en segundo plano
+        y mientras tanto se sirve el actual.
+        """
+        ttl = redis_client.ttl(GLOBAL_FEED_KEY)
+        if ttl == -2:
+            CacheMetrics.record("feed_global", "miss")
+            Cache.single_flight("feed_global", GLOBAL_FEED_KEY, FeedCache.rebuild_global_feed,
+                                lambda: redis_client.exists(GLOBAL_FEED_KEY),
+                                wait=Config.GLOBAL_FEED_WAIT)
+        elif ttl == -1 or ttl < Config.GLOBAL_FEED_REFRESH_AHEAD:
+            CacheMetrics.record("feed_global", "early")
+            Cache.refresh_in_background("feed_global", GLOBAL_FEED_KEY, FeedCache.rebuild_global_feed)
+        else:
+            CacheMetrics.record("feed_global", "hit")
+
+    @staticmethod
+    def score(created_at=None) -> float:
+        """Puntuación del sorted set a partir de la fecha de creación del post"""
+        if created_at is None:
+            return time.time()
+        if isinstance(created_at, datetime):
+            # Los posts se guardan con datetime.utcnow() (sin zona horaria)
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)
+            return created_at.timestamp()
+        return float(created_at)
+
+    @staticmethod
+    def is_celebrity(user_id) -> bool:
+        return bool(redis_client.sismember(CELEBRITIES_KEY, str(user_id)))
+
+    @staticmethod
+    def count_followers(user_id) -> int:
+        """Cuenta los seguidores cacheados, cargándolos de MongoDB si no lo están"""
+        key = f"followers:{user_id}"
+        total = redis_client.scard(key)
+        if total:
+            return total
+        followers = [str(follower_id) for follower_id in (User.get_followers_by_user_id(user_id) or [])]
+        if followers:
+            # Un solo SADD con todos los miembros en lugar de uno por seguidor
+            redis_client.sadd(key, *followers)
+        return len(followers)
+
+    @staticmethod
+    def add_post_to_feed(user_id, post_id, created_at=None):
+        """Distribuye un post a los feeds de los seguidores del autor.
 
+        Las cuentas con más de CELEBRITY_FOLLOWER_THRESHOLD seguidores no se
+        distribuyen: el post se guarda en su timeline y se mezcla al leer.
+        """
+        user_id = str(user_id)
+        post_id = str(post_id)
+        score = FeedCache.score(created_at)
+        total_followers = FeedCache.count_followers(user_id)
+
+        pipe = redis_client.pipeline(transaction=False)
+        if total_followers >= Config.CELEBRITY_FOLLOWER_THRESHOLD:
+            timeline_key = f"timeline:{user_id}"
+            pipe.sadd(CELEBRITIES_KEY, user_id)
+            pipe.zadd(timeline_key, {post_id: score})
+            pipe.zremrangebyrank(timeline_key, 0, -Config.FEED_MAX_LENGTH - 1)
+        else:
+            pipe.srem(CELEBRITIES_KEY, user_id)
+            pending = 0
+            for follower_id in redis_client.sscan_iter(f"followers:{user_id}", count=Config.FANOUT_BATCH_SIZE):
+                feed_key = f"feed:{follower_id}"
+                pipe.zadd(feed_key, {post_id: score})
+                pipe.zremrangebyrank(feed_key, 0, -Config.FEED_MAX_LENGTH - 1)
+                pending += 1
+                if pending >= Config.FANOUT_BATCH_SIZE:
+                    pipe.execute()
+                    pending = 0
+
+        pipe.zadd(GLOBAL_FEED_KEY, {post_id: score})
+        pipe.zremrangebyrank(GLOBAL_FEED_KEY, 0, -MAX_FEED_GLOBAL - 1)
+        pipe.execute()
+
+    @staticmethod
+    def queue_page_reads(pipe, keys: list, limit: int, after=None):
+        """Encola en `pipe` la lectura de una página de cada sorted set.
+
+        Sirve igual para un pipeline síncrono que para uno de redis.asyncio.
+        """
+        for key in keys:
+            if after is None:
+                pipe.zrevrange(key, 0, limit - 1, withscores=True)
+            else:
+                pipe.zrevrangebyscore(key, after[0], "-inf", start=0,
+                                      num=limit + FEED_CURSOR_TIE_WINDOW, withscores=True)
+
+    @staticmethod
+    def merge_page(results: list, limit: int, after=None) -> tuple:
+        """Mezcla las lecturas de queue_page_reads en una página y su cursor"""
+        if limit <= 0:
+            return [], None
+        entries = {}
+        for result in results:
+            for post_id, score in result:
+                if after is not None and (score, post_id) >= (after[0], after[1]):
+                    continue
+                entries[post_id] = score
+
+        page = heapq.nlargest(limit, entries.items(), key=lambda item: (item[1], item[0]))
+        next_after = None
+        if len(page) == limit:
+            next_after = [page[-1][1], page[-1][0]]
+        return [post_id for post_id, _ in page], next_after
+
+    @staticmethod
+    def _read_page(keys: list, limit: int, after=None) -> tuple:
+        """Lee una página de uno o varios sorted sets ordenados por (score, post_id).
+
+        `after` es (score, post_id) del último elemento devuelto. Se lee con
+        ZREVRANGEBYSCORE desde ese score, así que el coste no depende de la
+        profundidad. Los elementos con el mismo score se ordenan por post_id
+        descendente, igual que en Redis.
+        """
+        pipe = redis_client.pipeline(transaction=False)
+        FeedCache.queue_page_reads(pipe, keys, limit, after)
+        return FeedCache.merge_page(pipe.execute(), limit, after)
+
+    @staticmethod
+    def user_feed_keys(user_id, celebrities) -> list:
+        return [f"feed:{user_id}"] + [f"timeline:{celebrity_id}" for celebrity_id in celebrities]
+
+    @staticmethod
+    def get_feed_global(limit=20, after=None):
+        return FeedCache._read_page([GLOBAL_FEED_KEY], limit, after)
+
+    @staticmethod
+    def get_feed_user(user_id:str, limit=20, after=None):
+        """Feed del usuario mezclado con los timelines de las cuentas celebridad que sigue"""
+        celebrities = redis_client.sinter(f"following:{user_id}", CELEBRITIES_KEY)
+        return FeedCache._read_page(FeedCache.user_feed_keys(user_id, celebrities), limit, after)
@@ -0,0 +1,163 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from PIL import Image, features
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePoolBusy(Exception):
+    """No hay hueco en la cola de imágenes dentro del tiempo de espera"""
+
+
+_ENCODERS = {
+    "avif": ("AVIF", ".avif", lambda quality: {"quality": quality}),
+    "webp": ("WEBP", ".webp", lambda quality: {"quality": quality, "method": 4}),
+    "jpeg": ("JPEG", ".jpg", lambda quality: {"quality": quality, "optimize": True, "progressive": True}),
+}
+
+
+def supported_format(preferred) -> str:
+    """Primer formato de la lista que soporta el Pillow instalado ('jpeg' siempre)"""
+    for name in preferred:
+        if name == "jpeg":
+            return name
+        try:
+            if features.check(name):
+                return name
+        except ValueError:
+            # Pillow antiguo: el formato ni siquiera se conoce
+            continue
+    return "jpeg"
+
+
+def _fit(size, max_size) -> tuple:
+    width, height = size
+    scale = min(max_size / max(width, height), 1)
+    return max(int(width * scale), 1), max(int(height * scale), 1)
+
+
+def _downscale(img, target):
+    # reduce() promedia bloques enteros (muy barato) y deja el ajuste fino a LANCZOS
+    factor = int(min(img.width / target[0], img.height / target[1]) / 2)
+    if factor > 1:
+        img = img.reduce(factor)
+    if img.size != target:
+        img = img.resize(target, Image.LANCZOS)
+    return img
+
+
+def encode_variants(source, variants: dict, preferred_formats, quality: int) -> dict:
+    """Decodifica una sola vez y codifica cada variante de tamaño en memoria.
+
+    variants: {nombre: lado máximo}. Cada variante se codifica en el primer
+    formato soportado de preferred_formats y la mayor además en JPEG
+    (clave "jpeg") como respaldo para clientes antiguos.
+    `source` son los bytes de la imagen o la ruta del fichero temporal en el
+    que se guardó la subida. Devuelve {nombre: (extensión, bytes)}.
+    """
+    fmt = supported_format(preferred_formats)
+    ordered = sorted(variants.items(), key=lambda item: item[1], reverse=True)
+    encoded = {}
+    with Image.open(BytesIO(source) if isinstance(source, bytes) else source) as img:
+        # En JPEG decodifica directamente a 1/2, 1/4 o 1/8 si sobra resolución
+        img.draft("RGB", _fit(img.size, ordered[0][1]))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+
+        source = img
+        for name, max_size in ordered:
+            source = _downscale(source, _fit(source.size, max_size))
+            encoded[name] = _encode(source, fmt, quality)
+            if "jpeg" not in encoded:
+                encoded["jpeg"] = encoded[name] if fmt == "jpeg" else _encode(source, "jpeg", quality)
+    return encoded
+
+
+def render_variants(source, base_path: str, variants: dict, preferred_formats, quality: int):
+    """Guarda las variantes junto a base_path como `<base>_<nombre>.<ext>`.
+
+    Devuelve {nombre: fichero} o None si la imagen no se pudo procesar.
+    Se ejecuta en el proceso hijo.
+    """
+    root = os.path.splitext(base_path)[0]
+    try:
+        encoded = encode_variants(source, variants, preferred_formats, quality)
+    except Exception as e:
+        logger.warning("could not process image %s: %s", base_path, e)
+        return None
+
+    saved = {}
+    written = {}
+    for name, (extension, payload) in encoded.items():
+        if id(payload) not in written:
+            path = f"{root}_{name}{extension}"
+            with open(path, "wb") as f:
+                f.write(payload)
+            written[id(payload)] = os.path.basename(path)
+        saved[name] = written[id(payload)]
+    return saved
+
+
+def _encode(img, fmt, quality) -> tuple:
+    format_name, extension, options = _ENCODERS[fmt]
+    buffer = BytesIO()
+    img.save(buffer, format=format_name, **options(quality))
+    return extension, buffer.getvalue()
+
+
+class ImagePool:
+    """Pool de procesos compartido para el trabajo de imágenes (CPU, sin GIL).
+
+    Se crea una vez por worker web (y de nuevo tras un fork). El número de
+    trabajos en vuelo está acotado por IMAGE_POOL_MAX_PENDING: si la cola
+    está llena, submit espera hasta IMAGE_QUEUE_TIMEOUT y después lanza
+    ImagePoolBusy para que la petición falle rápido en lugar de acumularse.
+    """
+
+    _executor = None
+    _pid = None
+    _lock = threading.Lock()
+    _slots = threading.BoundedSemaphore(Config.IMAGE_POOL_MAX_PENDING)
+
+    @staticmethod
+    def executor() -> ProcessPoolExecutor:
+        if ImagePool._executor is not None and ImagePool._pid == os.getpid():
+            return ImagePool._executor
+        with ImagePool._lock:
+            if ImagePool._executor is None or ImagePool._pid != os.getpid():
+                ImagePool._executor = ProcessPoolExecutor(
+                    max_workers=Config.IMAGE_POOL_WORKERS or multiprocessing.cpu_count(),
+                    mp_context=multiprocessing.get_context(Config.IMAGE_POOL_START_METHOD)
+                )
+                ImagePool._slots = threading.BoundedSemaphore(Config.IMAGE_POOL_MAX_PENDING)
+                ImagePool._pid = os.getpid()
+        return ImagePool._executor
+
+    @staticmethod
+    def submit(fn, *args):
+        executor = ImagePool.executor()
+        slots = ImagePool._slots
+        if not slots.acquire(timeout=Config.IMAGE_QUEUE_TIMEOUT):
+            raise ImagePoolBusy("Demasiadas imágenes en proceso, inténtalo más tarde")
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+    @staticmethod
+    def shutdown():
+        with ImagePool._lock:
+            if ImagePool._executor is not None and ImagePool._pid == os.getpid():
+                ImagePool._executor.shutdown(wait=False, cancel_futures=True)
+            ImagePool._executor = None
+            ImagePool._pid = None
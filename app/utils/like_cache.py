@@ -0,0 +1,135 @@
+import logging
+
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.extensions.redis_extencion import redis_client
+from app.models.post_models import Post
+from app.utils.post_fragments import PostFragments
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "likes:pending"
+FLUSHING_KEY = "likes:pending:flushing"
+
+# KEYS[1] set de usuarios que dieron like, KEYS[2] contador, KEYS[3] deltas pendientes,
+# KEYS[4] fragmento JSON del post (se borra si cambia el contador)
+# ARGV[1] usuario, ARGV[2] post, ARGV[3] contador inicial (MongoDB), ARGV[4] +1 / -1
+_TOGGLE_SCRIPT = """
+redis.call('SET', KEYS[2], ARGV[3], 'NX')
+local changed
+if tonumber(ARGV[4]) > 0 then
+    changed = redis.call('SADD', KEYS[1], ARGV[1])
+else
+    changed = redis.call('SREM', KEYS[1], ARGV[1])
+end
+if changed == 1 then
+    local count = redis.call('INCRBY', KEYS[2], ARGV[4])
+    redis.call('HINCRBY', KEYS[3], ARGV[2], ARGV[4])
+    redis.call('DEL', KEYS[4])
+    return {1, count}
+end
+return {0, tonumber(redis.call('GET', KEYS[2]))}
+"""
+
+
+class LikeCache:
+    """Likes en Redis: set de usuarios por post, contador atómico y deltas
+    pendientes que app/workers/like_flush_worker.py vuelca a MongoDB por lotes.
+
+    Mientras existe, el contador de Redis es el valor autoritativo de
+    likes_count; MongoDB lo alcanza en el siguiente volcado.
+    """
+
+    _toggle = redis_client.register_script(_TOGGLE_SCRIPT)
+
+    @staticmethod
+    def likers_key(post_id) -> str:
+        return f"likes:users:{post_id}"
+
+    @staticmethod
+    def count_key(post_id) -> str:
+        return f"likes:count:{post_id}"
+
+    @staticmethod
+    def _apply(post_id, user_id, seed_count, delta) -> tuple:
+        changed, count = LikeCache._toggle(
+            keys=[LikeCache.likers_key(post_id), LikeCache.count_key(post_id), PENDING_KEY,
+                  PostFragments.key(post_id)],
+            args=[str(user_id), str(post_id), int(seed_count), delta]
+        )
+        return bool(changed), int(count)
+
+    @staticmethod
+    def like(post_id, user_id, seed_count=0) -> tuple:
+        """Devuelve (cambió, likes_count); repetir el like no cambia nada"""
+        return LikeCache._apply(post_id, user_id, seed_count, 1)
+
+    @staticmethod
+    def unlike(post_id, user_id, seed_count=0) -> tuple:
+        return LikeCache._apply(post_id, user_id, seed_count, -1)
+
+    @staticmethod
+    def counts(post_ids: list) -> dict:
+        """{post_id: likes_count} de los posts que tienen contador en Redis"""
+        if not post_ids:
+            return {}
+        values = redis_client.mget([LikeCache.count_key(post_id) for post_id in post_ids])
+        return {post_id: int(value) for post_id, value in zip(post_ids, values) if value is not None}
+
+    @staticmethod
+    def liked_by(user_id, post_ids: list) -> set:
+        """Posts de la lista a los que el usuario ha dado like (un round trip)"""
+        if not user_id or not post_ids:
+            return set()
+        pipe = redis_client.pipeline(transaction=False)
+        for post_id in post_ids:
+            pipe.sismember(LikeCache.likers_key(post_id), str(user_id))
+        return {post_id for post_id, liked in zip(post_ids, pipe.execute()) if liked}
+
+    @staticmethod
+    def flush_pending() -> int:
+        """Vuelca a MongoDB los deltas acumulados; devuelve los posts actualizados.
+
+        Los deltas se apartan con RENAME para que los likes nuevos sigan
+        acumulándose mientras se escribe. Si un volcado anterior se
+        interrumpió, se termina antes de apartar el siguiente. Si el
+        bulk_write falla en parte, se quitan del hash los deltas ya
+        aplicados para que el reintento no los sume dos veces.
+        """
+        if not redis_client.exists(FLUSHING_KEY):
+            if not redis_client.exists(PENDING_KEY):
+                return 0
+            redis_client.rename(PENDING_KEY, FLUSHING_KEY)
+
+        pending = redis_client.hgetall(FLUSHING_KEY)
+        post_ids, operations = [], []
+        for post_id, delta in pending.items():
+            delta = int(delta)
+            if delta == 0:
+                continue
+            try:
+                operations.append(UpdateOne({"_id": ObjectId(post_id)}, {"$inc": {"likes_count": delta}}))
+                post_ids.append(post_id)
+            except Exception:
+                logger.warning("discarding like delta for invalid post id %s", post_id)
+        if operations:
+            try:
+                Post.collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                # Con ordered=False se aplican todas las operaciones salvo las de writeErrors
+                failed = {post_ids[error["index"]] for error in e.details.get("writeErrors", [])}
+                done = [post_id for post_id in pending if post_id not in failed]
+                if done:
+                    redis_client.hdel(FLUSHING_KEY, *done)
+                logger.error("like flush failed for %d of %d posts", len(failed), len(operations))
+                raise
+        redis_client.delete(FLUSHING_KEY)
+        return len(operations)
+
+    @staticmethod
+    def forget(post_id):
+        """Elimina el estado de likes de un post borrado"""
+        redis_client.delete(LikeCache.likers_key(post_id), LikeCache.count_key(post_id))
+        redis_client.hdel(PENDING_KEY, str(post_id))
@@ -0,0 +1,80 @@
+import hashlib
+import logging
+import os
+import tempfile
+
+from app.config import Config
+from app.utils.image_pool import encode_variants
+
+logger = logging.getLogger(__name__)
+
+STATIC_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'static'))
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class MediaStore:
+    """Ficheros de imagen direccionados por contenido bajo static/<MEDIA_FOLDER>.
+
+    Cada imagen se identifica por el SHA-256 de su salida normalizada (la
+    variante mayor en JPEG) y sus variantes viven en
+    `<MEDIA_FOLDER>/ab/cd/<hash>_<variante>.<ext>`, repartidas en dos niveles
+    de subdirectorios para que ninguno crezca sin límite.
+    """
+
+    @staticmethod
+    def relative_path(digest: str, name: str, extension: str) -> str:
+        return f"{Config.MEDIA_FOLDER}/{digest[:2]}/{digest[2:4]}/{digest}_{name}{extension}"
+
+    @staticmethod
+    def absolute_path(relative_path: str) -> str:
+        return os.path.join(STATIC_FOLDER, relative_path)
+
+    @staticmethod
+    def write(relative_path: str, payload: bytes):
+        """Escribe el fichero de forma atómica; si ya existe no se toca"""
+        path = MediaStore.absolute_path(relative_path)
+        if os.path.exists(path):
+            return
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def remove(relative_paths):
+        for relative_path in set(relative_paths):
+            try:
+                os.unlink(MediaStore.absolute_path(relative_path))
+            except FileNotFoundError:
+                pass
+
+
+def store_variants(source, variants: dict, preferred_formats, quality: int):
+    """Codifica las variantes y las guarda en el almacén.
+
+    Devuelve (hash, {variante: ruta relativa a static}) o None si la imagen
+    no se pudo procesar. Se ejecuta en el proceso hijo.
+    """
+    try:
+        encoded = encode_variants(source, variants, preferred_formats, quality)
+    except Exception as e:
+        logger.warning("could not process image: %s", e)
+        return None
+
+    digest = content_hash(encoded["jpeg"][1])
+    files = {}
+    for name, (extension, payload) in encoded.items():
+        # La clave "jpeg" puede ser el mismo fichero que la variante mayor
+        source_name = next(key for key, value in encoded.items() if value is encoded[name])
+        files[name] = MediaStore.relative_path(digest, source_name, extension)
+        MediaStore.write(files[name], payload)
+    return digest, files
@@ -0,0 +1,265 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from pymongo import monitoring
+from redis import BlockingConnectionPool, Redis
+from redis.client import Pipeline
+
+# Límites de los buckets en segundos (los mismos que usa Prometheus por defecto)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+BACKENDS = ("mongo", "redis")
+
+# Tiempo y número de llamadas a cada backend durante la petición en curso
+_request_io = ContextVar("request_io", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[position] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+
+class Metrics:
+    """Registro de métricas en memoria del proceso, en formato Prometheus.
+
+    Cada worker web expone las suyas: Prometheus debe rasparlos por
+    separado (o agregarlas con la etiqueta de instancia).
+    """
+
+    _lock = threading.Lock()
+    _histograms = defaultdict(dict)   # nombre -> {etiquetas: Histogram}
+    _counters = defaultdict(lambda: defaultdict(float))
+    _gauges = defaultdict(lambda: defaultdict(float))
+    _help = {}
+
+    @staticmethod
+    def describe(name: str, text: str):
+        Metrics._help[name] = text
+
+    @staticmethod
+    def observe(name: str, labels: tuple, value: float):
+        with Metrics._lock:
+            histogram = Metrics._histograms[name].get(labels)
+            if histogram is None:
+                histogram = Metrics._histograms[name][labels] = Histogram()
+            histogram.observe(value)
+
+    @staticmethod
+    def increment(name: str, labels: tuple, amount: float = 1):
+        with Metrics._lock:
+            Metrics._counters[name][labels] += amount
+
+    @staticmethod
+    def add_gauge(name: str, labels: tuple, amount: float):
+        with Metrics._lock:
+            Metrics._gauges[name][labels] += amount
+
+    @staticmethod
+    def set_gauge(name: str, labels: tuple, value: float):
+        with Metrics._lock:
+            Metrics._gauges[name][labels] = value
+
+    @staticmethod
+    def gauges(name: str) -> dict:
+        with Metrics._lock:
+            return dict(Metrics._gauges.get(name, {}))
+
+    @staticmethod
+    def _after_fork():
+        # Los gauges describen los pools del padre; el hijo crea los suyos
+        Metrics._lock = threading.Lock()
+        Metrics._gauges.clear()
+
+    @staticmethod
+    def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+        pairs = [f'{key}="{str(value)}"' for key, value in labels + extra]
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    @staticmethod
+    def render(extra_counters=None) -> str:
+        """Texto de exposición de Prometheus (versión 0.0.4)"""
+        lines = []
+        with Metrics._lock:
+            for name, series in Metrics._histograms.items():
+                lines.append(f"# HELP {name} {Metrics._help.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{Metrics._format_labels(labels, (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_bucket{Metrics._format_labels(labels, (('le', '+Inf'),))} {histogram.total}")
+                    lines.append(f"{name}_sum{Metrics._format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{Metrics._format_labels(labels)} {histogram.total}")
+            counters = {name: dict(series) for name, series in Metrics._counters.items()}
+            gauges = {name: dict(series) for name, series in Metrics._gauges.items()}
+        for name, series in list(counters.items()) + list((extra_counters or {}).items()):
+            lines.append(f"# HELP {name} {Metrics._help.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{Metrics._format_labels(labels)} {value}")
+        for name, series in gauges.items():
+            lines.append(f"# HELP {name} {Metrics._help.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in series.items():
+                lines.append(f"{name}{Metrics._format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=Metrics._after_fork)
+
+
+class RequestIO:
+    """Acumula el tiempo de E/S de la petición en curso"""
+
+    @staticmethod
+    def start():
+        stats = {backend: [0.0, 0] for backend in BACKENDS}
+        return _request_io.set(stats)
+
+    @staticmethod
+    def stop(token) -> dict:
+        stats = _request_io.get()
+        _request_io.reset(token)
+        return stats or {}
+
+    @staticmethod
+    def record(backend: str, seconds: float, calls: int = 1):
+        stats = _request_io.get()
+        if stats is not None:
+            stats[backend][0] += seconds
+            stats[backend][1] += calls
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Suma la duración de cada comando de MongoDB a la petición que lo lanzó.
+
+    PyMongo notifica en el mismo hilo que ejecuta el comando, así que el
+    ContextVar de la petición está disponible.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        RequestIO.record("mongo", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        RequestIO.record("mongo", event.duration_micros / 1e6)
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Uso del pool de conexiones de MongoDB por servidor.
+
+    Conexiones abiertas y en uso (gauges), esperas para obtener una
+    conexión y fallos por pool agotado (waitQueueTimeoutMS).
+    """
+
+    @staticmethod
+    def _labels(event) -> tuple:
+        host, port = event.address
+        return (("address", f"{host}:{port}"),)
+
+    def pool_created(self, event):
+        Metrics.set_gauge("mongo_pool_max_size", self._labels(event), event.options.get("maxPoolSize", 0))
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        Metrics.increment("mongo_pool_cleared_total", self._labels(event))
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        Metrics.add_gauge("mongo_pool_connections_open", self._labels(event), 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        Metrics.add_gauge("mongo_pool_connections_open", self._labels(event), -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        Metrics.increment("mongo_pool_checkout_failed_total", self._labels(event) + (("reason", event.reason),))
+
+    def connection_checked_out(self, event):
+        labels = self._labels(event)
+        Metrics.add_gauge("mongo_pool_connections_in_use", labels, 1)
+        Metrics.observe("mongo_pool_checkout_seconds", labels, event.duration)
+
+    def connection_checked_in(self, event):
+        Metrics.add_gauge("mongo_pool_connections_in_use", self._labels(event), -1)
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """Pool de Redis que espera (hasta `timeout`) si se agotan las conexiones
+    y publica cuántas hay abiertas y en uso y cuánto se espera por una"""
+
+    def __init__(self, *args, pool_name="default", **kwargs):
+        self.LABELS = (("backend", "redis"), ("pool", pool_name))
+        super().__init__(*args, **kwargs)
+        Metrics.set_gauge("redis_pool_max_connections", self.LABELS, self.max_connections)
+
+    def make_connection(self):
+        connection = super().make_connection()
+        Metrics.add_gauge("redis_pool_connections_created", self.LABELS, 1)
+        return connection
+
+    def get_connection(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            connection = super().get_connection(*args, **kwargs)
+        except Exception:
+            Metrics.increment("redis_pool_checkout_failed_total", self.LABELS)
+            raise
+        Metrics.observe("redis_pool_checkout_seconds", self.LABELS, time.perf_counter() - started)
+        Metrics.add_gauge("redis_pool_connections_in_use", self.LABELS, 1)
+        return connection
+
+    def release(self, connection):
+        Metrics.add_gauge("redis_pool_connections_in_use", self.LABELS, -1)
+        super().release(connection)
+
+
+class InstrumentedPipeline(Pipeline):
+    def execute(self, raise_on_error=True):
+        calls = len(self.command_stack)
+        started = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            RequestIO.record("redis", time.perf_counter() - started, calls)
+
+
+class InstrumentedRedis(Redis):
+    """Cliente de Redis que mide cada comando y cada pipeline (un round trip)"""
+
+    def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            RequestIO.record("redis", time.perf_counter() - started)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
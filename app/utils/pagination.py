@@ -0,0 +1,92 @@
+import base64
+import json
+from datetime import datetime
+
+from bson.objectid import ObjectId
+
+
+class Cursor:
+    """Cursores opacos para paginación por keyset.
+
+    Un cursor es la lista de valores de ordenación del último elemento
+    devuelto, serializada en JSON y codificada en base64 url-safe.
+    """
+
+    @staticmethod
+    def _default(value):
+        if isinstance(value, datetime):
+            return {"$d": value.isoformat()}
+        if isinstance(value, ObjectId):
+            return {"$o": str(value)}
+        raise TypeError(f"Tipo no soportado en cursor: {type(value).__name__}")
+
+    @staticmethod
+    def _object_hook(obj):
+        if "$d" in obj:
+            return datetime.fromisoformat(obj["$d"])
+        if "$o" in obj:
+            return ObjectId(obj["$o"])
+        return obj
+
+    @staticmethod
+    def encode(values: list) -> str:
+        raw = json.dumps(values, default=Cursor._default, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode(token: str, length: int = None) -> list:
+        """Decodifica un cursor; lanza ValueError si no es válido.
+
+        `length` es el número de valores que espera la ruta: un cursor de
+        otra ruta (o manipulado) se rechaza aquí con un 400 en lugar de
+        fallar después en la consulta.
+        """
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()), object_hook=Cursor._object_hook)
+        except Exception as ex:
+            raise ValueError("Cursor inválido") from ex
+        if not isinstance(values, list) or (length is not None and len(values) != length):
+            raise ValueError("Cursor inválido")
+        return values
+
+    @staticmethod
+    def from_request(args, length: int = None, name="cursor"):
+        """Valores del cursor de la query string o None si no viene"""
+        token = args.get(name)
+        return Cursor.decode(token, length) if token else None
+
+    @staticmethod
+    def limit_from_request(args, default: int, maximum: int = 100, name="limit") -> int:
+        """Tamaño de página de la query string, acotado a 1..maximum; ValueError si no es entero"""
+        try:
+            limit = int(args.get(name, default))
+        except (TypeError, ValueError):
+            raise ValueError(f"Parámetro {name} inválido")
+        return max(1, min(limit, maximum))
+
+    @staticmethod
+    def keyset_filter(fields: list, values: list, direction: int = -1) -> dict:
+        """Filtro de rango que continúa después de `values` para el orden `fields`.
+
+        Para fields=[a, b] y orden descendente genera
+        {"$or": [{a: {"$lt": va}}, {a: va, b: {"$lt": vb}}]}, que MongoDB
+        resuelve con límites sobre el índice en lugar de un skip.
+        """
+        if len(fields) != len(values):
+            raise ValueError("Cursor inválido")
+        operator = "$lt" if direction < 0 else "$gt"
+        clauses = []
+        for index, field in enumerate(fields):
+            clause = {fields[i]: values[i] for i in range(index)}
+            clause[field] = {operator: values[index]}
+            clauses.append(clause)
+        return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+    @staticmethod
+    def next_for(items: list, limit: int, fields: list):
+        """Cursor de la página siguiente o None si no hay más resultados"""
+        if len(items) < limit or not items:
+            return None
+        last = items[-1]
+        return Cursor.encode([last[field] for field in fields])
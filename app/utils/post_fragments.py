@@ -0,0 +1,40 @@
+from app.config import Config
+from app.extensions.redis_extencion import redis_client
+
+# Subir al cambiar el formato de serialize_post: las claves antiguas caducan solas
+FRAGMENT_VERSION = 3
+
+
+class PostFragments:
+    """JSON ya serializado de cada publicación, listo para concatenar.
+
+    El fragmento no depende de quién lo pide (los "me gusta" del usuario
+    van aparte en la respuesta). Se borra al editar o borrar la publicación
+    y al cambiar sus contadores de likes o comentarios; el TTL acota lo que
+    puede tardar en verse un cambio de perfil del autor.
+    """
+
+    @staticmethod
+    def key(post_id) -> str:
+        return f"post:fragment:v{FRAGMENT_VERSION}:{post_id}"
+
+    @staticmethod
+    def get_many(post_ids: list) -> list:
+        """Fragmentos en el mismo orden que post_ids (None si no está cacheado)"""
+        if not post_ids:
+            return []
+        return redis_client.mget([PostFragments.key(post_id) for post_id in post_ids])
+
+    @staticmethod
+    def store(fragments: dict):
+        if not fragments:
+            return
+        pipe = redis_client.pipeline(transaction=False)
+        for post_id, fragment in fragments.items():
+            pipe.set(PostFragments.key(post_id), fragment, ex=Config.POST_FRAGMENT_TTL)
+        pipe.execute()
+
+    @staticmethod
+    def invalidate(*post_ids):
+        if post_ids:
+            redis_client.delete(*(PostFragments.key(post_id) for post_id in post_ids))
@@ -0,0 +1,180 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import Config
+from app.extensions.redis_extencion import redis_client
+
+
+class _LocalLRU:
+    """LRU en memoria del proceso con expiración por entrada"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class ProfileCache:
+    """Cache read-through de perfiles públicos: LRU local -> Redis -> MongoDB.
+
+    La capa local tiene un TTL corto porque la invalidación solo alcanza
+    al proceso que hace la escritura; Redis se invalida siempre.
+    """
+
+    _local = _LocalLRU(Config.PROFILE_CACHE_LOCAL_SIZE, Config.PROFILE_CACHE_LOCAL_TTL)
+
+    @staticmethod
+    def _key(user_id) -> str:
+        return f"profile:{user_id}"
+
+    @staticmethod
+    def _username_key(username) -> str:
+        return f"profile:username:{username}"
+
+    @staticmethod
+    def to_public(user: dict) -> dict:
+        """Reduce un documento de usuario a los campos públicos cacheables"""
+        privacy = user.get('privacy') or {}
+        profile = {
+            "id": str(user['_id']),
+            "username": user.get('username', ''),
+            "bio": user.get('bio', ''),
+            "profile_pic_url": user.get('profile_pic_url', ''),
+            "followers_count": user.get('followers_count', 0),
+            "following_count": user.get('following_count', 0),
+            "is_private": privacy.get('is_private', False)
+        }
+        if privacy.get('show_email', False):
+            profile['email'] = user.get('email', '')
+        return profile
+
+    @staticmethod
+    def queue_store(pipe, profiles: list):
+        """Guarda los perfiles en la capa local y encola su escritura en Redis"""
+        for profile in profiles:
+            ProfileCache._local.set(ProfileCache._key(profile['id']), profile)
+            pipe.set(ProfileCache._key(profile['id']), json.dumps(profile), ex=Config.PROFILE_CACHE_TTL)
+            pipe.set(ProfileCache._username_key(profile['username']), profile['id'], ex=Config.PROFILE_CACHE_TTL)
+
+    @staticmethod
+    def _store(profiles: list):
+        if not profiles:
+            return
+        pipe = redis_client.pipeline(transaction=False)
+        ProfileCache.queue_store(pipe, profiles)
+        pipe.execute()
+
+    @staticmethod
+    def get_local(user_ids: list) -> tuple:
+        """({user_id: perfil} de la capa local, ids que faltan)"""
+        profiles = {}
+        missing = []
+        for user_id in user_ids:
+            profile = ProfileCache._local.get(ProfileCache._key(user_id))
+            if profile is None:
+                missing.append(user_id)
+            else:
+                profiles[user_id] = profile
+        return profiles, missing
+
+    @staticmethod
+    def redis_keys(user_ids: list) -> list:
+        return [ProfileCache._key(user_id) for user_id in user_ids]
+
+    @staticmethod
+    def merge_cached(profiles: dict, user_ids: list, cached: list) -> list:
+        """Añade a `profiles` los perfiles leídos de Redis; devuelve los ids que faltan"""
+        still_missing = []
+        for user_id, raw in zip(user_ids, cached):
+            if raw is None:
+                still_missing.append(user_id)
+                continue
+            profile = json.loads(raw)
+            ProfileCache._local.set(ProfileCache._key(user_id), profile)
+            profiles[user_id] = profile
+        return still_missing
+
+    @staticmethod
+    def get_many(user_ids) -> dict:
+        """Devuelve {user_id: perfil} consultando MongoDB solo para los fallos"""
+        from app.models.user_models import User
+
+        user_ids = list(dict.fromkeys(str(user_id) for user_id in user_ids))
+        profiles, missing = ProfileCache.get_local(user_ids)
+        if not missing:
+            return profiles
+
+        cached = redis_client.mget(ProfileCache.redis_keys(missing))
+        still_missing = ProfileCache.merge_cached(profiles, missing, cached)
+        if not still_missing:
+            return profiles
+
+        loaded = [ProfileCache.to_public(user) for user in User.find_public_profiles(still_missing)]
+        ProfileCache._store(loaded)
+        for profile in loaded:
+            profiles[profile['id']] = profile
+        return profiles
+
+    @staticmethod
+    def get_by_id(user_id):
+        return ProfileCache.get_many([user_id]).get(str(user_id))
+
+    @staticmethod
+    def get_by_username(username):
+        from app.models.user_models import User
+
+        user_id = redis_client.get(ProfileCache._username_key(username))
+        if user_id:
+            profile = ProfileCache.get_by_id(user_id)
+            if profile and profile['username'] == username:
+                return profile
+
+        user = User.find_public_profile_by_username(username)
+        if not user:
+            return None
+        profile = ProfileCache.to_public(user)
+        ProfileCache._store([profile])
+        return profile
+
+    @staticmethod
+    def invalidate(*user_ids, usernames=()):
+        """Elimina los perfiles indicados de ambas capas"""
+        keys = [ProfileCache._key(user_id) for user_id in user_ids]
+        for key in keys:
+            ProfileCache._local.delete(key)
+
+        # El índice por username se borra con el nombre cacheado y con los nuevos
+        stale = [json.loads(raw)['username'] for raw in redis_client.mget(keys) if raw] if keys else []
+        keys += [ProfileCache._username_key(name) for name in [*stale, *usernames] if name]
+        if keys:
+            redis_client.delete(*keys)
@@ -0,0 +1,95 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+import msgspec
+from bson.objectid import ObjectId
+from flask import Response
+
+
+class Author(msgspec.Struct, omit_defaults=True):
+    id: str
+    username: str
+    profile_pic_url: str = ""
+
+
+class CommentPayload(msgspec.Struct, omit_defaults=True):
+    id: str
+    user: Dict[str, str]
+    text_comment: str
+    created_at: datetime
+
+
+class PostPayload(msgspec.Struct, omit_defaults=True):
+    id: str
+    content: str
+    # Publicaciones antiguas: URL; nuevas: {variante: URL}
+    media_urls: List[Union[str, Dict[str, str]]]
+    likes_count: int
+    comment_count: int
+    created_at: Optional[datetime]
+    author: Optional[Author]
+    recent_comments: List[CommentPayload] = msgspec.field(default_factory=list)
+    reposts_count: Optional[int] = None
+    liked_by_me: Optional[bool] = None
+
+    @classmethod
+    def from_document(cls, post: dict, author: Optional[dict], likes_count: Optional[int] = None):
+        return cls(
+            id=str(post['_id']),
+            content=post.get('content', ''),
+            media_urls=post.get('media_urls', []),
+            likes_count=post.get('likes_count', 0) if likes_count is None else likes_count,
+            comment_count=post.get('comments_count', 0),
+            created_at=post.get('created_at'),
+            author=Author(**author) if author else None,
+            recent_comments=[CommentPayload(**comment) for comment in post.get('recent_comments', [])],
+        )
+
+
+class UserSummary(msgspec.Struct, omit_defaults=True):
+    """Usuario en listados (búsqueda, recomendaciones)"""
+    username: str
+    profile_pic_url: str = ""
+    bio: Optional[str] = None
+    email: Optional[str] = None
+
+
+class UserProfile(msgspec.Struct, omit_defaults=True):
+    """Perfil público con la primera página de publicaciones"""
+    id: str
+    username: str
+    bio: str
+    profile_pic_url: str
+    followers: int
+    following: int
+    posts_count: int
+    posts: List[PostPayload]
+    posts_next_cursor: Optional[str]
+    email: Optional[str] = None
+
+
+class FeedPage(msgspec.Struct):
+    posts: List[PostPayload]
+    limit: int
+    next_cursor: Optional[str]
+    liked_post_ids: List[str]
+
+
+def _enc_hook(obj):
+    # msgspec ya codifica datetime, Struct, dict y list; ObjectId va como texto
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise NotImplementedError(f"Tipo no serializable: {type(obj)!r}")
+
+
+_encoder = msgspec.json.Encoder(enc_hook=_enc_hook)
+
+
+def encode(payload) -> bytes:
+    """JSON de un Struct (o de dicts/listas con Structs, datetimes y ObjectIds)"""
+    return _encoder.encode(payload)
+
+
+def json_response(payload, status: int = 200, headers=None) -> Response:
+    """Respuesta JSON codificada directamente a bytes, sin pasar por jsonify"""
+    return Response(encode(payload), status=status, headers=headers, mimetype='application/json')
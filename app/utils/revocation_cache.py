@@ -0,0 +1,125 @@
+import logging
+import os
+import threading
+import time
+
+from app.extensions.redis_extencion import blocking_redis_client, redis_client
+
+logger = logging.getLogger(__name__)
+
+REVOKED_CHANNEL = "auth:revocations"
+# Espera máxima de cada lectura del canal; sin mensajes no es un error
+LISTEN_POLL_TIMEOUT = 30
+
+
+class RevocationCache:
+    """Copia local de los tokens revocados, sincronizada por pub/sub.
+
+    Cada proceso carga los `revoked:{jti}` existentes y se suscribe al canal
+    de revocaciones, así que comprobar un token no revocado no hace I/O.
+    Mientras la suscripción no está activa (arranque o Redis caído) se
+    consulta Redis directamente.
+    """
+
+    _revoked = {}             # jti -> instante de expiración (epoch)
+    _lock = threading.Lock()
+    _synced = threading.Event()
+    _listener_pid = None
+
+    @staticmethod
+    def revoke(jti: str, exp: int):
+        """Revoca el token en Redis y avisa a todos los procesos"""
+        ttl = max(int(exp - time.time()), 1)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.setex(f"revoked:{jti}", ttl, "true")
+        pipe.publish(REVOKED_CHANNEL, f"{jti}:{int(exp)}")
+        pipe.execute()
+        RevocationCache._remember(jti, exp)
+
+    @staticmethod
+    def is_revoked(jti: str) -> bool:
+        RevocationCache._ensure_listener()
+        with RevocationCache._lock:
+            exp = RevocationCache._revoked.get(jti)
+        if exp is not None:
+            if exp > time.time():
+                return True
+            RevocationCache._forget(jti)
+        if RevocationCache._synced.is_set():
+            return False
+        return redis_client.get(f"revoked:{jti}") == "true"
+
+    @staticmethod
+    def _remember(jti, exp):
+        with RevocationCache._lock:
+            RevocationCache._revoked[jti] = float(exp)
+
+    @staticmethod
+    def _forget(jti):
+        with RevocationCache._lock:
+            RevocationCache._revoked.pop(jti, None)
+
+    @staticmethod
+    def _purge_expired():
+        now = time.time()
+        with RevocationCache._lock:
+            for jti in [jti for jti, exp in RevocationCache._revoked.items() if exp <= now]:
+                del RevocationCache._revoked[jti]
+
+    @staticmethod
+    def _load_existing():
+        keys = list(redis_client.scan_iter(match="revoked:*", count=1000))
+        if not keys:
+            return
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.pttl(key)
+        now = time.time()
+        for key, pttl in zip(keys, pipe.execute()):
+            if pttl and pttl > 0:
+                RevocationCache._remember(key.split(":", 1)[1], now + pttl / 1000)
+
+    @staticmethod
+    def _ensure_listener():
+        # Un hilo por proceso; tras un fork el hilo del padre no existe
+        if RevocationCache._listener_pid == os.getpid():
+            return
+        with RevocationCache._lock:
+            if RevocationCache._listener_pid == os.getpid():
+                return
+            RevocationCache._listener_pid = os.getpid()
+            RevocationCache._revoked = {}
+            RevocationCache._synced.clear()
+        threading.Thread(target=RevocationCache._listen, name="revocation-listener", daemon=True).start()
+
+    @staticmethod
+    def _listen():
+        while True:
+            # Conexión sin socket_timeout: el canal puede pasar mucho tiempo en silencio
+            pubsub = blocking_redis_client.pubsub()
+            try:
+                pubsub.subscribe(REVOKED_CHANNEL)
+                # Esperar la confirmación antes de cargar para no perder revocaciones
+                while pubsub.get_message(timeout=1.0) is None:
+                    pass
+                RevocationCache._load_existing()
+                RevocationCache._synced.set()
+
+                last_purge = time.time()
+                while True:
+                    message = pubsub.get_message(ignore_subscribe_messages=True, timeout=LISTEN_POLL_TIMEOUT)
+                    if message is not None and message.get("type") == "message":
+                        jti, _, exp = message["data"].rpartition(":")
+                        RevocationCache._remember(jti, exp)
+                    if time.time() - last_purge > 60:
+                        RevocationCache._purge_expired()
+                        last_purge = time.time()
+            except Exception:
+                logger.exception("revocation listener disconnected, falling back to Redis lookups")
+                RevocationCache._synced.clear()
+                time.sleep(1)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
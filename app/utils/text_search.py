@@ -0,0 +1,36 @@
+import re
+import unicodedata
+
+# Límites para que una consulta no dispare búsquedas arbitrariamente caras
+MAX_QUERY_TOKENS = 8
+MAX_TOKEN_LENGTH = 40
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Minúsculas y sin acentos: 'Canción' -> 'cancion'"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return stripped.casefold().strip()
+
+
+def tokenize(text: str) -> list:
+    """Tokens normalizados y sin duplicados, listos para $text.
+
+    Solo se conservan caracteres de palabra, así que el resultado no puede
+    contener frases, negaciones ni metacaracteres de regex.
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(normalize(text)):
+        token = token[:MAX_TOKEN_LENGTH]
+        if token not in tokens:
+            tokens.append(token)
+        if len(tokens) == MAX_QUERY_TOKENS:
+            break
+    return tokens
+
+
+def prefix_range(prefix: str) -> dict:
+    """Rango de índice equivalente a '^prefix' sin usar expresiones regulares"""
+    return {"$gte": prefix, "$lt": prefix + "\uffff"}
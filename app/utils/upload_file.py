@@ -1,11 +1,14 @@
 import os
+import time
 import uuid
-from PIL import Image
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from werkzeug.utils import secure_filename
-import multiprocessing
-from io import BytesIO
 from flask import url_for
+from app.config import Config
+from app.models.media_models import Media
+from app.utils.image_pool import ImagePool, render_variants
+from app.utils.media_store import content_hash, store_variants
+from app.utils.upload_stream import SpooledUpload, detect_image_format
 
 class UploadFile:
     def __init__(self, username: str, target_folder: str):
@@ -15,7 +18,6 @@ class UploadFile:
         self.username = username
         self.target_folder = target_folder
         self.allowed_extensions = {'png', 'jpg', 'jpeg'}
-        self.max_workers = multiprocessing.cpu_count() * 2
         self.static_folder = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'static'))
         self.base_folder = os.path.join(self.static_folder, 'uploads', self.username, self.target_folder)
         os.makedirs(self.base_folder, exist_ok=True)
@@ -23,56 +25,77 @@ class UploadFile:
     def allowed_file(self, filename):
         return '.' in filename and filename.rsplit('.', 1)[1].lower() in self.allowed_extensions
 
-    def compress_file(self, file, save_path, max_size=1024, quality=85):
-        try:
-            img = Image.open(file)
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
+    def read_upload(self, file):
+        """(hash, origen) de una imagen aceptada, o None si se descarta.
+
+        El tipo se comprueba por extensión y por los primeros bytes, sin
+        decodificar. El origen es la ruta del fichero temporal si la subida
+        se guardó en disco, o sus bytes si es pequeña.
+        """
+        if not self.allowed_file(file.filename) or detect_image_format(file.stream) is None:
+            return None
+        if isinstance(file.stream, SpooledUpload):
+            return file.stream.sha256(), file.stream.source()
+        # La subida se puede leer otra vez si hay que volver a procesarla
+        file.stream.seek(0)
+        data = file.read()
+        return content_hash(data), data
+
+    def submit_file(self, source, variants, formats):
+        base_path = os.path.join(self.base_folder, str(uuid.uuid4()))
+        return ImagePool.submit(render_variants, source, base_path, variants, formats, Config.IMAGE_QUALITY)
 
-            img.thumbnail((max_size, max_size))
-            root, _ = os.path.splitext(save_path)
-            save_path_jpg = root + ".jpg"
-            img.save(save_path_jpg, format='JPEG', quality=quality, optimize=True)
-            return True
-        except Exception as e:
-            print(f"Error procesando imagen {file.filename}: {e}")
-            return False
-        finally:
-            if 'img' in locals():
-                img.close()
+    def relative_path(self, filename):
+        return f"uploads/{self.username}/{self.target_folder}/{filename}"
 
     def process_image(self,file):
-        url:str = ""
-        filename = f"{uuid.uuid4()}.jpg"
-        save_path = os.path.join(self.base_folder,filename)
-        in_memory_file = BytesIO(file.read())
-        in_memory_file.seek(0)
-        in_memory_file.name = file.filename
-        if self.compress_file(in_memory_file,save_path):
-            return f"uploads/{self.username}/{self.target_folder}/{filename}"
-        return None
+        """Imagen única en JPEG (foto de perfil); devuelve su ruta relativa a static"""
+        upload = self.read_upload(file)
+        if upload is None:
+            return None
+        future = self.submit_file(upload[1], {'full': Config.PROFILE_IMAGE_SIZE}, ('jpeg',))
+        try:
+            saved = future.result(timeout=Config.IMAGE_PROCESS_TIMEOUT)
+        except FutureTimeoutError:
+            future.cancel()
+            return None
+        return self.relative_path(saved['full']) if saved else None
     
     def process_images(self, files):
-        saved_urls = []
+        """Guarda las imágenes de una publicación en el almacén de contenido.
+
+        Cada imagen se guarda en las variantes de Config.IMAGE_VARIANTS (la
+        clave 'jpeg' apunta a la variante mayor en JPEG). Una subida que ya
+        se procesó antes, identificada por el hash de sus bytes, no se vuelve
+        a comprimir. Devuelve una lista de (media_id, {variante: ruta
+        relativa a static}) en el orden de subida; las que no son JPEG/PNG
+        se descartan.
+        """
+        uploads = [upload for upload in map(self.read_upload, files) if upload is not None]
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = []
-            name_url = []
-            for file in files:
-                if not self.allowed_file(file.filename):
-                    continue
+        known = Media.find_by_sources([source_hash for source_hash, _ in uploads])
 
-                filename = f"{uuid.uuid4()}.jpg"
-                save_path = os.path.join(self.base_folder, filename)
-                in_memory_file = BytesIO(file.read())
-                in_memory_file.seek(0)
-                in_memory_file.name = file.filename  # Para errores más claros
-                name_url.append(filename)
-                futures.append(executor.submit(self.compress_file, in_memory_file, save_path))
+        futures = {}
+        for source_hash, source in uploads:
+            if source_hash not in known and source_hash not in futures:
+                futures[source_hash] = ImagePool.submit(
+                    store_variants, source, Config.IMAGE_VARIANTS, Config.IMAGE_FORMATS, Config.IMAGE_QUALITY
+                )
 
-            for index,future in enumerate(futures):
-                result = future.result()
-                if result:
-                    saved_urls.append(f"uploads/{self.username}/{self.target_folder}/{name_url[index]}")
+        # Un único plazo para toda la petición
+        deadline = time.monotonic() + Config.IMAGE_PROCESS_TIMEOUT
+        for source_hash, future in futures.items():
+            try:
+                stored = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeoutError:
+                future.cancel()
+                continue
+            if stored:
+                digest, files_by_variant = stored
+                known[source_hash] = Media.register(digest, source_hash, files_by_variant)
 
-        return saved_urls
+        return [
+            (known[source_hash]["_id"], known[source_hash]["files"])
+            for source_hash, _ in uploads
+            if source_hash in known
+        ]
@@ -0,0 +1,140 @@
+import hashlib
+import io
+import tempfile
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from app.config import Config
+
+# Cabeceras de los formatos aceptados: se comprueban antes de decodificar nada
+IMAGE_SIGNATURES = {
+    "jpeg": (b"\xff\xd8\xff",),
+    "png": (b"\x89PNG\r\n\x1a\n",),
+}
+
+
+class SpooledUpload(io.RawIOBase):
+    """Fichero subido que se guarda en memoria hasta `threshold` bytes y después
+    en un NamedTemporaryFile, cuya ruta se puede pasar al pool de imágenes.
+
+    Lanza RequestEntityTooLarge (413) en cuanto el fichero supera `max_size`,
+    sin seguir leyendo el cuerpo de la petición.
+    """
+
+    def __init__(self, max_size: int, threshold: int):
+        super().__init__()
+        self.max_size = max_size
+        self.threshold = threshold
+        self.size = 0
+        self._buffer = io.BytesIO()
+        self._file = None
+
+    @property
+    def path(self):
+        """Ruta en disco si el fichero superó el umbral; None si está en memoria"""
+        return self._file.name if self._file is not None else None
+
+    @property
+    def _target(self):
+        return self._file if self._file is not None else self._buffer
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def write(self, data) -> int:
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise RequestEntityTooLarge(f"Cada imagen puede ocupar como máximo {self.max_size} bytes")
+        if self._file is None and self.size > self.threshold:
+            self._file = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".tmp")
+            self._file.write(self._buffer.getbuffer())
+            self._buffer = None
+        return self._target.write(data)
+
+    def read(self, size=-1) -> bytes:
+        return self._target.read(size)
+
+    def readinto(self, buffer) -> int:
+        data = self._target.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET) -> int:
+        return self._target.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._target.tell()
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        # NamedTemporaryFile borra el fichero al cerrarse (Flask cierra los
+        # ficheros de la petición al terminarla)
+        if self._file is not None:
+            self._file.close()
+        super().close()
+
+    def head(self, size=16) -> bytes:
+        position = self.tell()
+        self.seek(0)
+        data = self.read(size)
+        self.seek(position)
+        return data
+
+    def source(self):
+        """Lo que se envía al pool de procesos: la ruta si está en disco, si no los bytes"""
+        self.flush()
+        if self.path is not None:
+            return self.path
+        return self._buffer.getvalue()
+
+    def sha256(self) -> str:
+        digest = hashlib.sha256()
+        self.seek(0)
+        for chunk in iter(lambda: self.read(1024 * 1024), b""):
+            digest.update(chunk)
+        self.seek(0)
+        return digest.hexdigest()
+
+
+class UploadRequest(Request):
+    """Request que procesa los multipart en streaming con límites por fichero.
+
+    Los límites globales (tamaño del cuerpo, número de partes y memoria de
+    los campos de texto) los aplica Werkzeug con MAX_CONTENT_LENGTH,
+    MAX_FORM_PARTS y MAX_FORM_MEMORY_SIZE; aquí se limitan el número de
+    ficheros y el tamaño de cada uno mientras se reciben.
+    """
+    max_form_parts = Config.MAX_FORM_PARTS
+    max_form_memory_size = Config.MAX_FORM_MEMORY_SIZE
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        self._upload_count = getattr(self, "_upload_count", 0) + 1
+        if self._upload_count > Config.MAX_IMAGE_FILES:
+            raise RequestEntityTooLarge(f"Se permiten como máximo {Config.MAX_IMAGE_FILES} imágenes")
+        if content_length is not None and content_length > Config.MAX_IMAGE_SIZE:
+            raise RequestEntityTooLarge(f"Cada imagen puede ocupar como máximo {Config.MAX_IMAGE_SIZE} bytes")
+        return SpooledUpload(Config.MAX_IMAGE_SIZE, Config.UPLOAD_SPOOL_THRESHOLD)
+
+
+def detect_image_format(stream):
+    """Formato según los primeros bytes, o None si no es una imagen aceptada"""
+    if isinstance(stream, SpooledUpload):
+        head = stream.head()
+    else:
+        position = stream.tell()
+        head = stream.read(16)
+        stream.seek(position)
+    for fmt, signatures in IMAGE_SIGNATURES.items():
+        if head.startswith(signatures):
+            return fmt
+    return None
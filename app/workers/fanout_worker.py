@@ -0,0 +1,53 @@
+"""Worker de distribución de posts a los feeds.
+
+    export PYTHONPATH=$(pwd)
+    python app/workers/fanout_worker.py
+"""
+import logging
+import signal
+import time
+
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+from app.config import Config
+from app.utils.fanout_queue import FanoutQueue
+
+logger = logging.getLogger("fanout_worker")
+
+
+def run():
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    worker_id = Config.FANOUT_WORKER_ID
+    logger.info("fan-out worker %s started (batch=%d)", worker_id, Config.FANOUT_QUEUE_BATCH)
+    recovered = False
+    backoff = 1
+    while not stopping:
+        try:
+            if not recovered:
+                # Trabajos que una ejecución anterior de este worker dejó sin confirmar
+                logger.info("recovered %d in-flight fan-out jobs", FanoutQueue.recover(worker_id))
+                recovered = True
+            FanoutQueue.promote_due()
+            entries = FanoutQueue.pop_batch(worker_id, Config.FANOUT_QUEUE_BATCH, timeout=5)
+            if entries:
+                done = FanoutQueue.process_batch(worker_id, entries)
+                logger.debug("processed %d/%d fan-out jobs", done, len(entries))
+            backoff = 1
+        except (RedisConnectionError, RedisTimeoutError):
+            logger.exception("redis unavailable, retrying in %ds", backoff)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+    logger.info("fan-out worker stopped")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    run()
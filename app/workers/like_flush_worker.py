@@ -0,0 +1,42 @@
+"""Worker que vuelca a MongoDB los contadores de likes acumulados en Redis.
+
+    export PYTHONPATH=$(pwd)
+    python app/workers/like_flush_worker.py
+"""
+import logging
+import signal
+import threading
+
+from app.config import Config
+from app.utils.like_cache import LikeCache
+
+logger = logging.getLogger("like_flush_worker")
+
+
+def run():
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    logger.info("like flush worker started (interval=%ss)", Config.LIKE_FLUSH_INTERVAL)
+    while not stopping.is_set():
+        try:
+            updated = LikeCache.flush_pending()
+            if updated:
+                logger.debug("flushed like deltas for %d posts", updated)
+        except Exception:
+            logger.exception("like flush failed, retrying on next interval")
+        stopping.wait(Config.LIKE_FLUSH_INTERVAL)
+
+    # Último volcado para no dejar deltas pendientes al parar
+    LikeCache.flush_pending()
+    logger.info("like flush worker stopped")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    run()
@@ -0,0 +1,82 @@
+"""Latencia de publicación (fan-out en escritura) frente al número de seguidores.
+
+Necesita un Redis accesible en REDIS_URI. Los seguidores se precargan en
+``followers:<autor>`` para medir solo las escrituras en Redis.
+
+    export PYTHONPATH=$(pwd)
+    python benchmarks/bench_fanout.py --followers 10 100 1000 10000 --runs 20
+"""
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+from app.config import Config
+from app.extensions.redis_extencion import redis_client
+from app.utils.feed_cache import FeedCache, CELEBRITIES_KEY
+
+
+def seed_followers(author_id: str, total: int) -> list:
+    followers = [f"bench-{uuid.uuid4().hex}" for _ in range(total)]
+    pipe = redis_client.pipeline(transaction=False)
+    for start in range(0, total, 10000):
+        pipe.sadd(f"followers:{author_id}", *followers[start:start + 10000])
+    pipe.execute()
+    return followers
+
+
+def cleanup(author_id: str, followers: list, post_ids: list):
+    keys = [f"followers:{author_id}", f"timeline:{author_id}"]
+    keys += [f"feed:{follower_id}" for follower_id in followers]
+    pipe = redis_client.pipeline(transaction=False)
+    for start in range(0, len(keys), 10000):
+        pipe.delete(*keys[start:start + 10000])
+    if post_ids:
+        pipe.zrem("feed:global", *post_ids)
+    pipe.srem(CELEBRITIES_KEY, author_id)
+    pipe.execute()
+
+
+def bench(total_followers: int, runs: int) -> dict:
+    author_id = f"bench-author-{uuid.uuid4().hex}"
+    followers = seed_followers(author_id, total_followers)
+    post_ids = []
+    timings = []
+    try:
+        for _ in range(runs):
+            post_id = uuid.uuid4().hex
+            post_ids.append(post_id)
+            started = time.perf_counter()
+            FeedCache.add_post_to_feed(author_id, post_id, datetime.utcnow())
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        cleanup(author_id, followers, post_ids)
+
+    timings.sort()
+    return {
+        "followers": total_followers,
+        "mode": "read" if total_followers >= Config.CELEBRITY_FOLLOWER_THRESHOLD else "write",
+        "p50": statistics.median(timings),
+        "p99": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+        "max": timings[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--followers", type=int, nargs="+", default=[10, 100, 1000, 5000, 20000])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"batch={Config.FANOUT_BATCH_SIZE} feed_max={Config.FEED_MAX_LENGTH} "
+          f"celebrity_threshold={Config.CELEBRITY_FOLLOWER_THRESHOLD}")
+    print(f"{'followers':>10} {'mode':>6} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for total in args.followers:
+        result = bench(total, args.runs)
+        print(f"{result['followers']:>10} {result['mode']:>6} {result['p50']:>10.2f} "
+              f"{result['p99']:>10.2f} {result['max']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Serialización de una página de feed: dicts + jsonify frente a Structs de msgspec.
+
+No necesita MongoDB ni Redis: los posts se generan en memoria con la
+misma forma que los documentos de la colección posts.
+
+    export PYTHONPATH=$(pwd)
+    python benchmarks/bench_serialization.py --posts 50 --runs 2000
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from flask import Flask, jsonify
+
+from app.utils.responses import FeedPage, PostPayload, json_response
+
+
+def make_posts(total: int) -> tuple:
+    now = datetime.utcnow()
+    posts, authors = [], {}
+    for index in range(total):
+        user_id = ObjectId()
+        authors[str(user_id)] = {
+            "id": str(user_id),
+            "username": f"usuario_{index}",
+            "profile_pic_url": f"https://example.com/static/uploads/{user_id}/profile/foto.jpg",
+        }
+        posts.append({
+            "_id": ObjectId(),
+            "user_id": user_id,
+            "content": "Publicación de prueba con algo de texto, tildes y ñ " * 3,
+            "media_urls": [{
+                "thumb": f"https://example.com/static/media/ab/cd/{index}_thumb.webp",
+                "medium": f"https://example.com/static/media/ab/cd/{index}_medium.webp",
+                "full": f"https://example.com/static/media/ab/cd/{index}_full.webp",
+                "jpeg": f"https://example.com/static/media/ab/cd/{index}_jpeg.jpg",
+            }],
+            "likes_count": index * 7,
+            "comments_count": index,
+            "created_at": now - timedelta(minutes=index),
+        })
+    return posts, authors
+
+
+def dict_payload(posts: list, authors: dict) -> dict:
+    # Forma anterior: un dict por post con created_at.isoformat()
+    return {
+        "posts": [{
+            "id": str(post["_id"]),
+            "content": post.get("content", ""),
+            "media_urls": post.get("media_urls", []),
+            "likes_count": post.get("likes_count", 0),
+            "comment_count": post.get("comments_count", 0),
+            "created_at": post["created_at"].isoformat(),
+            "author": authors[str(post["user_id"])],
+        } for post in posts],
+        "limit": len(posts),
+        "next_cursor": None,
+        "liked_post_ids": [],
+    }
+
+
+def struct_payload(posts: list, authors: dict) -> FeedPage:
+    return FeedPage(
+        posts=[PostPayload.from_document(post, authors[str(post["user_id"])]) for post in posts],
+        limit=len(posts),
+        next_cursor=None,
+        liked_post_ids=[],
+    )
+
+
+def bench(label: str, fn, runs: int) -> dict:
+    timings = []
+    size = 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = fn()
+        timings.append((time.perf_counter() - started) * 1e6)
+        size = len(response.get_data())
+    timings.sort()
+    return {
+        "label": label,
+        "p50": statistics.median(timings),
+        "p99": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+        "bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    posts, authors = make_posts(args.posts)
+    app = Flask(__name__)
+    with app.app_context():
+        results = [
+            bench("dict + jsonify", lambda: jsonify(dict_payload(posts, authors)), args.runs),
+            bench("msgspec Struct", lambda: json_response(struct_payload(posts, authors)), args.runs),
+        ]
+
+    print(f"posts={args.posts} runs={args.runs}")
+    print(f"{'path':>16} {'p50 us':>10} {'p99 us':>10} {'bytes':>8}")
+    for result in results:
+        print(f"{result['label']:>16} {result['p50']:>10.1f} {result['p99']:>10.1f} {result['bytes']:>8}")
+
+
+if __name__ == "__main__":
+    main()